@@ -1,447 +1,424 @@
 import streamlit as st
-import pandas as pd
-import joblib
+import os
+import time
+from functools import partial
+
+from instrumentation import metrics
+from model_client import MODEL_SOCKET_PATH, ModelClient
+from ui_content import (DATA_DICTIONARY, DEFAULT_STATUS, FREQUENCY_LABELS, GENDER_LABELS, RULER_HTML, STATUS_CONFIG,
+                        TRANSPORT_LABELS, YES_NO_LABELS)
+
+# pandas, joblib/sklearn and the model itself are imported and loaded on first use,
+# below the input form, so the page is painted before any of them is ready. Static
+# text and display tables come from ui_content.py, which runs once per process.
 
 # Page configuration
 st.set_page_config(page_title="Preditor de Risco de Obesidade", layout="wide")
 
 # Load the saved pipeline
-import os
 @st.cache_resource
-def load_model():
-    # Get the directory where this script is located
+def load_model_registry():
+    # One registry per server process: a background thread picks up models retrained
+    # by train.py and swaps them in without blocking the sessions using the old one
+    from model_registry import ModelRegistry
+    return ModelRegistry()
+
+@st.cache_resource
+def load_model_client():
+    # Thin client for model_server.py; used only while a server answers on the socket
+    return ModelClient(MODEL_SOCKET_PATH)
+
+def connect_model_server(client):
+    if not os.path.exists(client.path):
+        return None
+    try:
+        return client.info()
+    except (OSError, ValueError):
+        return None
+
+@st.cache_resource
+def load_prediction_cache():
+    # Shared across sessions; cleared whenever the active model version changes
+    from prediction_cache import PredictionCache
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    model_path = os.path.join(script_dir, 'model_pipeline.pkl')
-    return joblib.load(model_path)
+    return PredictionCache(os.path.join(script_dir, 'model_pipeline.pkl'), maxsize=4096, ttl=3600)
 
-model = load_model()
+@st.cache_resource(max_entries=2)
+def load_lookup_table(pkl_sha256):
+    # Optional table precomputed by lookup_table.py; only used with the model it was
+    # scored with (same pickle content) and when it agreed closely enough with it
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    table_dir = os.path.join(script_dir, 'lookup_table')
+    if pkl_sha256 is None or not os.path.exists(os.path.join(table_dir, 'meta.json')):
+        return None
+    from lookup_table import LookupPredictor
+    return LookupPredictor.load(table_dir, model_sha256=pkl_sha256)
 
-# Header
-st.title("🏥 Sistema de Avaliação de Risco de Obesidade")
-st.markdown("""
-Esta ferramenta utiliza um modelo de Machine Learning para auxiliar profissionais de saúde na identificação 
-de níveis de risco de obesidade baseado em dados físicos e hábitos de vida.
-""")
+@st.cache_resource(max_entries=2)
+def load_explainer(version, _model):
+    # Per-leaf contributions precomputed once per model version (tree models only).
+    # Like the registry, only the current and the previous version are kept: older
+    # explainers are dropped together with the model they reference
+    from explain import TreeExplainer
+    from fast_predictor import FastPredictor
+    try:
+        if isinstance(_model, FastPredictor):
+            return TreeExplainer(_model)
+        return TreeExplainer.from_pipeline(_model)
+    except ValueError:
+        return None
 
-st.divider()
+@st.cache_resource
+def load_prediction_log():
+    # Audit trail of every assessment, written in batches by a background thread
+    # (prediction_log.py). Directory: OBESITY_PREDICTION_LOG
+    from prediction_log import PredictionLog
+    return PredictionLog()
 
-# Variable Descriptions
-with st.expander("ℹ️ Descrição das Variáveis - Dicionário de Dados"):
-    st.markdown("""
-    ### 👤 Dados Pessoais
-    - **Gender**: Sexo do paciente (Feminino/Masculino)
-    - **Age**: Idade do paciente em anos
-    - **Height**: Altura do paciente em metros
-    - **Weight**: Peso do paciente em quilogramas
-    - **family_history**: Histórico familiar de sobrepeso (yes/no)
-    
-    ### 🥗 Eating Habits (Hábitos Alimentares)
-    - **FAVC** (Frequent consumption of high-calorie food): Consumo frequente de alimentos com alto teor calórico (yes/no)
-    - **FCVC** (Frequency of Consumption of Vegetables): Frequência de consumo de vegetais nas refeições (escala 1-3)
-      - 1 = Nunca
-      - 2 = Às vezes
-      - 3 = Sempre
-    - **NCP** (Number of main meals): Número de refeições principais por dia (1-4)
-    - **CAEC** (Consumption of food between meals): Consumo de alimentos entre as refeições
-      - no = Não
-      - Sometimes = Às vezes
-      - Frequently = Frequentemente
-      - Always = Sempre
-    - **CH2O** (Consumption of water daily): Consumo diário de água em litros (escala 1-3)
-      - 1 = Menos de 1L
-      - 2 = 1-2L
-      - 3 = Mais de 2L
-    - **SCC** (Calories consumption monitoring): Monitora o consumo de calorias diariamente? (yes/no)
-    
-    ### 🏃 Lifestyle & Transport (Estilo de Vida e Transporte)
-    - **FAF** (Physical activity frequency): Frequência de atividade física por semana (escala 0-3)
-      - 0 = Nenhuma
-      - 1 = 1-2 dias
-      - 2 = 2-4 dias
-      - 3 = 4-5 dias
-    - **TUE** (Time using technology devices): Tempo de uso de dispositivos eletrônicos por dia (escala 0-2)
-      - 0 = 0-2 horas
-      - 1 = 3-5 horas
-      - 2 = Mais de 5 horas
-    - **SMOKE**: Fumante? (yes/no)
-    - **CALC** (Consumption of alcohol): Consumo de álcool
-      - no = Não
-      - Sometimes = Às vezes
-      - Frequently = Frequentemente
-      - Always = Sempre
-    - **MTRANS** (Transportation used): Meio de transporte principal utilizado
-      - Public_Transportation = Transporte público
-      - Automobile = Automóvel
-      - Motorbike = Motocicleta
-      - Bike = Bicicleta
-      - Walking = Caminhada
-    
-    ### 🎯 Target Variable (Variável Alvo)
-    - **Obesity**: Nível de obesidade classificado em 7 categorias:
-      - Insufficient_Weight = Peso insuficiente
-      - Normal_Weight = Peso normal
-      - Overweight_Level_I = Sobrepeso Nível I
-      - Overweight_Level_II = Sobrepeso Nível II
-      - Obesity_Type_I = Obesidade Tipo I
-      - Obesity_Type_II = Obesidade Tipo II
-      - Obesity_Type_III = Obesidade Tipo III
-    """)
+@st.cache_resource
+def load_drift_monitor(reference_mtime):
+    # Shared counters compared against the profile saved by train.py; restarted when a
+    # new reference is published. Thresholds: OBESITY_DRIFT_PSI / OBESITY_DRIFT_KS
+    if reference_mtime is None:
+        return None
+    from drift import DRIFT_REFERENCE_PATH, DriftMonitor, load_reference
+    thresholds = {
+        'psi': float(os.environ.get('OBESITY_DRIFT_PSI', 0.2)),
+        'ks': float(os.environ.get('OBESITY_DRIFT_KS', 0.15)),
+    }
+    return DriftMonitor(load_reference(DRIFT_REFERENCE_PATH), thresholds)
 
-st.divider()
+def current_drift_monitor():
+    from drift import DRIFT_REFERENCE_PATH
+    return load_drift_monitor(
+        os.path.getmtime(DRIFT_REFERENCE_PATH) if os.path.exists(DRIFT_REFERENCE_PATH) else None
+    )
 
-# Creating columns for the layout
-col1, col2, col3 = st.columns(3)
+def model_snapshot():
+    # One snapshot per run, so a reload finishing mid-run does not mix two model
+    # versions. Returns (model, load info, registry status, object that can roll back)
+    server_info = connect_model_server(model_client)
+    if server_info is not None:
+        # A model_server.py on this host owns the model; this process keeps no copy of it
+        model_load_info = dict(
+            server_info,
+            source=f"{server_info['source']} via model_server.py (pid {server_info['server_pid']})",
+            rss_mb=server_info['server_rss_mb'],
+        )
+        return model_client, model_load_info, server_info['status'], model_client
+    # No server: load in-process
+    model_registry = load_model_registry()
+    model, model_load_info = model_registry.current()
+    return model, model_load_info, model_registry.status(), model_registry
 
-with col1:
-    st.header("👤 Dados Pessoais")
-    gender = st.selectbox("Sexo", ["Female", "Male"], format_func=lambda x: "Feminino" if x == "Female" else "Masculino")
-    age = st.number_input("Idade", min_value=1, max_value=120, value=25)
-    height = st.number_input("Altura (m)", min_value=1.0, max_value=2.5, value=1.70, step=0.01)
-    weight = st.number_input("Peso (kg)", min_value=10.0, max_value=300.0, value=70.0, step=0.1)
-    family_history = st.selectbox("Histórico Familiar de Sobrepeso?", ["yes", "no"], format_func=lambda x: "Sim" if x == "yes" else "Não")
+def predict_one(input_data, model, lookup_table):
+    # O(1) table lookup when the request lands inside the precomputed grid
+    if lookup_table is not None:
+        with metrics.stage('lookup'):
+            return lookup_table.predict_one(input_data, partial(predict_live, model=model))
+    return predict_live(input_data, model)
 
-with col2:
-    st.header("🥗 Hábitos Alimentares")
-    favc = st.selectbox("Consumo frequente de comida calórica?", ["yes", "no"], format_func=lambda x: "Sim" if x == "yes" else "Não")
-    fcvc = st.slider("Frequência de consumo de vegetais (1-3)", 1, 3, 2)
-    ncp = st.slider("Número de refeições principais (1-4)", 1, 4, 3)
-    caec = st.selectbox("Consumo de alimentos entre refeições", ["no", "Sometimes", "Frequently", "Always"], 
-                       format_func=lambda x: {"no": "Não", "Sometimes": "Às vezes", "Frequently": "Frequentemente", "Always": "Sempre"}[x])
-    ch2o = st.slider("Consumo diário de água (1-3)", 1, 3, 2)
-    scc = st.selectbox("Monitora calorias diariamente?", ["yes", "no"], format_func=lambda x: "Sim" if x == "yes" else "Não")
+def predict_live(input_data, model):
+    # Fast path skips the DataFrame and ColumnTransformer; every stage is timed
+    from fast_predictor import FastPredictor
+    if isinstance(model, ModelClient):
+        try:
+            with metrics.stage('server.predict'):
+                return model.predict(input_data)
+        except OSError:
+            # model_server.py went away mid-session: answer from this process instead
+            model = load_model_registry().current()[0]
+    if isinstance(model, FastPredictor):
+        with metrics.stage('fast.encode'):
+            encoded = model.transform(input_data)
+        with metrics.stage('fast.forest'):
+            probabilities = model.predict_proba_encoded(encoded)
+        return model.classes_[probabilities[0].argmax()]
+    import pandas as pd
+    from instrumentation import predict_with_stages
+    with metrics.stage('dataframe'):
+        input_df = pd.DataFrame([input_data])
+    return predict_with_stages(model, input_df)[0]
 
-with col3:
-    st.header("🏃 Estilo de Vida e Transporte")
-    faf = st.slider("Frequência de atividade física (0-3)", 0, 3, 1)
-    tue = st.slider("Tempo usando dispositivos eletrônicos (0-2)", 0, 2, 1)
-    smoke = st.selectbox("Fumante?", ["yes", "no"], format_func=lambda x: "Sim" if x == "yes" else "Não")
-    calc = st.selectbox("Consumo de álcool", ["no", "Sometimes", "Frequently", "Always"],
-                       format_func=lambda x: {"no": "Não", "Sometimes": "Às vezes", "Frequently": "Frequentemente", "Always": "Sempre"}[x])
-    mtrans = st.selectbox("Principal meio de transporte", 
-                          ["Public_Transportation", "Automobile", "Motorbike", "Bike", "Walking"],
-                          format_func=lambda x: {"Public_Transportation": "Transporte Público", "Automobile": "Automóvel", 
-                                                 "Motorbike": "Motocicleta", "Bike": "Bicicleta", "Walking": "Caminhada"}[x])
+def explain_prediction(input_data, prediction, model, model_load_info):
+    # (explained class, top contributions), or None when the model has no tree arrays
+    # (e.g. a promoted gbm student) or the model server cannot answer
+    if isinstance(model, ModelClient):
+        if not model_load_info.get('explainable'):
+            return None
+        try:
+            with metrics.stage('explain'):
+                return model.top_contributions(input_data, target=prediction)
+        except (OSError, ValueError):
+            return None
+    explainer = load_explainer(model_load_info['version'], model)
+    if explainer is None:
+        return None
+    from explain import top_contributions
+    with metrics.stage('explain'):
+        return top_contributions(explainer, input_data, target=prediction)
+
+@st.fragment
+def result_section(input_data):
+    # Clicking the button reruns only this function: the header, form and sidebar are
+    # left as they are, and the model is resolved here rather than on every rerun
+    if not st.button("🔍 Avaliar Estado de Saúde", type="primary", width="stretch"):
+        return
+    import pandas as pd
+    from rules import POSITIVE_FACTORS, RISK_FACTORS, active_factors, evaluate_rules
+
+    model, model_load_info, _, _ = model_snapshot()
+    prediction_cache = load_prediction_cache()
+    lookup_table = load_lookup_table(model_load_info['pkl_sha256'])
+    drift_monitor = current_drift_monitor()
+
+    # Get prediction (memoized on the discretized inputs)
+    with metrics.stage('predict'):
+        prediction = prediction_cache.get(input_data, partial(predict_one, model=model, lookup_table=lookup_table),
+                                          model_load_info['version'])
+
+    # Only counters are updated; the request itself is not kept
+    if drift_monitor is not None:
+        with metrics.stage('drift'):
+            drift_monitor.update(input_data, prediction)
+
+    # BMI, BMI override and risk factors from the same engine used for batch scoring
+    with metrics.stage('rules'):
+        rule_result = evaluate_rules(pd.DataFrame([input_data]), [prediction]).iloc[0]
+    bmi = rule_result['BMI']
+
+    # Audit record: only buffered here, the file write happens in the background
+    with metrics.stage('audit_log'):
+        audit_id = load_prediction_log().record(input_data, prediction, bmi, rule_result['bmi_override'],
+                                                rule_result['final_prediction'], model_load_info['version'])
 
-# Prediction Logic
-st.divider()
-if st.button("🔍 Avaliar Estado de Saúde", type="primary", use_container_width=True):
-    # Create a dictionary with the inputs
-    input_data = {
-        'Gender': gender, 'Age': age, 'Height': height, 'Weight': weight,
-        'family_history': family_history, 'FAVC': favc, 'FCVC': fcvc,
-        'NCP': ncp, 'CAEC': caec, 'SMOKE': smoke, 'CH2O': ch2o,
-        'SCC': scc, 'FAF': faf, 'TUE': tue, 'CALC': calc, 'MTRANS': mtrans
-    }
-    
-    # Convert to DataFrame
-    input_df = pd.DataFrame([input_data])
-    
-    # Get prediction
-    prediction = model.predict(input_df)[0]
-    
-    # Calculate BMI
-    bmi = weight / (height ** 2)
-    
     # Display Results with enhanced visualization
     st.divider()
     st.header("📊 Resultados da Avaliação de Saúde")
-    
+
     # Create two columns for metrics
     metric_col1, metric_col2, metric_col3 = st.columns(3)
-    
+
     with metric_col1:
         st.metric(label="📏 IMC Calculado", value=f"{bmi:.1f}")
-    
+
     with metric_col2:
-        st.metric(label="⚖️ Peso", value=f"{weight} kg")
-    
+        st.metric(label="⚖️ Peso", value=f"{input_data['Weight']} kg")
+
     with metric_col3:
-        st.metric(label="📐 Altura", value=f"{height} m")
-    
+        st.metric(label="📐 Altura", value=f"{input_data['Height']} m")
+
     st.divider()
-    
-    # Main result display with color coding
-    model_prediction_key = prediction
 
+    # Main result display with color coding
     # BMI-based sanity check to avoid unrealistic outputs
-    if bmi < 18.5:
-        bmi_prediction_key = "Insufficient_Weight"
-    elif bmi < 25:
-        bmi_prediction_key = "Normal_Weight"
-    elif bmi < 27.5:
-        bmi_prediction_key = "Overweight_Level_I"
-    elif bmi < 30:
-        bmi_prediction_key = "Overweight_Level_II"
-    elif bmi < 35:
-        bmi_prediction_key = "Obesity_Type_I"
-    elif bmi < 40:
-        bmi_prediction_key = "Obesity_Type_II"
-    else:
-        bmi_prediction_key = "Obesity_Type_III"
-
-    severity_order = {
-        "Insufficient_Weight": 0,
-        "Normal_Weight": 1,
-        "Overweight_Level_I": 2,
-        "Overweight_Level_II": 3,
-        "Obesity_Type_I": 4,
-        "Obesity_Type_II": 5,
-        "Obesity_Type_III": 6,
-    }
-
-    model_severity = severity_order.get(model_prediction_key, 1)
-    bmi_severity = severity_order.get(bmi_prediction_key, 1)
-
-    final_prediction_key = model_prediction_key
-    if bmi_severity > model_severity:
-        final_prediction_key = bmi_prediction_key
+    final_prediction_key = rule_result['final_prediction']
+    if rule_result['bmi_override']:
         st.info("⚠️ O resultado foi ajustado com base no IMC para evitar inconsistências em valores extremos.")
 
     result_display = final_prediction_key.replace("_", " ").title()
-    
-    # Define status levels and recommendations
-    status_config = {
-        "Insufficient Weight": {
-            "emoji": "⚠️",
-            "color": "#87CEEB",
-            "message": "Peso Insuficiente",
-            "recommendation": "• Consulte um nutricionista para plano alimentar adequado\n• Avalie possíveis deficiências nutricionais\n• Considere suplementação se necessário",
-            "position": 0
-        },
-        "Normal Weight": {
-            "emoji": "✅",
-            "color": "#28a745",
-            "message": "Peso Normal - Parabéns!",
-            "recommendation": "• Mantenha hábitos alimentares saudáveis\n• Continue praticando atividades físicas regulares\n• Realize check-ups preventivos anuais",
-            "position": 1
-        },
-        "Overweight Level I": {
-            "emoji": "⚡",
-            "color": "#ffc107",
-            "message": "Sobrepeso Nível I",
-            "recommendation": "• Inicie ou intensifique atividade física (150 min/semana)\n• Ajuste padrão alimentar reduzindo calorias\n• Acompanhamento nutricional é recomendado",
-            "position": 2
-        },
-        "Overweight Level Ii": {
-            "emoji": "⚡",
-            "color": "#ff9800",
-            "message": "Sobrepeso Nível II",
-            "recommendation": "• Consulte médico e nutricionista urgentemente\n• Estabeleça meta de redução de peso gradual\n• Atividade física supervisionada é importante",
-            "position": 3
-        },
-        "Obesity Type I": {
-            "emoji": "🔴",
-            "color": "#ff5722",
-            "message": "Obesidade Tipo I",
-            "recommendation": "• Acompanhamento médico multiprofissional necessário\n• Avalie riscos cardiovasculares e metabólicos\n• Plano estruturado de perda de peso com metas\n• Considere apoio psicológico",
-            "position": 4
-        },
-        "Obesity Type Ii": {
-            "emoji": "🔴",
-            "color": "#e53935",
-            "message": "Obesidade Tipo II",
-            "recommendation": "• Tratamento médico intensivo é essencial\n• Avaliação de comorbidades (diabetes, hipertensão)\n• Considere tratamento farmacológico\n• Suporte multidisciplinar completo",
-            "position": 5
-        },
-        "Obesity Type Iii": {
-            "emoji": "🚨",
-            "color": "#b71c1c",
-            "message": "Obesidade Tipo III (Mórbida)",
-            "recommendation": "• Procure atendimento médico especializado IMEDIATAMENTE\n• Avaliação para cirurgia bariátrica pode ser necessária\n• Monitoramento rigoroso de comorbidades\n• Suporte psicológico e nutricional intensivo",
-            "position": 6
-        }
-    }
-    
+    if result_display not in STATUS_CONFIG:
+        result_display = DEFAULT_STATUS
+
     # Get configuration for current prediction
-    config = status_config.get(result_display, status_config["Normal Weight"])
-    
-    # Visual Ruler Scale
+    config = STATUS_CONFIG[result_display]
+
+    ruler_start = time.perf_counter()
+
+    # Visual Ruler Scale (one prebuilt HTML block per class)
     st.markdown("### 📊 Classificação do Estado de Saúde")
-    
-    # Define categories in order
-    categories = [
-        ("Insufficient Weight", "Peso Insuficiente", "#87CEEB", 0),
-        ("Normal Weight", "Peso Normal", "#28a745", 1),
-        ("Overweight Level I", "Sobrepeso Nível I", "#ffc107", 2),
-        ("Overweight Level Ii", "Sobrepeso Nível II", "#ff9800", 3),
-        ("Obesity Type I", "Obesidade Tipo I", "#ff5722", 4),
-        ("Obesity Type Ii", "Obesidade Tipo II", "#e53935", 5),
-        ("Obesity Type Iii", "Obesidade Tipo III", "#b71c1c", 6)
-    ]
-    
-    # Find current position
-    current_position = 1  # default
-    for cat_key, cat_label, cat_color, pos in categories:
-        if cat_key == result_display:
-            current_position = pos
-            break
-    
-    # Calculate arrow position (percentage)
-    arrow_position = (current_position / 6) * 100 + (100 / 14)  # Center of segment
-    
-    # Create the visual ruler with arrow
-    ruler_html = f"""
-    <style>
-    .health-scale-container {{
-        position: relative;
-        width: 100%;
-        margin: 30px 0;
-        padding-top: 60px;
-    }}
-    .arrow-indicator {{
-        position: absolute;
-        top: 0;
-        left: {arrow_position}%;
-        transform: translateX(-50%);
-        text-align: center;
-        z-index: 100;
-        animation: bounce 1.5s ease-in-out infinite;
-    }}
-    @keyframes bounce {{
-        0%, 100% {{ transform: translateX(-50%) translateY(0); }}
-        50% {{ transform: translateX(-50%) translateY(-8px); }}
-    }}
-    .arrow-text {{
-        font-size: 13px;
-        font-weight: bold;
-        color: #333;
-        margin-bottom: 8px;
-        background: white;
-        padding: 5px 12px;
-        border-radius: 8px;
-        box-shadow: 0 2px 6px rgba(0,0,0,0.2);
-        white-space: nowrap;
-    }}
-    .arrow {{
-        font-size: 35px;
-        line-height: 0.8;
-        color: {config['color']};
-        filter: drop-shadow(0 3px 5px rgba(0,0,0,0.4));
-    }}
-    .health-ruler {{
-        display: flex;
-        width: 100%;
-        height: 70px;
-        border-radius: 10px;
-        overflow: hidden;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.15);
-        position: relative;
-        z-index: 1;
-    }}
-    .ruler-segment {{
-        flex: 1;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 12px;
-        font-weight: 600;
-        color: white;
-        text-align: center;
-        text-shadow: 1px 1px 3px rgba(0,0,0,0.4);
-        border-right: 2px solid rgba(255,255,255,0.3);
-        padding: 8px 4px;
-        position: relative;
-        transition: all 0.3s ease;
-    }}
-    .ruler-segment:last-child {{
-        border-right: none;
-    }}
-    .ruler-segment.active {{
-        font-size: 13px;
-        font-weight: 700;
-        box-shadow: inset 0 0 20px rgba(0,0,0,0.3);
-    }}
-    .result-box {{
-        text-align: center;
-        font-size: 28px;
-        margin-top: 25px;
-        padding: 15px;
-        font-weight: bold;
-        color: {config['color']};
-        background: linear-gradient(135deg, rgba(255,255,255,0.9), rgba(240,240,240,0.9));
-        border-radius: 10px;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        border: 3px solid {config['color']};
-    }}
-    </style>
-    <div class="health-scale-container">
-        <div class="arrow-indicator">
-            <div class="arrow-text">Você está aqui</div>
-            <div class="arrow">▼</div>
-        </div>
-        <div class="health-ruler">
-    """
-    
-    for cat_key, cat_label, cat_color, pos in categories:
-        active_class = "active" if cat_key == result_display else ""
-        ruler_html += f'<div class="ruler-segment {active_class}" style="background-color: {cat_color};">{cat_label}</div>'
-    
-    ruler_html += f"""
-        </div>
-        <div class="result-box">{config["emoji"]} {config["message"]}</div>
-    </div>
-    """
-    
-    st.components.v1.html(ruler_html, height=250)
-    
+    st.components.v1.html(RULER_HTML[result_display], height=250)
+    metrics.record('render_ruler', time.perf_counter() - ruler_start)
+
     # Recommendations section
     st.subheader("💡 Recomendações Médicas")
     st.markdown(config["recommendation"])
-    
+
     # Risk factors summary
     st.divider()
     st.subheader("📋 Resumo dos Fatores de Risco")
-    
+
     risk_col1, risk_col2 = st.columns(2)
-    
+
     with risk_col1:
         st.markdown("**Fatores Positivos:**")
-        positive_factors = []
-        if faf >= 2:
-            positive_factors.append("✓ Atividade física regular")
-        if fcvc >= 2:
-            positive_factors.append("✓ Bom consumo de vegetais")
-        if ch2o >= 2:
-            positive_factors.append("✓ Boa hidratação")
-        if scc == "yes":
-            positive_factors.append("✓ Monitora calorias")
-        if smoke == "no":
-            positive_factors.append("✓ Não fumante")
-        if mtrans in ["Bike", "Walking"]:
-            positive_factors.append("✓ Transporte ativo")
-        
+        positive_factors = [f"✓ {label}" for label in active_factors(rule_result, POSITIVE_FACTORS)]
+
         if positive_factors:
             for factor in positive_factors:
                 st.write(factor)
         else:
             st.write("Nenhum fator positivo identificado")
-    
+
     with risk_col2:
         st.markdown("**Fatores de Atenção:**")
-        risk_factors = []
-        if faf == 0:
-            risk_factors.append("⚠ Sedentarismo")
-        if favc == "yes":
-            risk_factors.append("⚠ Alto consumo calórico")
-        if fcvc == 1:
-            risk_factors.append("⚠ Baixo consumo de vegetais")
-        if caec in ["Frequently", "Always"]:
-            risk_factors.append("⚠ Belisca frequentemente")
-        if ch2o == 1:
-            risk_factors.append("⚠ Baixa hidratação")
-        if tue == 2:
-            risk_factors.append("⚠ Muito tempo em telas")
-        if calc in ["Frequently", "Always"]:
-            risk_factors.append("⚠ Alto consumo de álcool")
-        if smoke == "yes":
-            risk_factors.append("⚠ Fumante")
-        
+        risk_factors = [f"⚠ {label}" for label in active_factors(rule_result, RISK_FACTORS)]
+
         if risk_factors:
             for factor in risk_factors:
                 st.write(factor)
         else:
             st.write("Nenhum fator de risco identificado")
-    
+
+    # Model-driven explanation: which inputs moved the forest towards its class
+    explanation = explain_prediction(input_data, prediction, model, model_load_info)
+    if explanation is not None:
+        explained_class, contributions = explanation
+        st.divider()
+        st.subheader("🔎 Variáveis que Mais Influenciaram o Modelo")
+        st.caption(
+            f"Contribuição de cada variável para a probabilidade de "
+            f"**{explained_class.replace('_', ' ').title()}** estimada pelo modelo, em pontos percentuais"
+            + (" (antes do ajuste pelo IMC)." if rule_result['bmi_override'] else ".")
+        )
+        for column, value, contribution in contributions:
+            arrow = "🔺" if contribution >= 0 else "🔻"
+            st.write(f"{arrow} **{column}** = {value}: {contribution * 100:+.1f} p.p.")
+
     # Footer note
     st.divider()
-    st.info("ℹ️ **Nota:** Esta é uma avaliação automatizada para apoio à decisão médica. Sempre consulte um profissional de saúde para diagnóstico e tratamento adequados.")
\ No newline at end of file
+    st.info("ℹ️ **Nota:** Esta é uma avaliação automatizada para apoio à decisão médica. Sempre consulte um profissional de saúde para diagnóstico e tratamento adequados.")
+    if audit_id:
+        st.caption(f"Registro de auditoria: {audit_id}")
+
+model_client = load_model_client()
+
+# Header
+st.title("🏥 Sistema de Avaliação de Risco de Obesidade")
+st.markdown("""
+Esta ferramenta utiliza um modelo de Machine Learning para auxiliar profissionais de saúde na identificação
+de níveis de risco de obesidade baseado em dados físicos e hábitos de vida.
+""")
+
+st.divider()
+
+# Variable Descriptions
+with st.expander("ℹ️ Descrição das Variáveis - Dicionário de Dados"):
+    st.markdown(DATA_DICTIONARY)
+
+st.divider()
+
+# Creating columns for the layout
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.header("👤 Dados Pessoais")
+    gender = st.selectbox("Sexo", ["Female", "Male"], format_func=GENDER_LABELS.get)
+    age = st.number_input("Idade", min_value=1, max_value=120, value=25)
+    height = st.number_input("Altura (m)", min_value=1.0, max_value=2.5, value=1.70, step=0.01)
+    weight = st.number_input("Peso (kg)", min_value=10.0, max_value=300.0, value=70.0, step=0.1)
+    family_history = st.selectbox("Histórico Familiar de Sobrepeso?", ["yes", "no"], format_func=YES_NO_LABELS.get)
+
+with col2:
+    st.header("🥗 Hábitos Alimentares")
+    favc = st.selectbox("Consumo frequente de comida calórica?", ["yes", "no"], format_func=YES_NO_LABELS.get)
+    fcvc = st.slider("Frequência de consumo de vegetais (1-3)", 1, 3, 2)
+    ncp = st.slider("Número de refeições principais (1-4)", 1, 4, 3)
+    caec = st.selectbox("Consumo de alimentos entre refeições", list(FREQUENCY_LABELS), format_func=FREQUENCY_LABELS.get)
+    ch2o = st.slider("Consumo diário de água (1-3)", 1, 3, 2)
+    scc = st.selectbox("Monitora calorias diariamente?", ["yes", "no"], format_func=YES_NO_LABELS.get)
+
+with col3:
+    st.header("🏃 Estilo de Vida e Transporte")
+    faf = st.slider("Frequência de atividade física (0-3)", 0, 3, 1)
+    tue = st.slider("Tempo usando dispositivos eletrônicos (0-2)", 0, 2, 1)
+    smoke = st.selectbox("Fumante?", ["yes", "no"], format_func=YES_NO_LABELS.get)
+    calc = st.selectbox("Consumo de álcool", list(FREQUENCY_LABELS), format_func=FREQUENCY_LABELS.get)
+    mtrans = st.selectbox("Principal meio de transporte", list(TRANSPORT_LABELS), format_func=TRANSPORT_LABELS.get)
+
+# Prediction Logic
+st.divider()
+# Create a dictionary with the inputs
+result_section({
+    'Gender': gender, 'Age': age, 'Height': height, 'Weight': weight,
+    'family_history': family_history, 'FAVC': favc, 'FCVC': fcvc,
+    'NCP': ncp, 'CAEC': caec, 'SMOKE': smoke, 'CH2O': ch2o,
+    'SCC': scc, 'FAF': faf, 'TUE': tue, 'CALC': calc, 'MTRANS': mtrans
+})
+
+# Everything below runs after the form is on screen. Prediction-only reruns of
+# result_section leave the sidebar as is; its counters refresh on the next full rerun
+def stage_table(stage_summary):
+    import pandas as pd
+    return pd.DataFrame(stage_summary).T[['count', 'p50_ms', 'p95_ms', 'max_ms']].astype(float).round(2)
+
+
+def drift_table(drift_scores):
+    import pandas as pd
+    return pd.DataFrame(drift_scores).set_index('feature')[['psi', 'ks', 'unseen', 'alert']].round(3)
+
+
+_, model_load_info, registry_status, model_registry = model_snapshot()
+prediction_cache = load_prediction_cache()
+lookup_table = load_lookup_table(model_load_info['pkl_sha256'])
+drift_monitor = current_drift_monitor()
+
+# Model load and prediction cache counters
+rss_mb = model_load_info['rss_mb']
+st.sidebar.caption(
+    f"Modelo: versão {model_load_info['version']} ({model_load_info['source']}) · "
+    f"carregado às {model_load_info['loaded_at']} em {model_load_info['seconds']*1000:.0f} ms · "
+    f"memória residente {'n/d' if rss_mb is None else f'{rss_mb:.0f} MB'}"
+)
+if registry_status['loading']:
+    st.sidebar.caption("⏳ Carregando nova versão do modelo em segundo plano...")
+if registry_status['last_error']:
+    st.sidebar.caption(f"⚠️ Falha ao carregar nova versão: {registry_status['last_error']}")
+if lookup_table is not None:
+    lookup_stats = lookup_table.stats()
+    st.sidebar.caption(
+        f"Tabela de consulta: {lookup_stats['lookups']} consultas · "
+        f"{lookup_stats['fallback_rate']:.0%} recorreram ao modelo"
+    )
+cache_stats = prediction_cache.stats()
+st.sidebar.caption(
+    f"Cache de predições: {cache_stats['hits']} acertos / {cache_stats['misses']} faltas "
+    f"({cache_stats['hit_rate']:.0%}) · {cache_stats['size']}/{cache_stats['maxsize']} entradas"
+)
+
+# Admin panel: rolling per-stage latency (set OBESITY_METRICS=0 to disable collection)
+with st.sidebar.expander("🛠️ Painel administrativo"):
+    st.caption(
+        f"Versões recarregadas: {registry_status['reloads']} · "
+        f"anterior: {registry_status['previous_version'] or '—'}"
+    )
+    if registry_status['previous_version'] and st.button("↩️ Reverter para a versão anterior"):
+        model_registry.rollback()
+        st.rerun()
+    if not metrics.enabled:
+        st.caption("Métricas de latência desativadas (OBESITY_METRICS=0).")
+    else:
+        stage_summary = metrics.summary()
+        if stage_summary:
+            st.dataframe(
+                stage_table(stage_summary),
+                width="stretch",
+            )
+        else:
+            st.caption("Nenhuma predição registrada ainda.")
+    if drift_monitor is not None:
+        st.markdown("**Deriva dos dados de entrada**")
+        drift_alerts = drift_monitor.alerts()
+        for row in drift_alerts:
+            fired = ", ".join(f"{stat.upper()} {row[stat]:.2f}" for stat in row['fired'])
+            st.warning(f"Deriva detectada em {row['feature']} ({fired})")
+        if drift_monitor.observations < drift_monitor.min_samples:
+            st.caption(
+                f"{drift_monitor.observations}/{drift_monitor.min_samples} requisições observadas; "
+                f"alertas ativados a partir de {drift_monitor.min_samples}."
+            )
+        st.dataframe(
+            drift_table(drift_monitor.scores()),
+            width="stretch",
+        )
+    audit_stats = load_prediction_log().stats()
+    st.caption(
+        f"Registro de auditoria: {audit_stats['written']} gravados · {audit_stats['pending']} pendentes"
+        + (f" · {audit_stats['dropped']} descartados" if audit_stats['dropped'] else "")
+    )
+    if audit_stats['last_error']:
+        st.warning(f"Falha ao gravar o registro de auditoria: {audit_stats['last_error']}")
+    metrics_file = os.environ.get('OBESITY_METRICS_FILE')
+    if metrics.enabled and metrics_file:
+        metrics.dump(metrics_file)
+        st.caption(f"Métricas gravadas em {metrics_file}")
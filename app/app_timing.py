@@ -0,0 +1,119 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.sync.client import connect
+
+from model_utils import APP_DIR
+
+# Times the Streamlit app the way a browser sees it: a headless `streamlit run` is
+# started and driven over its websocket, and the clock runs from the rerun request to
+# the messages coming back.
+#   first paint   cold session, until the form's evaluate button has been received
+#   cold run      until that first script run finishes (sidebar included)
+#   rerun         a plain rerun, as after changing an input widget
+#   click         a click on the evaluate button (a fragment rerun when the button
+#                 lives in an st.fragment), with the same inputs every time
+
+EVALUATE_LABEL = "🔍 Avaliar Estado de Saúde"
+
+# A script holding nothing but the evaluate button: what any rerun costs on this
+# machine before the app does any work of its own
+FLOOR_SCRIPT = f"import streamlit as st\nst.button({EVALUATE_LABEL!r})\n"
+
+
+def wait_for_health(port, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            urllib.request.urlopen(f'http://localhost:{port}/_stcore/health', timeout=1)
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Streamlit did not start on port {port}")
+
+
+def rerun(ws, trigger_id=None, fragment_id=''):
+    # Returns (seconds until the evaluate button arrived, seconds until the run
+    # finished, evaluate button delta or None, number of deltas received)
+    msg = BackMsg()
+    msg.rerun_script.query_string = ''
+    msg.rerun_script.page_script_hash = ''
+    msg.rerun_script.fragment_id = fragment_id
+    if trigger_id is not None:
+        msg.rerun_script.widget_states.widgets.add(id=trigger_id, trigger_value=True)
+    start = time.perf_counter()
+    ws.send(msg.SerializeToString())
+    painted, button, deltas = None, None, 0
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(ws.recv())
+        kind = forward.WhichOneof('type')
+        if kind == 'delta':
+            deltas += 1
+            element = forward.delta.new_element
+            if element.WhichOneof('type') == 'button' and element.button.label == EVALUATE_LABEL:
+                painted, button = time.perf_counter() - start, forward.delta
+        elif kind == 'script_finished':
+            return painted, time.perf_counter() - start, button, deltas
+
+
+def time_app(script, port, reruns):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', script, '--server.headless', 'true',
+         '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_health(port)
+        with connect(f'ws://localhost:{port}/_stcore/stream', subprotocols=['streamlit'], max_size=None) as ws:
+            first_paint, cold_run, button, _ = rerun(ws)
+            if button is None:
+                raise RuntimeError(f"No '{EVALUATE_LABEL}' button in {script}")
+            full = [rerun(ws)[1] for _ in range(reruns)]
+            clicks = [rerun(ws, button.new_element.button.id, button.fragment_id) for _ in range(reruns)]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        'first_paint_ms': first_paint * 1e3,
+        'cold_run_ms': cold_run * 1e3,
+        'rerun_p50_ms': float(np.median(full)) * 1e3,
+        'click_p50_ms': float(np.median([c[1] for c in clicks])) * 1e3,
+        'click_deltas': clicks[-1][3],
+        'fragment': bool(button.fragment_id),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure first paint and rerun times of the Streamlit app.")
+    parser.add_argument('--script', default=os.path.join(APP_DIR, 'app.py'), help="Streamlit script to time")
+    parser.add_argument('--port', type=int, default=8599, help="Port for the temporary headless server")
+    parser.add_argument('--reruns', type=int, default=30, help="Timed reruns and clicks")
+    parser.add_argument('--floor', action='store_true', help="Also time a script with only the evaluate button")
+    args = parser.parse_args()
+
+    scripts = [args.script]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.floor:
+            scripts.append(os.path.join(tmp, 'floor.py'))
+            with open(scripts[-1], 'w', encoding='utf-8') as f:
+                f.write(FLOOR_SCRIPT)
+        for script in scripts:
+            result = time_app(script, args.port, args.reruns)
+            print(f"{os.path.basename(script)}: first paint {result['first_paint_ms']:.0f} ms, "
+                  f"cold run {result['cold_run_ms']:.0f} ms")
+            print(f"  rerun p50 {result['rerun_p50_ms']:.1f} ms, evaluate click p50 {result['click_p50_ms']:.1f} ms "
+                  f"({result['click_deltas']} elements sent, "
+                  f"{'fragment rerun' if result['fragment'] else 'full rerun'})")
+
+
+if __name__ == '__main__':
+    main()
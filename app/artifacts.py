@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+
+from fast_predictor import FastPredictor, flatten_pipeline
+from model_utils import APP_DIR
+
+# Versioned model artifact directories:
+#
+#   model_artifacts/
+#     LATEST                  name of the newest version
+#     <version>/
+#       metadata.json         feature schema, class order, library versions, content hash
+#       arrays/*.npy          flattened scaler + forest, loaded with mmap_mode='r' so the
+#                             page cache is shared read-only between app workers
+#       pipeline.joblib.z     compressed copy of the full sklearn pipeline
+#
+# The sklearn Tree copies its nodes on unpickling, so memory mapping only pays off
+# for the flattened arrays served by FastPredictor.
+
+ARTIFACT_ROOT = os.path.join(APP_DIR, 'model_artifacts')
+FORMAT_VERSION = 1
+# Rewritten as the very last step of every publish; model_registry.py reloads only
+# when it changes, so it never sees a half-published set of files
+PUBLISHED_MARKER = 'PUBLISHED'
+
+
+def _content_hash(array_dir, names):
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        digest.update(name.encode())
+        with open(os.path.join(array_dir, f'{name}.npy'), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def write_artifact(pipeline, root=ARTIFACT_ROOT, keep=5):
+    import sklearn
+
+    meta, arrays = flatten_pipeline(pipeline)
+    os.makedirs(root, exist_ok=True)
+    version = time.strftime('%Y%m%d-%H%M%S')
+    staging = os.path.join(root, f'.{version}-{os.getpid()}.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    array_dir = os.path.join(staging, 'arrays')
+    os.makedirs(array_dir)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(array_dir, f'{name}.npy'), np.ascontiguousarray(array))
+    joblib.dump(pipeline, os.path.join(staging, 'pipeline.joblib.z'), compress=3)
+
+    content_hash = _content_hash(array_dir, arrays)
+    version = f'{version}-{content_hash[:8]}'
+    metadata = dict(
+        meta,
+        format_version=FORMAT_VERSION,
+        version=version,
+        created_at=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        sklearn_version=sklearn.__version__,
+        numpy_version=np.__version__,
+        content_hash=content_hash,
+        arrays={name: {'dtype': str(a.dtype), 'shape': list(a.shape)} for name, a in arrays.items()},
+    )
+    with open(os.path.join(staging, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    # Publish atomically: readers only ever see complete version directories
+    final_dir = os.path.join(root, version)
+    try:
+        os.replace(staging, final_dir)
+    except OSError:
+        # The same content published within the same second: that version directory
+        # is already complete, so it is simply made LATEST again
+        if read_metadata(final_dir)['content_hash'] != content_hash:
+            raise
+        shutil.rmtree(staging, ignore_errors=True)
+    _write_latest(root, version)
+    _prune(root, keep)
+    return final_dir
+
+
+def _write_latest(root, version):
+    tmp_path = os.path.join(root, 'LATEST.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, 'LATEST'))
+
+
+def list_versions(root=ARTIFACT_ROOT):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if not name.startswith('.') and os.path.isfile(os.path.join(root, name, 'metadata.json'))
+    )
+
+
+def _prune(root, keep):
+    for version in list_versions(root)[:-keep]:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def latest_artifact_dir(root=ARTIFACT_ROOT):
+    latest_path = os.path.join(root, 'LATEST')
+    if not os.path.exists(latest_path):
+        return None
+    with open(latest_path) as f:
+        path = os.path.join(root, f.read().strip())
+    return path if os.path.isfile(os.path.join(path, 'metadata.json')) else None
+
+
+def read_metadata(path):
+    with open(os.path.join(path, 'metadata.json')) as f:
+        return json.load(f)
+
+
+def load_artifact(path=None, mmap_mode='r', verify=False):
+    path = path or latest_artifact_dir()
+    if path is None:
+        raise FileNotFoundError(f"No model artifact found under '{ARTIFACT_ROOT}'")
+    metadata = read_metadata(path)
+    if metadata['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {metadata['format_version']} in '{path}'")
+
+    array_dir = os.path.join(path, 'arrays')
+    if verify and _content_hash(array_dir, metadata['arrays']) != metadata['content_hash']:
+        raise ValueError(f"Content hash mismatch for artifact '{path}'")
+    arrays = {name: np.load(os.path.join(array_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+              for name in metadata['arrays']}
+    predictor = FastPredictor(metadata, arrays)
+    predictor.version = metadata['version']
+    return predictor
+
+
+def retire_exports(model_path, artifact_root=ARTIFACT_ROOT, drop_tree_exports=False):
+    # Removes exports derived from the model being replaced, so they are never served
+    # alongside the new one: the quantized forest always (quantize.py must be re-run),
+    # and for a model without tree arrays also the .npz fast path and LATEST (the
+    # version directories stay for reference). Returns the removed paths.
+    model_dir = os.path.dirname(os.path.abspath(model_path))
+    stale = [os.path.join(model_dir, 'model_quantized.npz')]
+    if drop_tree_exports:
+        stale += [os.path.join(model_dir, 'model_fast.npz'), os.path.join(artifact_root, 'LATEST')]
+    removed = []
+    for path in stale:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed.append(path)
+    return removed
+
+
+def mark_published(artifact_root=ARTIFACT_ROOT, **details):
+    os.makedirs(artifact_root, exist_ok=True)
+    tmp_path = os.path.join(artifact_root, f'{PUBLISHED_MARKER}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(details, published_at=time.strftime('%Y-%m-%dT%H:%M:%S'), nonce=os.urandom(8).hex()), f)
+    os.replace(tmp_path, os.path.join(artifact_root, PUBLISHED_MARKER))
+
+
+def read_published(artifact_root=ARTIFACT_ROOT):
+    try:
+        with open(os.path.join(artifact_root, PUBLISHED_MARKER)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def publish_model(pipeline, model_path, artifact_root=ARTIFACT_ROOT):
+    # Save every serving format the app understands: the pickled pipeline, the
+    # .npz fast path next to it and a new artifact version. Classifiers without
+    # tree arrays are only pickled, and the previous model's fast-path exports are
+    # removed so the app serves model_pipeline.pkl.
+    from fast_predictor import export_fast_model, tree_estimators
+
+    has_trees = tree_estimators(pipeline.named_steps['classifier']) is not None
+    retire_exports(model_path, artifact_root, drop_tree_exports=not has_trees)
+    joblib.dump(pipeline, model_path)
+    if not has_trees:
+        mark_published(artifact_root, model=os.path.basename(model_path))
+        return None, None
+    fast_path = export_fast_model(pipeline, os.path.join(os.path.dirname(model_path), 'model_fast.npz'))
+    artifact_dir = write_artifact(pipeline, artifact_root)
+    mark_published(artifact_root, model=os.path.basename(model_path), artifact=os.path.basename(artifact_dir))
+    return fast_path, artifact_dir
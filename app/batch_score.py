@@ -0,0 +1,72 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_utils import FEATURE_COLUMNS, MODEL_PATH, load_pipeline, preprocess_raw_data
+from rules import evaluate_rules
+
+# Batch scoring: streams a CSV with the same 16 feature columns as data/Obesity.csv
+# through the trained pipeline chunk by chunk, so memory stays flat for any file size.
+
+
+def score_frame(model, chunk):
+    features = preprocess_raw_data(chunk[FEATURE_COLUMNS])
+    # A header-only file still gets the output columns; sklearn rejects 0 samples
+    if len(features):
+        probabilities = model.predict_proba(features)
+    else:
+        probabilities = np.empty((0, len(model.classes_)))
+    model_keys = model.classes_[np.argmax(probabilities, axis=1)]
+
+    # BMI override and risk/positive factor flags from the shared rules engine
+    result = evaluate_rules(features, model_keys)
+    result['BMI'] = result['BMI'].round(2)
+    proba_df = pd.DataFrame(
+        probabilities, columns=[f'proba_{c}' for c in model.classes_], index=chunk.index
+    )
+    return pd.concat([result, proba_df], axis=1)
+
+
+def score_csv(input_path, output_path, model_path=MODEL_PATH, chunksize=50_000, keep_inputs=True):
+    # Load the pipeline once and reuse it for every chunk
+    model = load_pipeline(model_path)
+
+    total_rows = 0
+    start = time.perf_counter()
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        chunk_start = time.perf_counter()
+        scored = score_frame(model, chunk)
+        if keep_inputs:
+            scored = pd.concat([chunk, scored], axis=1)
+        scored.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+
+        total_rows += len(chunk)
+        chunk_elapsed = time.perf_counter() - chunk_start
+        print(f"Chunk {i + 1}: {len(chunk)} rows in {chunk_elapsed:.2f}s "
+              f"({len(chunk) / max(chunk_elapsed, 1e-9):,.0f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {total_rows} rows in {elapsed:.2f}s "
+          f"({total_rows / max(elapsed, 1e-9):,.0f} rows/s) -> {output_path}")
+    return total_rows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a patient CSV with the trained obesity pipeline.")
+    parser.add_argument('input', help="CSV with the same feature columns as data/Obesity.csv")
+    parser.add_argument('output', help="Destination CSV for predictions and class probabilities")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--chunksize', type=int, default=50_000, help="Rows read and scored per chunk")
+    parser.add_argument('--predictions-only', action='store_true',
+                        help="Write only the prediction columns, without echoing the inputs")
+    args = parser.parse_args()
+
+    score_csv(args.input, args.output, model_path=args.model,
+              chunksize=args.chunksize, keep_inputs=not args.predictions_only)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.model_selection import train_test_split
+
+from model_utils import APP_DIR, FEATURE_COLUMNS, MODEL_PATH, preprocess_raw_data
+from modeling import build_pipeline, load_dataset
+from synthetic import make_synthetic_patients
+
+# Benchmark harness: training fit time, model load time, single-row latency and batch
+# throughput. Results are written as JSON and compared against a stored baseline;
+# the run exits non-zero when a metric regresses past its threshold.
+
+DEFAULT_BASELINE = os.path.join(APP_DIR, 'benchmark_baseline.json')
+DEFAULT_SIZES = [1, 100, 10_000, 1_000_000]
+
+# Same dict shape the Streamlit app builds on every click
+APP_INPUT = {
+    'Gender': 'Female', 'Age': 25, 'Height': 1.70, 'Weight': 70.0,
+    'family_history': 'yes', 'FAVC': 'yes', 'FCVC': 2,
+    'NCP': 3, 'CAEC': 'Sometimes', 'SMOKE': 'no', 'CH2O': 2,
+    'SCC': 'no', 'FAF': 1, 'TUE': 1, 'CALC': 'no', 'MTRANS': 'Public_Transportation'
+}
+
+
+def bench_fit(data_path, repeats):
+    X, y = load_dataset(data_path)
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        build_pipeline().fit(X_train, y_train)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def bench_load(model_path, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        joblib.load(model_path)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def bench_single_row(model, iterations, warmup=20):
+    for _ in range(warmup):
+        model.predict(pd.DataFrame([APP_INPUT]))
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        model.predict(pd.DataFrame([APP_INPUT]))
+        timings[i] = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(timings * 1000, [50, 95, 99])
+    return {'single_row_p50_ms': float(p50), 'single_row_p95_ms': float(p95), 'single_row_p99_ms': float(p99)}
+
+
+def bench_throughput(model, sizes, source):
+    metrics = {}
+    for size in sizes:
+        frame = preprocess_raw_data(make_synthetic_patients(size, random_state=size, source=source))
+        start = time.perf_counter()
+        model.predict_proba(frame[FEATURE_COLUMNS])
+        elapsed = time.perf_counter() - start
+        metrics[f'throughput_{size}_rows_per_s'] = size / elapsed
+        print(f"  {size:>9,} rows: {elapsed:.3f}s ({size / elapsed:,.0f} rows/s)")
+    return metrics
+
+
+def lower_is_better(metric):
+    return not metric.startswith('throughput_')
+
+
+def compare(metrics, baseline, threshold, overrides):
+    regressions = []
+    for name, value in metrics.items():
+        if name not in baseline:
+            continue
+        limit = overrides.get(name, threshold)
+        reference = baseline[name]
+        change = (value - reference) / reference if reference else 0.0
+        worse = change > limit if lower_is_better(name) else -change > limit
+        status = 'REGRESSION' if worse else 'ok'
+        print(f"  {name:<36} {value:>14.4f} vs {reference:>14.4f} ({change:+.1%}) {status}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def parse_overrides(items):
+    overrides = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        overrides[name] = float(value)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training and inference of the obesity pipeline.")
+    parser.add_argument('--data', default='data/Obesity.csv', help="Training CSV and synthetic data source")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the results JSON")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Stored baseline results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative regression per metric (0.25 = 25%%)")
+    parser.add_argument('--metric-threshold', action='append', metavar='NAME=VALUE',
+                        help="Per-metric threshold override, e.g. single_row_p99_ms=0.5")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Batch sizes for throughput")
+    parser.add_argument('--repeats', type=int, default=3, help="Repeats for fit and load timings")
+    parser.add_argument('--iterations', type=int, default=500, help="Single-row predictions to time")
+    args = parser.parse_args()
+
+    print("Training fit time...")
+    metrics = {'fit_seconds': bench_fit(args.data, args.repeats)}
+    print("Model load time...")
+    metrics['load_seconds'] = bench_load(args.model, args.repeats)
+    model = joblib.load(args.model)
+    print("Single-row latency...")
+    metrics.update(bench_single_row(model, args.iterations))
+    print("Batch throughput...")
+    metrics.update(bench_throughput(model, args.sizes, pd.read_csv(args.data)))
+
+    results = {
+        'metadata': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'sklearn': sklearn.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'metrics': metrics,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved as '{args.output}'")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated at '{args.baseline}'")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at '{args.baseline}'; run with --update-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['metrics']
+    print(f"Comparing against '{args.baseline}' (threshold {args.threshold:.0%})")
+    regressions = compare(metrics, baseline, args.threshold, parse_overrides(args.metric_threshold))
+    if regressions:
+        raise SystemExit(f"Performance regression in: {', '.join(regressions)}")
+    print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from model_utils import APP_DIR, CATEGORICAL_FEATURES, DATA_PATH, TARGET_COLUMN, preprocess_raw_data
+
+# Shared data loading: a CSV with the Obesity.csv schema is parsed once, cleaned with
+# preprocess_raw_data and stored as a typed columnar (Parquet) cache next to the data.
+# Later loads read the cache directly for as long as the source file is unchanged.
+
+CACHE_DIR = os.path.normpath(os.path.join(APP_DIR, '..', 'data', '.cache'))
+CACHE_FORMAT_VERSION = 1
+
+# Explicit dtypes for the cleaned frame: categoricals for the text columns, small
+# ints for the rounded scales; Height/Weight stay float64 so predictions are unchanged
+COLUMN_DTYPES = {
+    **{col: 'category' for col in CATEGORICAL_FEATURES + [TARGET_COLUMN]},
+    'Age': 'int16',
+    'FCVC': 'int8', 'NCP': 'int8', 'CH2O': 'int8', 'FAF': 'int8', 'TUE': 'int8',
+    'Height': 'float64', 'Weight': 'float64',
+}
+RAW_DTYPES = {col: ('category' if dtype == 'category' else 'float64') for col, dtype in COLUMN_DTYPES.items()}
+
+
+def to_typed_frame(df):
+    df = preprocess_raw_data(df)
+    return df.astype({col: dtype for col, dtype in COLUMN_DTYPES.items() if col in df.columns})
+
+
+def read_csv_typed(path):
+    # Categories are assigned while parsing instead of materializing Python strings
+    return to_typed_frame(pd.read_csv(path, dtype=RAW_DTYPES))
+
+
+def _cache_paths(path):
+    source = os.path.abspath(path)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    key = hashlib.sha1(source.encode()).hexdigest()[:8]
+    base = os.path.join(CACHE_DIR, f'{stem}-{key}')
+    return base + '.parquet', base + '.json'
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'source': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'format_version': CACHE_FORMAT_VERSION}
+
+
+def load_patients(path=DATA_PATH, use_cache=True):
+    if not use_cache:
+        return read_csv_typed(path)
+
+    cache_path, manifest_path = _cache_paths(path)
+    signature = _source_signature(path)
+    if os.path.exists(cache_path) and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) == signature:
+                return pd.read_parquet(cache_path)
+
+    df = read_csv_typed(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)
+    with open(manifest_path, 'w') as f:
+        json.dump(signature, f)
+    return df
+
+
+def _measure(label, load, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = load()
+        timings.append(time.perf_counter() - start)
+    memory_mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"  {label:<34} {min(timings)*1000:>9.1f} ms  {memory_mb:>8.1f} MB")
+    return min(timings), memory_mb
+
+
+def benchmark(path, repeats=3):
+    print(f"Loading '{path}' ({os.path.getsize(path) / 1e6:.1f} MB on disk)")
+    baseline, baseline_mb = _measure("read_csv + preprocess_raw_data", lambda: preprocess_raw_data(pd.read_csv(path)), repeats)
+    _measure("typed read_csv (cache miss)", lambda: read_csv_typed(path), repeats)
+    load_patients(path)
+    cached, cached_mb = _measure("columnar cache (cache hit)", lambda: load_patients(path), repeats)
+    print(f"  cache hit is {baseline / cached:.1f}x faster and uses {baseline_mb / cached_mb:.1f}x less memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the typed columnar cache and benchmark it against read_csv.")
+    parser.add_argument('path', nargs='?', default=DATA_PATH, help="CSV with the Obesity.csv schema")
+    parser.add_argument('--synthetic-rows', type=int, default=0,
+                        help="Benchmark on a synthetic extract of this many rows instead of PATH")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    path = args.path
+    if args.synthetic_rows:
+        from synthetic import make_synthetic_patients
+
+        path = os.path.join(CACHE_DIR, f'synthetic_{args.synthetic_rows}.csv')
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        make_synthetic_patients(args.synthetic_rows, source=pd.read_csv(args.path),
+                                include_target=True).to_csv(path, index=False)
+    benchmark(path, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import os
+import pickle
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+from artifacts import publish_model, retire_exports
+from benchmark import APP_INPUT
+from fast_predictor import tree_estimators
+from model_utils import APP_DIR, DATA_PATH, FEATURE_COLUMNS, MODEL_PATH
+from modeling import load_dataset
+from synthetic import make_synthetic_patients
+
+# Distillation of the RandomForest teacher into a compact student. The student is fit
+# on the teacher's predict_proba outputs over the training rows plus synthetic
+# patients: every transfer row is expanded into one weighted row per class, with the
+# teacher probability as sample weight, so leaves learn the teacher's soft labels.
+# The student is only exported when its held-out accuracy stays within a tolerance
+# of the teacher's.
+
+STUDENT_PATH = os.path.join(APP_DIR, 'model_student.pkl')
+
+
+def build_student(kind, max_depth, ccp_alpha, random_state=42):
+    if kind == 'tree':
+        # Pruned single tree: still served by the NumPy fast path and artifacts
+        return DecisionTreeClassifier(max_depth=max_depth, ccp_alpha=ccp_alpha,
+                                      min_samples_leaf=5, random_state=random_state)
+    if kind == 'gbm':
+        return HistGradientBoostingClassifier(max_depth=max_depth, max_iter=100,
+                                              learning_rate=0.1, random_state=random_state)
+    raise ValueError(f"Unknown student kind '{kind}'")
+
+
+def soft_label_dataset(X_encoded, probabilities, classes):
+    # One row per (sample, class) with non-zero teacher probability
+    rows, class_index = np.nonzero(probabilities)
+    return X_encoded[rows], np.asarray(classes, dtype=object)[class_index], probabilities[rows, class_index]
+
+
+def distill(teacher, X_transfer, kind='tree', max_depth=8, ccp_alpha=0.0):
+    preprocessor = teacher.named_steps['preprocessor']
+    X_encoded = preprocessor.transform(X_transfer)
+    probabilities = teacher.predict_proba(X_transfer)
+    X_soft, y_soft, weights = soft_label_dataset(X_encoded, probabilities, teacher.classes_)
+
+    student = build_student(kind, max_depth, ccp_alpha)
+    start = time.perf_counter()
+    student.fit(X_soft, y_soft, sample_weight=weights)
+    fit_seconds = time.perf_counter() - start
+    # The teacher's fitted preprocessor is shared, so both models see identical features
+    return Pipeline(steps=[('preprocessor', preprocessor), ('classifier', student)]), fit_seconds
+
+
+def profile(model, X_test, y_test, teacher_predictions=None, iterations=200):
+    input_df = pd.DataFrame([APP_INPUT])
+    model.predict(input_df)
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        model.predict(pd.DataFrame([APP_INPUT]))
+        timings[i] = time.perf_counter() - start
+
+    batch = pd.concat([X_test] * max(1, 10_000 // len(X_test)), ignore_index=True)
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+
+    predictions = model.predict(X_test)
+    return {
+        'accuracy': accuracy_score(y_test, predictions),
+        'agreement': float(np.mean(predictions == teacher_predictions)) if teacher_predictions is not None else 1.0,
+        'size_kb': len(pickle.dumps(model.named_steps['classifier'])) / 1024,
+        'single_row_p50_ms': float(np.median(timings) * 1000),
+        'batch_rows_per_s': len(batch) / batch_seconds,
+    }
+
+
+def print_report(teacher_stats, student_stats):
+    print(f"{'':<12}{'accuracy':>10}{'agreement':>11}{'size (KB)':>12}{'p50 (ms)':>10}{'rows/s':>12}")
+    for name, stats in (('teacher', teacher_stats), ('student', student_stats)):
+        print(f"{name:<12}{stats['accuracy']*100:>9.2f}%{stats['agreement']*100:>10.2f}%"
+              f"{stats['size_kb']:>12,.0f}{stats['single_row_p50_ms']:>10.2f}{stats['batch_rows_per_s']:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the RandomForest into a compact student model.")
+    parser.add_argument('--data', default=DATA_PATH, help="Training CSV (same split as train.py)")
+    parser.add_argument('--teacher', default=MODEL_PATH, help="Path to the teacher model_pipeline.pkl")
+    parser.add_argument('--student', choices=['tree', 'gbm'], default='tree', help="Student model family")
+    parser.add_argument('--max-depth', type=int, default=12, help="Depth of the student tree(s)")
+    parser.add_argument('--ccp-alpha', type=float, default=0.0, help="Cost-complexity pruning for --student tree")
+    parser.add_argument('--synthetic-rows', type=int, default=50_000, help="Synthetic transfer samples")
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Maximum held-out accuracy drop versus the teacher (0.01 = 1 point)")
+    parser.add_argument('--output', default=STUDENT_PATH, help="Where to save the accepted student")
+    parser.add_argument('--promote', action='store_true',
+                        help="Also serve the accepted student in place of the teacher (teacher kept as model_teacher.pkl)")
+    args = parser.parse_args()
+
+    teacher = joblib.load(args.teacher)
+    X, y = load_dataset(args.data)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+
+    # Transfer set: training rows plus synthetic patients resampled from them only,
+    # so the held-out rows never leak into distillation
+    synthetic = make_synthetic_patients(args.synthetic_rows, random_state=7, source=X_train)
+    X_transfer = pd.concat([X_train[FEATURE_COLUMNS], synthetic[FEATURE_COLUMNS]], ignore_index=True)
+    X_transfer = X_transfer.astype(X_train[FEATURE_COLUMNS].dtypes.to_dict())
+
+    student, fit_seconds = distill(teacher, X_transfer, args.student, args.max_depth, args.ccp_alpha)
+    print(f"Student ({args.student}, max_depth={args.max_depth}) fit on {len(X_transfer):,} transfer rows "
+          f"in {fit_seconds:.1f}s")
+
+    teacher_predictions = teacher.predict(X_test)
+    teacher_stats = profile(teacher, X_test, y_test)
+    student_stats = profile(student, X_test, y_test, teacher_predictions)
+    print_report(teacher_stats, student_stats)
+
+    drop = teacher_stats['accuracy'] - student_stats['accuracy']
+    if drop > args.tolerance:
+        raise SystemExit(f"Student rejected: accuracy drop {drop*100:.2f} points exceeds "
+                         f"tolerance {args.tolerance*100:.2f}")
+
+    joblib.dump(student, args.output)
+    print(f"Student accepted (accuracy drop {drop*100:.2f} points) and saved as '{args.output}'")
+    if args.promote:
+        model_dir = os.path.dirname(os.path.abspath(args.teacher))
+        teacher_backup = os.path.join(model_dir, 'model_teacher.pkl')
+        shutil.copy2(args.teacher, teacher_backup)
+        artifact_root = os.path.join(model_dir, 'model_artifacts')
+        # The teacher's exports must not outlive it; a student without tree arrays
+        # (gbm) has no fast path, so the app serves the pickle alone
+        removed = retire_exports(args.teacher, artifact_root,
+                                 drop_tree_exports=tree_estimators(student.named_steps['classifier']) is None)
+        _, artifact_dir = publish_model(student, args.teacher, artifact_root)
+        print(f"Student promoted to '{args.teacher}' (teacher kept as '{teacher_backup}'"
+              + (f", artifact '{artifact_dir}')" if artifact_dir else ", served from the pickle only)"))
+        for path in removed:
+            print(f"  removed the teacher's export '{path}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_utils import (APP_DIR, CATEGORICAL_FEATURES, DATA_PATH, FEATURE_COLUMNS, MODEL_PATH, load_pipeline,
+                         preprocess_raw_data)
+from rules import compute_bmi
+
+# Input-distribution drift monitor. train.py saves a reference profile of the training
+# inputs (quantile histograms for the continuous features, frequency counts for the
+# categorical and slider features, and the model's class mix on the held-out split).
+# Live requests only increment fixed-size counters laid out like the reference, so
+# memory per feature is constant and no raw request is ever stored. PSI (and a binned
+# KS distance for the histograms) is recomputed from the counters on demand.
+
+DRIFT_REFERENCE_PATH = os.path.join(APP_DIR, 'drift_reference.json')
+HISTOGRAM_FEATURES = ['Age', 'Height', 'Weight', 'BMI']
+SLIDER_FEATURES = ['FCVC', 'NCP', 'CH2O', 'FAF', 'TUE']
+COUNT_FEATURES = CATEGORICAL_FEATURES + SLIDER_FEATURES
+PREDICTION_FEATURE = 'prediction'
+HISTOGRAM_BINS = 10
+
+# PSI > 0.2 is the usual "significant shift" rule of thumb; the binned KS distance is
+# the largest gap between the two cumulative distributions
+DEFAULT_THRESHOLDS = {'psi': 0.2, 'ks': 0.15}
+MIN_SAMPLES = 200
+PSI_EPSILON = 1e-4
+
+
+def category_keys(feature, values):
+    values = np.asarray(values)
+    if feature in SLIDER_FEATURES:
+        return np.round(values.astype(float)).astype(int).astype(str)
+    return values.astype(str)
+
+
+def with_bmi(X):
+    return {**{f: np.asarray(X[f]) for f in FEATURE_COLUMNS}, 'BMI': compute_bmi(X['Height'], X['Weight'])}
+
+
+def build_reference(X, predictions, bins=HISTOGRAM_BINS):
+    columns = with_bmi(X)
+    histograms = {}
+    for feature in HISTOGRAM_FEATURES:
+        values = columns[feature].astype(float)
+        # Interior quantile edges: every reference bin holds ~1/bins of the rows
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        histograms[feature] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+    counts = {}
+    for feature in COUNT_FEATURES:
+        keys, frequency = np.unique(category_keys(feature, columns[feature]), return_counts=True)
+        counts[feature] = dict(zip(keys.tolist(), frequency.tolist()))
+    keys, frequency = np.unique(np.asarray(predictions).astype(str), return_counts=True)
+    counts[PREDICTION_FEATURE] = dict(zip(keys.tolist(), frequency.tolist()))
+
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rows': int(len(X)),
+        'histograms': histograms,
+        'counts': counts,
+    }
+
+
+def extend_reference(reference, X, predictions):
+    # Adds newly absorbed training rows (train.py --incremental) without re-reading the
+    # old data: histogram edges stay fixed and every count is summed. The bins then
+    # drift away from equal frequency, which PSI and KS do not require.
+    columns = with_bmi(X)
+    histograms = {}
+    for feature, histogram in reference['histograms'].items():
+        edges = np.asarray(histogram['edges'])
+        index = np.searchsorted(edges, columns[feature].astype(float), side='right')
+        counts = np.asarray(histogram['counts']) + np.bincount(index, minlength=len(edges) + 1)
+        histograms[feature] = {'edges': histogram['edges'], 'counts': counts.tolist()}
+
+    new_keys = {feature: category_keys(feature, columns[feature]) for feature in COUNT_FEATURES}
+    new_keys[PREDICTION_FEATURE] = np.asarray(predictions).astype(str)
+    counts = {}
+    for feature, keys in new_keys.items():
+        merged = dict(reference['counts'][feature])
+        for key, frequency in zip(*np.unique(keys, return_counts=True)):
+            merged[str(key)] = merged.get(str(key), 0) + int(frequency)
+        counts[feature] = merged
+
+    return dict(reference, created_at=time.strftime('%Y-%m-%dT%H:%M:%S'), rows=reference['rows'] + int(len(X)),
+                histograms=histograms, counts=counts)
+
+
+def save_reference(reference, path=DRIFT_REFERENCE_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(reference, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_reference(path=DRIFT_REFERENCE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, actual):
+    expected = np.maximum(np.asarray(expected, dtype=float) / max(np.sum(expected), 1), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=float) / max(np.sum(actual), 1), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(expected, actual):
+    expected = np.cumsum(expected) / max(np.sum(expected), 1)
+    actual = np.cumsum(actual) / max(np.sum(actual), 1)
+    return float(np.max(np.abs(actual - expected)))
+
+
+class DriftMonitor:
+    def __init__(self, reference, thresholds=None, min_samples=MIN_SAMPLES):
+        self.reference = reference
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.min_samples = min_samples
+        self.observations = 0
+        self._lock = threading.Lock()
+
+        self._edges = {f: np.array(h['edges']) for f, h in reference['histograms'].items()}
+        self._expected = {f: np.array(h['counts']) for f, h in reference['histograms'].items()}
+        self._slots = {}
+        for feature, frequency in reference['counts'].items():
+            # Values never seen in training share one overflow slot
+            self._slots[feature] = {key: i for i, key in enumerate(frequency)}
+            self._expected[feature] = np.array(list(frequency.values()) + [0])
+        self._counts = {f: np.zeros(len(e), dtype=np.int64) for f, e in self._expected.items()}
+
+    def _slot_indices(self, feature, keys):
+        slots = self._slots[feature]
+        uniques, inverse = np.unique(keys, return_inverse=True)
+        return np.array([slots.get(k, len(slots)) for k in uniques])[inverse]
+
+    def update_frame(self, X, predictions):
+        columns = with_bmi(X)
+        increments = {}
+        for feature, edges in self._edges.items():
+            index = np.searchsorted(edges, columns[feature].astype(float), side='right')
+            increments[feature] = np.bincount(index, minlength=len(edges) + 1)
+        for feature in COUNT_FEATURES:
+            index = self._slot_indices(feature, category_keys(feature, columns[feature]))
+            increments[feature] = np.bincount(index, minlength=len(self._counts[feature]))
+        index = self._slot_indices(PREDICTION_FEATURE, np.asarray(predictions).astype(str))
+        increments[PREDICTION_FEATURE] = np.bincount(index, minlength=len(self._counts[PREDICTION_FEATURE]))
+
+        with self._lock:
+            for feature, increment in increments.items():
+                self._counts[feature] += increment
+            self.observations += len(columns['BMI'])
+
+    def update(self, input_data, prediction):
+        # One app request: a one-row column dict, no DataFrame needed
+        self.update_frame({f: [input_data[f]] for f in FEATURE_COLUMNS}, [prediction])
+
+    def scores(self):
+        with self._lock:
+            counts = {f: c.copy() for f, c in self._counts.items()}
+            observations = self.observations
+        enough = observations >= self.min_samples
+        rows = []
+        for feature, actual in counts.items():
+            expected = self._expected[feature]
+            row = {'feature': feature, 'psi': psi(expected, actual), 'ks': None}
+            if feature in self._edges:
+                row['ks'] = binned_ks(expected, actual)
+            row['unseen'] = int(actual[-1]) if feature not in self._edges else 0
+            # The statistics over their threshold, so alerts can name what fired
+            row['fired'] = [stat for stat in ('psi', 'ks')
+                            if enough and row[stat] is not None and row[stat] > self.thresholds[stat]]
+            row['alert'] = bool(row['fired'])
+            rows.append(row)
+        return rows
+
+    def alerts(self):
+        return [row for row in self.scores() if row['alert']]
+
+    def reset(self):
+        with self._lock:
+            for counts in self._counts.values():
+                counts[:] = 0
+            self.observations = 0
+
+    def nbytes(self):
+        return sum(c.nbytes for c in self._counts.values())
+
+
+def reference_from_training(model_path=MODEL_PATH, data_path=DATA_PATH):
+    # Same split as train.py: training inputs, class mix predicted on the held-out rows
+    from sklearn.model_selection import train_test_split
+
+    from modeling import load_dataset
+
+    X, y = load_dataset(data_path)
+    X_train, X_test, _, _ = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+    return build_reference(X_train, load_pipeline(model_path).predict(X_test))
+
+
+def monitor_csv(input_path, reference, model_path=MODEL_PATH, thresholds=None, chunksize=50_000):
+    model = load_pipeline(model_path)
+    monitor = DriftMonitor(reference, thresholds)
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        features = preprocess_raw_data(chunk[FEATURE_COLUMNS])
+        monitor.update_frame(features, model.predict(features))
+    return monitor
+
+
+def print_scores(monitor):
+    print(f"{monitor.observations} observations, {monitor.nbytes()} bytes of counters")
+    print(f"{'feature':<16}{'PSI':>8}{'KS':>8}{'unseen':>8}")
+    for row in monitor.scores():
+        ks = f"{row['ks']:.3f}" if row['ks'] is not None else '-'
+        flag = '  <-- ALERT' if row['alert'] else ''
+        print(f"{row['feature']:<16}{row['psi']:>8.3f}{ks:>8}{row['unseen']:>8}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a patient CSV against the training drift reference.")
+    parser.add_argument('input', nargs='?', help="CSV with the same feature columns as data/Obesity.csv")
+    parser.add_argument('--reference', default=DRIFT_REFERENCE_PATH, help="Reference profile saved by train.py")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl (for the class mix)")
+    parser.add_argument('--psi', type=float, default=DEFAULT_THRESHOLDS['psi'], help="PSI alert threshold")
+    parser.add_argument('--ks', type=float, default=DEFAULT_THRESHOLDS['ks'], help="Binned KS alert threshold")
+    parser.add_argument('--chunksize', type=int, default=50_000, help="Rows read per chunk")
+    parser.add_argument('--build-reference', action='store_true',
+                        help="Rebuild the reference from --data and --model without retraining")
+    parser.add_argument('--data', default=DATA_PATH, help="Training CSV used by --build-reference")
+    args = parser.parse_args()
+
+    if args.build_reference:
+        save_reference(reference_from_training(args.model, args.data), args.reference)
+        print(f"Drift reference saved as '{args.reference}'")
+    if args.input:
+        monitor = monitor_csv(args.input, load_reference(args.reference), args.model,
+                              {'psi': args.psi, 'ks': args.ks}, args.chunksize)
+        print_scores(monitor)
+        if monitor.alerts():
+            fired = [f"{row['feature']} ({'/'.join(stat.upper() for stat in row['fired'])})" for row in monitor.alerts()]
+            raise SystemExit(f"Drift alert on: {', '.join(fired)}")
+    elif not args.build_reference:
+        parser.error("input is required unless --build-reference is given")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import stats
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import confusion_matrix, log_loss, precision_recall_fscore_support
+from sklearn.model_selection import RepeatedStratifiedKFold
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from model_utils import APP_DIR, CATEGORICAL_FEATURES, DATA_PATH, NUMERICAL_FEATURES
+from modeling import DEFAULT_CLASSIFIER_PARAMS, build_pipeline, known_categories, load_dataset
+
+# Repeated stratified k-fold evaluation of the training pipeline, one fold per worker
+# process. With the category lists fixed up front (known_categories), the one-hot
+# encoding does not depend on the fold, so it is computed once and shared by every
+# fold; the StandardScaler is still fitted on each training fold, exactly as in the
+# pipeline. Out-of-fold probabilities are pooled into per-class precision/recall
+# with confidence intervals, a confusion matrix and calibration figures.
+
+EVALUATION_REPORT_PATH = os.path.join(APP_DIR, 'evaluation_report.json')
+CALIBRATION_BINS = 10
+
+_worker = {}
+
+
+def _init_worker(X, y, categories, classifier_params):
+    encoder = OneHotEncoder(categories=categories, drop='first', sparse_output=False)
+    _worker.update(
+        numeric=X[NUMERICAL_FEATURES].to_numpy(dtype=np.float64),
+        encoded=encoder.fit_transform(X[CATEGORICAL_FEATURES].astype(str)),
+        y=np.asarray(y, dtype=object),
+        params=dict(DEFAULT_CLASSIFIER_PARAMS, **classifier_params, n_jobs=1),
+    )
+
+
+def evaluate_fold(task):
+    repeat, fold, train_idx, test_idx = task
+    start = time.perf_counter()
+    numeric, encoded, y = _worker['numeric'], _worker['encoded'], _worker['y']
+    scaler = StandardScaler().fit(numeric[train_idx])
+
+    def features(index):
+        # Same column order as the ColumnTransformer: scaled numericals, then one-hot
+        return np.hstack([scaler.transform(numeric[index]), encoded[index]])
+
+    classifier = RandomForestClassifier(**_worker['params']).fit(features(train_idx), y[train_idx])
+    return {
+        'repeat': repeat,
+        'fold': fold,
+        'test_idx': test_idx,
+        'classes': [str(c) for c in classifier.classes_],
+        'proba': classifier.predict_proba(features(test_idx)),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def fold_tasks(y, n_splits, n_repeats, random_state):
+    cv = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=random_state)
+    return [(i // n_splits, i % n_splits, train_idx, test_idx)
+            for i, (train_idx, test_idx) in enumerate(cv.split(np.zeros(len(y)), y))]
+
+
+def corrected_interval(scores, test_fraction, confidence=0.95):
+    # Nadeau & Bengio: the folds share most of their training rows, so the plain
+    # fold-to-fold variance understates the uncertainty
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    mean = float(scores.mean())
+    if n < 2:
+        return {'mean': mean, 'std': 0.0, 'ci_low': mean, 'ci_high': mean}
+    variance = scores.var(ddof=1)
+    stderr = np.sqrt((1 / n + test_fraction / (1 - test_fraction)) * variance)
+    margin = float(stats.t.ppf((1 + confidence) / 2, n - 1) * stderr)
+    # Every metric here is a proportion
+    return {'mean': mean, 'std': float(np.sqrt(variance)),
+            'ci_low': max(mean - margin, 0.0), 'ci_high': min(mean + margin, 1.0)}
+
+
+def calibration_summary(y_true, proba, classes, bins=CALIBRATION_BINS):
+    truth = (np.asarray(y_true)[:, None] == np.asarray(classes)[None, :]).astype(float)
+    confidence = proba.max(axis=1)
+    correct = truth[np.arange(len(proba)), proba.argmax(axis=1)]
+    edges = np.linspace(0, 1, bins + 1)
+    index = np.clip(np.searchsorted(edges, confidence, side='right') - 1, 0, bins - 1)
+    reliability, ece = [], 0.0
+    for b in range(bins):
+        in_bin = index == b
+        if not in_bin.any():
+            continue
+        gap = abs(confidence[in_bin].mean() - correct[in_bin].mean())
+        ece += in_bin.mean() * gap
+        reliability.append({'bin_low': float(edges[b]), 'bin_high': float(edges[b + 1]),
+                            'count': int(in_bin.sum()), 'mean_confidence': float(confidence[in_bin].mean()),
+                            'accuracy': float(correct[in_bin].mean())})
+    return {
+        'brier_score': float(((proba - truth) ** 2).sum(axis=1).mean()),
+        'log_loss': float(log_loss(y_true, np.clip(proba, 1e-15, 1), labels=classes)),
+        'expected_calibration_error': float(ece),
+        'reliability': reliability,
+    }
+
+
+def build_report(folds, y, n_splits, n_repeats, classifier_params, timing):
+    classes = folds[0]['classes']
+    y = np.asarray(y, dtype=object).astype(str)
+    test_fraction = 1 / n_splits
+    per_fold = {'accuracy': [], 'precision': [], 'recall': [], 'f1': []}
+    counts = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    pooled_true, pooled_proba = [], []
+    for result in sorted(folds, key=lambda r: (r['repeat'], r['fold'])):
+        if result['classes'] != classes:
+            raise ValueError(f"Fold {result['repeat']}/{result['fold']} was fitted on classes {result['classes']}")
+        y_true = y[result['test_idx']]
+        y_pred = np.asarray(classes, dtype=object)[result['proba'].argmax(axis=1)]
+        precision, recall, f1, _ = precision_recall_fscore_support(y_true, y_pred, labels=classes, zero_division=0)
+        per_fold['accuracy'].append(float((y_true == y_pred).mean()))
+        per_fold['precision'].append(precision)
+        per_fold['recall'].append(recall)
+        per_fold['f1'].append(f1)
+        counts += confusion_matrix(y_true, y_pred, labels=classes)
+        pooled_true.append(y_true)
+        pooled_proba.append(result['proba'])
+
+    per_class = {}
+    for k, label in enumerate(classes):
+        per_class[label] = {
+            metric: corrected_interval([scores[k] for scores in per_fold[metric]], test_fraction)
+            for metric in ('precision', 'recall', 'f1')
+        }
+        per_class[label]['support'] = int((y == label).sum())
+
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rows': int(len(y)),
+        'n_splits': n_splits,
+        'n_repeats': n_repeats,
+        'classifier_params': dict(DEFAULT_CLASSIFIER_PARAMS, **classifier_params),
+        'accuracy': dict(corrected_interval(per_fold['accuracy'], test_fraction),
+                         folds=per_fold['accuracy']),
+        'per_class': per_class,
+        'confusion_matrix': {
+            'labels': classes,
+            'counts': counts.tolist(),
+            'row_normalized': (counts / counts.sum(axis=1, keepdims=True)).round(4).tolist(),
+        },
+        'calibration': calibration_summary(np.concatenate(pooled_true), np.vstack(pooled_proba), classes),
+        'timing': timing,
+    }
+
+
+def run_evaluation(X, y, n_splits=5, n_repeats=3, n_jobs=None, random_state=42, classifier_params=None):
+    classifier_params = dict(classifier_params or {})
+    classifier_params.pop('n_jobs', None)
+    tasks = fold_tasks(y, n_splits, n_repeats, random_state)
+    workers = n_jobs or os.cpu_count()
+    print(f"Evaluation: {n_repeats} x {n_splits}-fold stratified CV, {len(tasks)} fits on {workers} processes")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X, y, known_categories(X), classifier_params)) as executor:
+        folds = list(executor.map(evaluate_fold, tasks))
+    wall_seconds = time.perf_counter() - start
+    timing = {'wall_seconds': wall_seconds, 'fold_seconds_sum': sum(f['seconds'] for f in folds),
+              'workers': workers}
+    return build_report(folds, y, n_splits, n_repeats, classifier_params, timing)
+
+
+def run_serial_baseline(X, y, n_splits, n_repeats, random_state=42, classifier_params=None):
+    # What the training scripts do today, repeated over the same folds: the full
+    # pipeline refitted and applied fold by fold in one process
+    categories = known_categories(X)
+    start = time.perf_counter()
+    correct = []
+    for _, _, train_idx, test_idx in fold_tasks(y, n_splits, n_repeats, random_state):
+        pipeline = build_pipeline(categories=categories, **(classifier_params or {}))
+        pipeline.fit(X.iloc[train_idx], y.iloc[train_idx])
+        correct.append(float((pipeline.predict(X.iloc[test_idx]) == y.iloc[test_idx].to_numpy()).mean()))
+    return time.perf_counter() - start, correct
+
+
+def save_report(report, path=EVALUATION_REPORT_PATH):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def print_report(report):
+    accuracy = report['accuracy']
+    print(f"Accuracy: {accuracy['mean']*100:.2f}% "
+          f"(95% CI {accuracy['ci_low']*100:.2f}-{accuracy['ci_high']*100:.2f}%, "
+          f"{report['n_repeats']} x {report['n_splits']} folds)")
+    print(f"{'class':<22}{'precision':>24}{'recall':>24}")
+    for label, scores in report['per_class'].items():
+        cells = [f"{scores[m]['mean']:.3f} [{scores[m]['ci_low']:.3f}, {scores[m]['ci_high']:.3f}]"
+                 for m in ('precision', 'recall')]
+        print(f"{label:<22}{cells[0]:>24}{cells[1]:>24}")
+    calibration = report['calibration']
+    print(f"Calibration: Brier {calibration['brier_score']:.4f}, log loss {calibration['log_loss']:.4f}, "
+          f"ECE {calibration['expected_calibration_error']:.4f}")
+    timing = report['timing']
+    print(f"Wall-clock {timing['wall_seconds']:.1f}s on {timing['workers']} processes "
+          f"(sum of fold times {timing['fold_seconds_sum']:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repeated stratified k-fold evaluation report.")
+    parser.add_argument('--data', default=DATA_PATH, help="Training CSV")
+    parser.add_argument('--folds', type=int, default=5, help="Folds per repeat")
+    parser.add_argument('--repeats', type=int, default=3, help="Repeats with different shuffles")
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--output', default=EVALUATION_REPORT_PATH, help="JSON report destination")
+    parser.add_argument('--compare-serial', action='store_true',
+                        help="Also time the plain pipeline over the same folds in one process")
+    args = parser.parse_args()
+
+    X, y = load_dataset(args.data)
+    report = run_evaluation(X, y, args.folds, args.repeats, args.n_jobs)
+    if args.compare_serial:
+        serial_seconds, serial_accuracy = run_serial_baseline(X, y, args.folds, args.repeats)
+        report['timing']['serial_seconds'] = serial_seconds
+        report['timing']['serial_matches'] = bool(np.allclose(serial_accuracy, report['accuracy']['folds']))
+        print(f"Serial pipeline over the same folds: {serial_seconds:.1f}s "
+              f"(speedup {serial_seconds / report['timing']['wall_seconds']:.2f}x, "
+              f"identical fold accuracies: {report['timing']['serial_matches']})")
+    print_report(report)
+    save_report(report, args.output)
+    print(f"Evaluation report saved as '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
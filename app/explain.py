@@ -0,0 +1,178 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from fast_predictor import FastPredictor, flatten_pipeline
+from model_utils import FEATURE_COLUMNS, MODEL_PATH, load_pipeline, preprocess_raw_data
+
+# Per-prediction feature contributions for the tree ensemble (Saabas-style path
+# attribution). Walking from the root to the leaf, each split moves the node's class
+# distribution; that change is credited to the split feature. Summed over the path and
+# averaged over the trees: probability = bias + sum of the contributions.
+#
+# The walk only depends on the leaf, so the summed path of every leaf is precomputed
+# once per model, already mapped from the one-hot columns back to the 16 input columns.
+# Explaining a row then costs one forest traversal plus one gather per tree.
+
+
+def encoded_column_map(meta):
+    # Encoded (scaled + one-hot) column -> index of its source column in FEATURE_COLUMNS
+    columns = meta['feature_columns']
+    mapping = [columns.index(c) for c in meta['numerical_features']]
+    for feature, table in zip(meta['categorical_features'], meta['category_tables']):
+        mapping.extend([columns.index(feature)] * len(table['kept']))
+    return np.array(mapping)
+
+
+class TreeExplainer:
+    def __init__(self, fast_model):
+        self.fast = fast_model
+        self.classes_ = fast_model.classes_
+        self.feature_columns = list(fast_model.meta['feature_columns'])
+        column_of = encoded_column_map(fast_model.meta)
+
+        left, right, value = fast_model.node_arrays()
+        nodes = np.arange(len(left))
+        is_leaf = left == nodes
+        # Path contributions accumulated level by level from the roots; every child is
+        # reached from exactly one parent, so plain fancy-index updates are safe
+        path = np.zeros((len(nodes), len(self.feature_columns), value.shape[1]))
+        frontier = np.asarray(fast_model.roots)
+        while frontier.size:
+            parents = frontier[~is_leaf[frontier]]
+            column = column_of[fast_model.feature[parents]]
+            for children in (left[parents], right[parents]):
+                path[children] = path[parents]
+                path[children, column] += value[children] - value[parents]
+            frontier = np.concatenate([left[parents], right[parents]])
+
+        leaves = nodes[is_leaf]
+        self.leaf_contributions = path[leaves]
+        self.leaf_index = np.full(len(nodes), -1, dtype=np.int32)
+        self.leaf_index[leaves] = np.arange(len(leaves))
+        self.bias = value[fast_model.roots].mean(axis=0)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        return cls(FastPredictor(*flatten_pipeline(pipeline)))
+
+    def explain_encoded(self, encoded):
+        # Returns (n_rows, n_columns, n_classes); accumulated tree by tree so batches
+        # never materialize the (rows x trees x columns x classes) gather
+        leaves = self.leaf_index[self.fast.apply_encoded(encoded)]
+        total = np.zeros((len(encoded),) + self.leaf_contributions.shape[1:])
+        for t in range(leaves.shape[1]):
+            total += self.leaf_contributions[leaves[:, t]]
+        return total / leaves.shape[1]
+
+    def explain(self, X):
+        contributions = self.explain_encoded(self.fast.transform(X))
+        probabilities = self.bias + contributions.sum(axis=1)
+        return probabilities, contributions
+
+
+def top_contributions(explainer, input_data, k=6, target=None):
+    # Single request: the k inputs that moved the target class (default: the forest's
+    # own prediction) the most
+    probabilities, contributions = explainer.explain(input_data)
+    if target is None:
+        predicted = int(np.argmax(probabilities[0]))
+    else:
+        predicted = int(np.flatnonzero(explainer.classes_ == target)[0])
+    row = contributions[0, :, predicted]
+    order = np.argsort(-np.abs(row))[:k]
+    return explainer.classes_[predicted], [(explainer.feature_columns[j], input_data[explainer.feature_columns[j]],
+                                            float(row[j])) for j in order]
+
+
+def explanation_frame(explainer, chunk):
+    # One row per patient: predicted class, its probability, the shared bias and the
+    # contribution of each input column to that class
+    features = preprocess_raw_data(chunk[FEATURE_COLUMNS])
+    probabilities, contributions = explainer.explain(features[FEATURE_COLUMNS].to_numpy(dtype=object))
+    predicted = np.argmax(probabilities, axis=1)
+    rows = np.arange(len(chunk))
+    result = pd.DataFrame(contributions[rows, :, predicted].round(6), index=chunk.index,
+                          columns=[f'contrib_{c}' for c in explainer.feature_columns])
+    result.insert(0, 'base_value', explainer.bias[predicted].round(6))
+    result.insert(0, 'probability', probabilities[rows, predicted].round(6))
+    result.insert(0, 'model_prediction', explainer.classes_[predicted])
+    return result
+
+
+def explain_csv(input_path, output_path, model_path=MODEL_PATH, chunksize=10_000, keep_inputs=False):
+    start = time.perf_counter()
+    explainer = TreeExplainer.from_pipeline(load_pipeline(model_path))
+    print(f"Explainer ready in {time.perf_counter() - start:.2f}s "
+          f"({explainer.leaf_contributions.nbytes / 1e6:.0f} MB of leaf contributions)")
+
+    total_rows = 0
+    start = time.perf_counter()
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+        explained = explanation_frame(explainer, chunk)
+        if keep_inputs:
+            explained = pd.concat([chunk, explained], axis=1)
+        explained.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        total_rows += len(chunk)
+
+    elapsed = time.perf_counter() - start
+    print(f"Explained {total_rows} rows in {elapsed:.2f}s "
+          f"({elapsed / max(total_rows, 1) * 1e6:.0f} µs/row) -> {output_path}")
+    return total_rows, elapsed
+
+
+def benchmark(model_path, rows, repeats=200):
+    from synthetic import make_synthetic_patients
+
+    pipeline = load_pipeline(model_path)
+    start = time.perf_counter()
+    explainer = TreeExplainer.from_pipeline(pipeline)
+    print(f"Precompute: {time.perf_counter() - start:.2f}s, "
+          f"{explainer.leaf_contributions.nbytes / 1e6:.1f} MB for {len(explainer.leaf_contributions)} leaves")
+
+    frame = preprocess_raw_data(make_synthetic_patients(rows, random_state=0))
+    X = frame[FEATURE_COLUMNS].to_numpy(dtype=object)
+    single = dict(zip(FEATURE_COLUMNS, X[0]))
+    timings = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        top_contributions(explainer, single)
+        timings.append(time.perf_counter() - began)
+    print(f"Single row: p50 {np.percentile(timings, 50) * 1e3:.2f} ms, p95 {np.percentile(timings, 95) * 1e3:.2f} ms")
+
+    for chunk in (1_000, 10_000):
+        began = time.perf_counter()
+        for offset in range(0, rows, chunk):
+            explainer.explain(X[offset:offset + chunk])
+        elapsed = time.perf_counter() - began
+        print(f"Batch of {rows:,} in chunks of {chunk:,}: {elapsed:.2f}s ({elapsed / rows * 1e6:.1f} µs/row)")
+
+    # Contributions must add up to the forest's own probabilities
+    probabilities, _ = explainer.explain(X[:2_000])
+    expected = pipeline.predict_proba(frame[FEATURE_COLUMNS].iloc[:2_000])
+    print(f"Additivity: max |bias + sum(contributions) - predict_proba| = {np.abs(probabilities - expected).max():.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-feature contributions for each prediction of the forest.")
+    parser.add_argument('input', nargs='?', help="CSV with the same feature columns as data/Obesity.csv")
+    parser.add_argument('output', nargs='?', help="Destination CSV with one contribution column per input")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--chunksize', type=int, default=10_000, help="Rows read and explained per chunk")
+    parser.add_argument('--keep-inputs', action='store_true', help="Echo the input columns in the output")
+    parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                        help="Measure single-row latency and per-row batch cost on ROWS synthetic patients")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.model, args.benchmark)
+        return
+    if not args.input or not args.output:
+        parser.error("input and output are required unless --benchmark is given")
+    explain_csv(args.input, args.output, args.model, args.chunksize, args.keep_inputs)
+
+
+if __name__ == '__main__':
+    main()
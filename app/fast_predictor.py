@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from model_utils import APP_DIR, DATA_PATH, FEATURE_COLUMNS, MODEL_PATH, TARGET_COLUMN
+
+# NumPy-only fast path for the fitted pipeline: the StandardScaler statistics, the
+# OneHotEncoder category tables and every tree of the forest are flattened into plain
+# arrays, so a prediction needs neither pandas nor the ColumnTransformer.
+
+FAST_MODEL_PATH = os.path.join(APP_DIR, 'model_fast.npz')
+
+
+def tree_estimators(classifier):
+    # A fitted forest contributes all its trees; a single decision tree (e.g. a
+    # distilled student) is treated as a forest of one
+    if hasattr(classifier, 'estimators_') and all(hasattr(e, 'tree_') for e in classifier.estimators_):
+        return list(classifier.estimators_)
+    if hasattr(classifier, 'tree_'):
+        return [classifier]
+    return None
+
+
+def flatten_pipeline(pipeline):
+    preprocessor = pipeline.named_steps['preprocessor']
+    forest = pipeline.named_steps['classifier']
+    estimators = tree_estimators(forest)
+    if estimators is None:
+        raise ValueError(f"{type(forest).__name__} has no tree arrays to flatten")
+    scaler = preprocessor.named_transformers_['num']
+    encoder = preprocessor.named_transformers_['cat']
+    numerical_features = list(preprocessor.transformers_[0][2])
+    categorical_features = list(preprocessor.transformers_[1][2])
+
+    # Encoded output columns per categorical feature, honouring drop='first'
+    drop_idx = encoder.drop_idx_ if encoder.drop_idx_ is not None else [None] * len(categorical_features)
+    category_tables = []
+    for categories, dropped in zip(encoder.categories_, drop_idx):
+        kept = [str(c) for i, c in enumerate(categories) if dropped is None or i != dropped]
+        dropped_value = None if dropped is None else str(categories[dropped])
+        category_tables.append({'kept': kept, 'dropped': dropped_value})
+
+    # Concatenate all trees into flat node arrays; leaves point at themselves so
+    # every tree can be walked for a fixed number of steps
+    lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        left = np.where(is_leaf, nodes, tree.children_left) + offset
+        right = np.where(is_leaf, nodes, tree.children_right) + offset
+        value = tree.value[:, 0, :]
+        value = value / value.sum(axis=1, keepdims=True)
+
+        lefts.append(left)
+        rights.append(right)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+
+    meta = {
+        'feature_columns': FEATURE_COLUMNS,
+        'numerical_features': numerical_features,
+        'categorical_features': categorical_features,
+        'category_tables': category_tables,
+        'classes': [str(c) for c in forest.classes_],
+        'max_depth': int(max(e.tree_.max_depth for e in estimators)),
+    }
+    # Node indices fit comfortably in int32, halving the index arrays
+    arrays = {
+        'scaler_mean': scaler.mean_,
+        'scaler_scale': scaler.scale_,
+        'children_left': np.concatenate(lefts).astype(np.int32),
+        'children_right': np.concatenate(rights).astype(np.int32),
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+    }
+    return meta, arrays
+
+
+def export_fast_model(pipeline, path=FAST_MODEL_PATH):
+    meta, arrays = flatten_pipeline(pipeline)
+    np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+    return path
+
+
+class FastPredictor:
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.classes_ = np.array(meta['classes'], dtype=object)
+        self.max_depth = meta['max_depth']
+        self.scaler_mean = arrays['scaler_mean']
+        self.scaler_scale = arrays['scaler_scale']
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+
+        columns = meta['feature_columns']
+        self.numerical_index = [columns.index(c) for c in meta['numerical_features']]
+        self.categorical_index = [columns.index(c) for c in meta['categorical_features']]
+
+        # category -> encoded column (or -1 for the dropped reference category)
+        self.category_lookup = []
+        position = len(self.numerical_index)
+        for table in meta['category_tables']:
+            lookup = {category: position + i for i, category in enumerate(table['kept'])}
+            if table['dropped'] is not None:
+                lookup[table['dropped']] = -1
+            self.category_lookup.append(lookup)
+            position += len(table['kept'])
+        self.n_encoded = position
+
+    @classmethod
+    def load(cls, path=FAST_MODEL_PATH):
+        with np.load(path) as arrays:
+            meta = json.loads(str(arrays['meta']))
+            return cls(meta, {key: arrays[key] for key in arrays.files if key != 'meta'})
+
+    def _as_rows(self, X):
+        # Accepts one patient dict, a list of dicts, or a 2-D array in FEATURE_COLUMNS order
+        columns = self.meta['feature_columns']
+        if isinstance(X, dict):
+            return [[X[c] for c in columns]]
+        if isinstance(X, (list, tuple)) and X and isinstance(X[0], dict):
+            return [[row[c] for c in columns] for row in X]
+        return np.asarray(X, dtype=object)
+
+    def _unknown_category(self, value, j):
+        return ValueError(f"Found unknown category {value!r} in column {self.meta['feature_columns'][j]}")
+
+    def transform(self, X):
+        rows = self._as_rows(X)
+        n_rows = len(rows)
+        encoded = np.zeros((n_rows, self.n_encoded), dtype=np.float64)
+        if n_rows == 1:
+            # Single request: plain dict lookups beat any array machinery
+            row = rows[0]
+            encoded[0, :len(self.numerical_index)] = [float(row[j]) for j in self.numerical_index]
+            for lookup, j in zip(self.category_lookup, self.categorical_index):
+                column = lookup.get(str(row[j]))
+                if column is None:
+                    raise self._unknown_category(row[j], j)
+                if column >= 0:
+                    encoded[0, column] = 1.0
+        else:
+            # Batches: encode column-wise, resolving each distinct category once
+            rows = np.asarray(rows, dtype=object)
+            encoded[:, :len(self.numerical_index)] = rows[:, self.numerical_index].astype(np.float64)
+            row_index = np.arange(n_rows)
+            for lookup, j in zip(self.category_lookup, self.categorical_index):
+                values, inverse = np.unique(rows[:, j].astype(str), return_inverse=True)
+                columns = np.array([lookup.get(v, -2) for v in values])
+                if (columns == -2).any():
+                    raise self._unknown_category(values[columns == -2][0], j)
+                columns = columns[inverse]
+                hot = columns >= 0
+                encoded[row_index[hot], columns[hot]] = 1.0
+
+        numeric = encoded[:, :len(self.numerical_index)]
+        numeric -= self.scaler_mean
+        numeric /= self.scaler_scale
+        # sklearn trees compare float32 features against float64 thresholds
+        return encoded.astype(np.float32)
+
+    def predict_proba(self, X):
+        return self.predict_proba_encoded(self.transform(X))
+
+    def apply_encoded(self, encoded):
+        # Leaf node reached in every tree, shape (n_rows, n_trees)
+        rows = np.arange(len(encoded))[:, None]
+        node = np.broadcast_to(self.roots, (len(encoded), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = encoded[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.children_left[node], self.children_right[node])
+        return node
+
+    def predict_proba_encoded(self, encoded):
+        return self.value[self.apply_encoded(encoded)].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def node_arrays(self):
+        # Global child indices and class distributions of every node
+        return self.children_left, self.children_right, self.value
+
+
+def check_parity(pipeline, fast_model, X):
+    import pandas as pd
+
+    frame = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    expected = pipeline.predict_proba(frame)
+    actual = fast_model.predict_proba(frame[FEATURE_COLUMNS].to_numpy(dtype=object))
+    max_diff = float(np.abs(expected - actual).max())
+    same_labels = bool((pipeline.predict(frame) == fast_model.predict(frame.to_numpy(dtype=object))).all())
+    return max_diff, same_labels
+
+
+def main():
+    import joblib
+    import pandas as pd
+
+    from model_utils import preprocess_raw_data
+
+    parser = argparse.ArgumentParser(description="Export the fitted pipeline to the NumPy fast path and check parity.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--output', default=FAST_MODEL_PATH, help="Destination .npz file")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV used for the parity check")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    export_fast_model(pipeline, args.output)
+    fast_model = FastPredictor.load(args.output)
+
+    X = preprocess_raw_data(pd.read_csv(args.data)).drop(TARGET_COLUMN, axis=1)
+    max_diff, same_labels = check_parity(pipeline, fast_model, X)
+    print(f"Fast model saved as '{args.output}'")
+    print(f"Parity on {len(X)} rows: max probability difference {max_diff:.2e}, "
+          f"identical predictions: {same_labels}")
+    if max_diff > 1e-9 or not same_labels:
+        raise SystemExit("Fast model does not match the pipeline")
+
+
+if __name__ == '__main__':
+    main()
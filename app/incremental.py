@@ -0,0 +1,254 @@
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from model_utils import APP_DIR, CATEGORICAL_FEATURES, MODEL_PATH, NUMERICAL_FEATURES, file_sha256
+from modeling import build_pipeline, load_dataset
+
+# Incremental retraining: new patient records are absorbed by adding trees fitted on
+# those rows only (RandomForest warm_start), so old data is never re-read.
+#
+# The fitted scaler/encoder stay frozen because the existing trees split on features
+# scaled with them. Instead, streaming mean/variance and category counts of all
+# absorbed rows are kept in the ledger; when they drift away from the frozen scaler
+# (or new categories show up) a full retrain with train.py is recommended.
+
+LEDGER_PATH = os.path.join(APP_DIR, 'training_ledger.json')
+DRIFT_WARNING_STD = 0.25
+
+
+def batch_statistics(X):
+    numeric = X[NUMERICAL_FEATURES].astype(float)
+    return {
+        'count': int(len(X)),
+        'mean': numeric.mean().to_dict(),
+        'm2': ((numeric - numeric.mean()) ** 2).sum().to_dict(),
+        'categories': {col: X[col].astype(str).value_counts().to_dict() for col in CATEGORICAL_FEATURES},
+    }
+
+
+def merge_statistics(a, b):
+    # Chan et al. parallel update of count/mean/M2, plus summed category counts
+    n = a['count'] + b['count']
+    merged = {'count': n, 'mean': {}, 'm2': {}, 'categories': {}}
+    for col in NUMERICAL_FEATURES:
+        delta = b['mean'][col] - a['mean'][col]
+        merged['mean'][col] = a['mean'][col] + delta * b['count'] / n
+        merged['m2'][col] = a['m2'][col] + b['m2'][col] + delta ** 2 * a['count'] * b['count'] / n
+    for col in CATEGORICAL_FEATURES:
+        counts = dict(a['categories'][col])
+        for category, count in b['categories'][col].items():
+            counts[category] = counts.get(category, 0) + count
+        merged['categories'][col] = counts
+    return merged
+
+
+def load_ledger(path=LEDGER_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No training ledger at '{path}'; run a full 'python app/train.py' first")
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_ledger(ledger, path=LEDGER_PATH):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(ledger, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def start_ledger(path, data_path, X_train, split):
+    # Called after a full retrain: the ledger restarts from the full training data.
+    # `split` holds the train_test_split arguments, so the training rows can be rebuilt
+    ledger = {
+        'sources': [{
+            'path': os.path.abspath(data_path),
+            'sha256': file_sha256(data_path),
+            'rows': int(len(X_train)),
+            'mode': 'full',
+            'split': split,
+            'absorbed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }],
+        'statistics': batch_statistics(X_train),
+    }
+    save_ledger(ledger, path)
+    return ledger
+
+
+def scaler_drift(pipeline, statistics):
+    # Distance between the streamed means and the frozen scaler, in scaler std units
+    scaler = pipeline.named_steps['preprocessor'].named_transformers_['num']
+    streamed = np.array([statistics['mean'][col] for col in NUMERICAL_FEATURES])
+    return dict(zip(NUMERICAL_FEATURES, np.abs(streamed - scaler.mean_) / scaler.scale_))
+
+
+def split_known_rows(pipeline, X):
+    # Rows with categories the frozen encoder has never seen cannot be encoded
+    encoder = pipeline.named_steps['preprocessor'].named_transformers_['cat']
+    known = pd.Series(True, index=X.index)
+    unseen = {}
+    for col, categories in zip(CATEGORICAL_FEATURES, encoder.categories_):
+        is_known = X[col].astype(str).isin([str(c) for c in categories])
+        if not is_known.all():
+            unseen[col] = sorted(X.loc[~is_known, col].astype(str).unique())
+        known &= is_known
+    return known, unseen
+
+
+def add_trees(pipeline, X_new, y_new, n_new_trees):
+    forest = pipeline.named_steps['classifier']
+    if not hasattr(forest, 'estimators_') or 'warm_start' not in forest.get_params():
+        raise ValueError(f"Incremental mode needs a RandomForest, found {type(forest).__name__}; "
+                         f"run a full retrain")
+    unknown_labels = set(y_new) - set(forest.classes_)
+    if unknown_labels:
+        raise ValueError(f"New rows contain unknown classes {sorted(unknown_labels)}; run a full retrain")
+
+    X_encoded = pipeline.named_steps['preprocessor'].transform(X_new)
+    y_encoded = np.asarray(y_new, dtype=object)
+    weights = np.ones(len(y_encoded))
+
+    # warm_start refits classes_ from y, so classes missing from this batch get a
+    # zero-weight anchor row to keep the class order of the existing trees
+    missing = [c for c in forest.classes_ if c not in set(y_encoded)]
+    if missing:
+        X_encoded = np.vstack([X_encoded, np.repeat(X_encoded[:1], len(missing), axis=0)])
+        y_encoded = np.concatenate([y_encoded, np.array(missing, dtype=object)])
+        weights = np.concatenate([weights, np.zeros(len(missing))])
+
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+    start = time.perf_counter()
+    forest.fit(X_encoded, y_encoded, sample_weight=weights)
+    elapsed = time.perf_counter() - start
+    forest.set_params(warm_start=False)
+    return elapsed
+
+
+def load_source(source, pipeline):
+    # Rebuilds exactly the rows a ledger source contributed: the training split of a
+    # full retrain, or the rows of an incremental batch the frozen encoder could encode
+    if file_sha256(source['path']) != source['sha256']:
+        raise ValueError(f"'{source['path']}' changed since it was absorbed; run a full retrain")
+    X, y = load_dataset(source['path'])
+    split = source.get('split')
+    if split:
+        X, _, y, _ = train_test_split(X, y, test_size=split['test_size'], random_state=split['random_state'],
+                                      stratify=y if split['stratify'] else None)
+    elif source['mode'] == 'incremental':
+        known, _ = split_known_rows(pipeline, X)
+        X, y = X[known], y[known]
+    if len(X) != source['rows']:
+        raise ValueError(f"Rebuilt {len(X)} rows from '{source['path']}' but the ledger recorded "
+                         f"{source['rows']}; run a full retrain")
+    return X, y
+
+
+def compare_with_full_retrain(model_path, ledger, X_new, y_new, n_new_trees, holdout=0.3):
+    # Both candidates are scored on the same held-out slice of the new rows
+    # Categorical targets also count unused levels, so only observed classes are checked
+    class_counts = y_new.value_counts()
+    stratify = y_new if class_counts[class_counts > 0].min() >= 2 else None
+    X_fit, X_hold, y_fit, y_hold = train_test_split(
+        X_new, y_new, test_size=holdout, random_state=42, stratify=stratify
+    )
+
+    previous = joblib.load(model_path)
+    previous_accuracy = accuracy_score(y_hold, previous.predict(X_hold))
+    # Read before add_trees, which raises n_estimators on the same forest object
+    forest = previous.named_steps['classifier']
+    n_trees = len(forest.estimators_) + n_new_trees
+    incremental_seconds = add_trees(previous, X_fit, y_fit, n_new_trees)
+    incremental_accuracy = accuracy_score(y_hold, previous.predict(X_hold))
+
+    # The full retrain re-reads every absorbed source, which is what incremental mode avoids
+    old_frames = [load_source(source, previous) for source in ledger['sources']]
+    X_full = pd.concat([X for X, _ in old_frames] + [X_fit], ignore_index=True)
+    y_full = pd.concat([y for _, y in old_frames] + [y_fit], ignore_index=True)
+    # Same tree count as the incremental model: the previous trees plus the new ones
+    full = build_pipeline(n_estimators=n_trees, max_depth=forest.max_depth,
+                          max_features=forest.max_features, min_samples_leaf=forest.min_samples_leaf)
+    start = time.perf_counter()
+    full.fit(X_full, y_full)
+    full_seconds = time.perf_counter() - start
+    full_accuracy = accuracy_score(y_hold, full.predict(X_hold))
+
+    print(f"Held-out comparison on {len(X_hold)} new rows:")
+    print(f"  previous model:    {previous_accuracy*100:.2f}%")
+    print(f"  incremental model: {incremental_accuracy*100:.2f}% "
+          f"(fit {incremental_seconds:.2f}s on {len(X_fit)} rows, {n_trees} trees)")
+    print(f"  full retrain:      {full_accuracy*100:.2f}% "
+          f"(fit {full_seconds:.2f}s on {len(X_full)} rows, {n_trees} trees)")
+    return {
+        'previous_accuracy': previous_accuracy,
+        'incremental_accuracy': incremental_accuracy,
+        'incremental_fit_seconds': incremental_seconds,
+        'full_accuracy': full_accuracy,
+        'full_fit_seconds': full_seconds,
+    }
+
+
+def run_incremental(new_path, model_path=MODEL_PATH, ledger_path=LEDGER_PATH, artifact_root=None,
+                    n_new_trees=20, compare=False, drift_reference_path=None):
+    from artifacts import ARTIFACT_ROOT, publish_model
+    from drift import DRIFT_REFERENCE_PATH, extend_reference, load_reference, save_reference
+
+    ledger = load_ledger(ledger_path)
+    sha256 = file_sha256(new_path)
+    if any(source['sha256'] == sha256 for source in ledger['sources']):
+        print(f"'{new_path}' was already absorbed by the current model; nothing to do")
+        return None
+
+    X_new, y_new = load_dataset(new_path)
+    pipeline = joblib.load(model_path)
+    known, unseen = split_known_rows(pipeline, X_new)
+    if unseen:
+        print(f"Skipping {int((~known).sum())} rows with categories unseen at full training: {unseen}")
+    X_new, y_new = X_new[known], y_new[known]
+    if X_new.empty:
+        print("No rows left to absorb; run a full retrain to learn the new categories")
+        return None
+
+    report = compare_with_full_retrain(model_path, ledger, X_new, y_new, n_new_trees) if compare else {}
+
+    seconds = add_trees(pipeline, X_new, y_new, n_new_trees)
+    print(f"Added {n_new_trees} trees fitted on {len(X_new)} new rows in {seconds:.2f}s "
+          f"({len(pipeline.named_steps['classifier'].estimators_)} trees in total)")
+    _, artifact_dir = publish_model(pipeline, model_path, artifact_root or ARTIFACT_ROOT)
+    print(f"Model saved successfully as '{model_path}' (artifact '{artifact_dir}')")
+
+    ledger['sources'].append({
+        'path': os.path.abspath(new_path),
+        'sha256': sha256,
+        'rows': int(len(X_new)),
+        'mode': 'incremental',
+        'trees_added': n_new_trees,
+        'unseen_categories': unseen,
+        'absorbed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    })
+    ledger['statistics'] = merge_statistics(ledger['statistics'], batch_statistics(X_new))
+    save_ledger(ledger, ledger_path)
+
+    # The drift monitor compares against the data the model has seen, which now
+    # includes the new rows (class mix: the updated model on those rows)
+    drift_reference_path = drift_reference_path or DRIFT_REFERENCE_PATH
+    if os.path.exists(drift_reference_path):
+        reference = extend_reference(load_reference(drift_reference_path), X_new, pipeline.predict(X_new))
+        save_reference(reference, drift_reference_path)
+        print(f"Drift reference '{drift_reference_path}' extended to {reference['rows']} rows")
+    else:
+        print(f"No drift reference at '{drift_reference_path}'; run 'python app/drift.py --build-reference'")
+
+    drift = scaler_drift(pipeline, ledger['statistics'])
+    drifted = {col: round(float(value), 3) for col, value in drift.items() if value > DRIFT_WARNING_STD}
+    if drifted:
+        print(f"Streamed feature means moved more than {DRIFT_WARNING_STD} std from the frozen scaler: "
+              f"{drifted}; consider a full 'python app/train.py'")
+    if unseen:
+        print("New categories were seen; a full 'python app/train.py' is needed to learn them")
+    return dict(report, fit_seconds=seconds, rows=int(len(X_new)))
@@ -0,0 +1,105 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+# Lightweight per-stage latency metrics for the prediction path. Each stage keeps a
+# rolling window of recent timings (for p50/p95) and a cumulative fixed-bucket
+# histogram. Set OBESITY_METRICS=0 to switch them off: stage() then hands out a
+# shared no-op context manager and nothing is recorded.
+
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class LatencyMetrics:
+    def __init__(self, enabled=True, window=1000):
+        self.enabled = enabled
+        self.window = window
+        self._recent = {}
+        self._counts = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        ms = seconds * 1000
+        with self._lock:
+            if name not in self._recent:
+                self._recent[name] = deque(maxlen=self.window)
+                self._counts[name] = [0] * (len(BUCKETS_MS) + 1)
+                self._totals[name] = [0, 0.0]
+            self._recent[name].append(ms)
+            self._counts[name][bisect.bisect_left(BUCKETS_MS, ms)] += 1
+            self._totals[name][0] += 1
+            self._totals[name][1] += ms
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: (list(recent), list(self._counts[name]), list(self._totals[name]))
+                        for name, recent in self._recent.items()}
+        summary = {}
+        for name, (recent, counts, (count, total_ms)) in snapshot.items():
+            p50, p95 = np.percentile(recent, [50, 95])
+            summary[name] = {
+                'count': count,
+                'mean_ms': total_ms / count,
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'max_ms': max(recent),
+                'histogram_ms': {f'<={b}': c for b, c in zip(BUCKETS_MS, counts)} | {'>2500': counts[-1]},
+            }
+        return summary
+
+    def dump(self, path):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': self.summary()}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._counts.clear()
+            self._totals.clear()
+
+
+metrics = LatencyMetrics(enabled=os.environ.get('OBESITY_METRICS', '1') != '0')
+
+
+def predict_with_stages(pipeline, X, metrics=metrics):
+    # Same as pipeline.predict, but every Pipeline step is timed on its own
+    Xt = X
+    for name, step in pipeline.steps[:-1]:
+        with metrics.stage(f'pipeline.{name}'):
+            Xt = step.transform(Xt)
+    name, final_step = pipeline.steps[-1]
+    with metrics.stage(f'pipeline.{name}'):
+        return final_step.predict(Xt)
@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from model_utils import APP_DIR, DATA_PATH, FEATURE_COLUMNS, MODEL_PATH, file_sha256, preprocess_raw_data
+
+# Precomputed lookup-table scoring. Apart from Age/Height/Weight every app input comes
+# from a finite widget domain, so the pipeline is scored offline over that grid with
+# Age/Height/Weight bucketed at a configurable resolution (each bucket is scored at
+# its centre). Online, a prediction is one dict lookup plus three bucket indices;
+# requests outside the covered grid fall back to the live model.
+#
+# The full Cartesian grid of the discrete inputs has ~1.1M combinations, which times
+# the continuous buckets is far too large to precompute, so only the discrete
+# combinations seen in the training split (or in extra CSVs) are covered.
+
+LOOKUP_DIR = os.path.join(APP_DIR, 'lookup_table')
+
+# Same domains as the Streamlit widgets
+DISCRETE_VALUES = {
+    'Gender': ['Female', 'Male'],
+    'family_history': ['yes', 'no'],
+    'FAVC': ['yes', 'no'],
+    'FCVC': [1, 2, 3],
+    'NCP': [1, 2, 3, 4],
+    'CAEC': ['no', 'Sometimes', 'Frequently', 'Always'],
+    'SMOKE': ['yes', 'no'],
+    'CH2O': [1, 2, 3],
+    'SCC': ['yes', 'no'],
+    'FAF': [0, 1, 2, 3],
+    'TUE': [0, 1, 2],
+    'CALC': ['no', 'Sometimes', 'Frequently', 'Always'],
+    'MTRANS': ['Public_Transportation', 'Automobile', 'Motorbike', 'Bike', 'Walking'],
+}
+DISCRETE_FEATURES = list(DISCRETE_VALUES)
+CONTINUOUS_FEATURES = ['Age', 'Height', 'Weight']
+
+# Largest table a build may score: one model prediction and one byte per cell
+MAX_CELLS = 50_000_000
+DEFAULT_BUCKETS = {'Age': (14, 62, 4), 'Height': (1.45, 1.99, 0.03), 'Weight': (39.0, 174.0, 2.0)}
+
+# Tables that agree less often with the live model on the held-out split are not
+# saved, and not loaded by the app
+MIN_AGREEMENT = float(os.environ.get('OBESITY_LOOKUP_MIN_AGREEMENT', 0.99))
+
+
+def _value_key(value):
+    # Numeric widget values compare as ints, everything else as text
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return str(int(round(float(value))))
+    return str(value)
+
+
+def bucket_count(low, high, step):
+    return int(np.ceil(round((high - low) / step, 9)))
+
+
+def bucket_index(value, low, step):
+    # Rounded before flooring so values on a bucket edge (1.48 with low 1.45 and step
+    # 0.03 gives 0.9999...) land in the bucket they start
+    return int(np.floor(round((float(value) - low) / step, 9)))
+
+
+def bucket_centres(feature, low, high, step):
+    centres = low + (np.arange(bucket_count(low, high, step)) + 0.5) * step
+    # Age is an integer input of the model
+    return np.round(centres).astype(int) if feature == 'Age' else np.round(centres, 3)
+
+
+def observed_combinations(frames):
+    # frames hold cleaned rows, so the rounded scales print as plain ints
+    combos = pd.concat([f[DISCRETE_FEATURES].astype(str) for f in frames], ignore_index=True).drop_duplicates()
+    valid = np.logical_and.reduce([
+        combos[col].isin([_value_key(v) for v in DISCRETE_VALUES[col]]) for col in DISCRETE_FEATURES
+    ])
+    return [tuple(row) for row in combos[valid].itertuples(index=False)]
+
+
+def _combo_frame(combos):
+    frame = pd.DataFrame(combos, columns=DISCRETE_FEATURES)
+    for col in DISCRETE_FEATURES:
+        if isinstance(DISCRETE_VALUES[col][0], int):
+            frame[col] = frame[col].astype(int)
+    return frame
+
+
+def precompute(model, combos, buckets=DEFAULT_BUCKETS, combos_per_chunk=64):
+    classes = list(model.classes_)
+    grids = [bucket_centres(f, *buckets[f]) for f in CONTINUOUS_FEATURES]
+    shape = tuple(len(g) for g in grids)
+    continuous = pd.DataFrame(
+        np.array(np.meshgrid(*grids, indexing='ij')).reshape(3, -1).T, columns=CONTINUOUS_FEATURES
+    ).astype({'Age': int})
+    table = np.empty((len(combos),) + shape, dtype=np.uint8)
+    combo_frame = _combo_frame(combos)
+
+    for start in range(0, len(combos), combos_per_chunk):
+        chunk = combo_frame.iloc[start:start + combos_per_chunk]
+        rows = chunk.loc[chunk.index.repeat(len(continuous))].reset_index(drop=True)
+        rows[CONTINUOUS_FEATURES] = pd.concat([continuous] * len(chunk), ignore_index=True)
+        probabilities = model.predict_proba(rows[FEATURE_COLUMNS])
+        table[start:start + len(chunk)] = np.argmax(probabilities, axis=1).astype(np.uint8).reshape((len(chunk),) + shape)
+        print(f"  {min(start + combos_per_chunk, len(combos))}/{len(combos)} combinations scored", end='\r')
+    print()
+    return table, classes
+
+
+def table_meta(combos, classes, buckets, model_path):
+    return {
+        'discrete_features': DISCRETE_FEATURES,
+        'continuous_features': CONTINUOUS_FEATURES,
+        'buckets': {f: list(buckets[f]) for f in CONTINUOUS_FEATURES},
+        'combinations': [list(c) for c in combos],
+        'classes': classes,
+        # The pickle's content, not its mtime, so a checkout or copy still matches
+        'model_sha256': file_sha256(model_path),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save_table(table, meta, directory=LOOKUP_DIR):
+    # The table goes to a new file named in meta.json, and meta.json is replaced last,
+    # so a reader always finds a complete table matching the meta it read. Tables of
+    # earlier builds are removed afterwards (a memory map already open stays valid)
+    os.makedirs(directory, exist_ok=True)
+    table_file = f"table-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.npy"
+    tmp_path = os.path.join(directory, f'.{table_file}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, table)
+    os.replace(tmp_path, os.path.join(directory, table_file))
+    tmp_path = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(meta, table_file=table_file), f)
+    os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+    for name in os.listdir(directory):
+        if name.startswith('table') and name.endswith('.npy') and name != table_file:
+            os.remove(os.path.join(directory, name))
+
+
+class LookupPredictor:
+    def __init__(self, table, meta):
+        self.table = table
+        self.meta = meta
+        self.classes_ = np.array(meta['classes'], dtype=object)
+        self.combo_index = {tuple(c): i for i, c in enumerate(meta['combinations'])}
+        self.buckets = [(f, *meta['buckets'][f]) for f in meta['continuous_features']]
+        self.shape = table.shape[1:]
+        self.lookups = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory=LOOKUP_DIR, model_sha256=None, min_agreement=MIN_AGREEMENT):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        # A table scored with another model version must not answer requests, nor
+        # one that disagreed with its model too often (or was never checked)
+        if model_sha256 is not None and meta.get('model_sha256') != model_sha256:
+            return None
+        if meta.get('agreement', 0.0) < min_agreement:
+            return None
+        return cls(np.load(os.path.join(directory, meta.get('table_file', 'table.npy')), mmap_mode='r'), meta)
+
+    def cell(self, input_data):
+        combo = self.combo_index.get(tuple(_value_key(input_data[f]) for f in DISCRETE_FEATURES))
+        if combo is None:
+            return None
+        index = [combo]
+        for (feature, low, high, step), size in zip(self.buckets, self.shape):
+            position = bucket_index(input_data[feature], low, step)
+            if not 0 <= position < size:
+                return None
+            index.append(position)
+        return tuple(index)
+
+    def predict_one(self, input_data, fallback):
+        cell = self.cell(input_data)
+        with self._lock:
+            self.lookups += 1
+            if cell is None:
+                self.fallbacks += 1
+        if cell is None:
+            return fallback(input_data)
+        return self.classes_[self.table[cell]]
+
+    def stats(self):
+        return {
+            'lookups': self.lookups,
+            'fallbacks': self.fallbacks,
+            'fallback_rate': self.fallbacks / self.lookups if self.lookups else 0.0,
+            'cells': int(self.table.size),
+        }
+
+
+def held_out_agreement(lookup, model, X):
+    # Share of requests the table answers, and how often it agrees with the live model
+    live = model.predict(X)
+    looked_up = [lookup.predict_one(r, lambda _: None) for r in X.to_dict('records')]
+    covered = np.array([p is not None for p in looked_up])
+    agreement = float(np.mean([p == l for p, l in zip(looked_up, live) if p is not None])) if covered.any() else 0.0
+    return float(covered.mean()), agreement
+
+
+def parse_buckets(items):
+    buckets = dict(DEFAULT_BUCKETS)
+    for item in items or []:
+        feature, _, spec = item.partition('=')
+        low, high, step = (float(v) for v in spec.split(':'))
+        buckets[feature] = (low, high, step)
+    return buckets
+
+
+def main():
+    # Only the offline build needs sklearn; the app imports this module for LookupPredictor
+    from sklearn.model_selection import train_test_split
+
+    from modeling import load_dataset
+
+    parser = argparse.ArgumentParser(description="Precompute a lookup table of predictions over the discrete input grid.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--data', default=DATA_PATH,
+                        help="Dataset CSV; the discrete combinations of its training split are covered")
+    parser.add_argument('--extra', nargs='*', default=[], help="More CSVs whose discrete combinations to cover")
+    parser.add_argument('--bucket', action='append', metavar='FEATURE=LOW:HIGH:STEP',
+                        help="Bucket resolution, e.g. Weight=39:174:1 (defaults: Age=14:62:4, "
+                             "Height=1.45:1.99:0.03, Weight=39:174:2)")
+    parser.add_argument('--output', default=LOOKUP_DIR, help="Directory for the table and meta.json")
+    parser.add_argument('--max-cells', type=int, default=MAX_CELLS,
+                        help="Refuse to build a table with more cells (one prediction each)")
+    parser.add_argument('--min-agreement', type=float, default=MIN_AGREEMENT,
+                        help="Refuse to save a table agreeing less often with the live model on the held-out split")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    model.named_steps['classifier'].set_params(n_jobs=-1)
+    buckets = parse_buckets(args.bucket)
+    X, y = load_dataset(args.data)
+    # The held-out split used by train.py stays out of the grid, so the coverage
+    # and agreement measured on it below are those of unseen requests
+    X_train, X_test, _, _ = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+    extra = [preprocess_raw_data(pd.read_csv(p)) for p in args.extra]
+    combos = observed_combinations([X_train] + extra)
+    cells = len(combos) * int(np.prod([bucket_count(*buckets[f]) for f in CONTINUOUS_FEATURES]))
+    if cells > args.max_cells:
+        raise SystemExit(f"{cells:,} cells exceed --max-cells {args.max_cells:,}; use coarser --bucket steps")
+    print(f"Scoring {len(combos):,} discrete combinations x buckets = {cells:,} cells")
+
+    start = time.perf_counter()
+    table, classes = precompute(model, combos, buckets)
+    meta = table_meta(combos, classes, buckets, args.model)
+    seconds = time.perf_counter() - start
+
+    coverage, agreement = held_out_agreement(LookupPredictor(table, meta), model, X_test)
+    print(f"Held-out check: {coverage:.1%} of requests answered by the table, "
+          f"{agreement:.1%} agreement with the live model")
+    if agreement < args.min_agreement:
+        raise SystemExit(f"Agreement {agreement:.2%} is below --min-agreement {args.min_agreement:.2%}; "
+                         f"table not saved (try finer --bucket steps)")
+
+    save_table(table, dict(meta, coverage=coverage, agreement=agreement), args.output)
+    print(f"Lookup table saved in '{args.output}' ({table.nbytes / 1e6:.1f} MB) in {seconds:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import json
+import os
+import socket
+import struct
+import threading
+import zlib
+
+from model_utils import APP_DIR, CATEGORICAL_FEATURES, FEATURE_COLUMNS, NUMERICAL_FEATURES
+
+# Thin client for model_server.py and the binary protocol both sides speak over a
+# Unix socket. Only the standard library is used, so a Streamlit worker talking to
+# the server never imports sklearn or holds a copy of the forest.
+#
+# Request:  header (magic, op, vocabulary id, row count) + one fixed 72-byte record per
+#           patient: the 8 numerical features as float64, then one uint8 code per
+#           categorical feature (index into the vocabulary announced by OP_INFO)
+# Response: header (status, payload length) + op-specific payload
+# A request encoded with an outdated vocabulary (the server hot-reloaded a model with
+# other categories) gets STATUS_STALE; the client refreshes OP_INFO and retries once.
+
+MODEL_SOCKET_PATH = os.environ.get('OBESITY_MODEL_SOCKET', os.path.join(APP_DIR, 'model_server.sock'))
+
+MAGIC = b'OBM1'
+OP_INFO, OP_PREDICT, OP_EXPLAIN, OP_ROLLBACK = 1, 2, 3, 4
+STATUS_OK, STATUS_ERROR, STATUS_STALE = 0, 1, 2
+
+REQUEST_HEADER = struct.Struct('<4sBIH')
+RESPONSE_HEADER = struct.Struct('<BI')
+RECORD = struct.Struct(f'<{len(NUMERICAL_FEATURES)}d{len(CATEGORICAL_FEATURES)}B')
+MAX_ROWS = 65535
+
+
+def recv_exact(sock, size):
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("Model server closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def vocabulary_id(vocabulary):
+    return zlib.crc32(json.dumps(vocabulary).encode('utf-8'))
+
+
+def encode_records(records, vocabulary):
+    codes = [{value: i for i, value in enumerate(values)} for values in vocabulary]
+    payload = bytearray()
+    for record in records:
+        categorical = []
+        for lookup, col in zip(codes, CATEGORICAL_FEATURES):
+            code = lookup.get(str(record[col]))
+            if code is None:
+                raise ValueError(f"Found unknown category {record[col]!r} in column {col}")
+            categorical.append(code)
+        payload += RECORD.pack(*[float(record[col]) for col in NUMERICAL_FEATURES], *categorical)
+    return bytes(payload)
+
+
+def decode_records(payload, count, vocabulary):
+    records = []
+    for values in RECORD.iter_unpack(payload[:count * RECORD.size]):
+        record = dict(zip(NUMERICAL_FEATURES, values[:len(NUMERICAL_FEATURES)]))
+        for col, table, code in zip(CATEGORICAL_FEATURES, vocabulary, values[len(NUMERICAL_FEATURES):]):
+            if code >= len(table):
+                raise ValueError(f"Invalid category code {code} for column {col}")
+            record[col] = table[code]
+        records.append({col: record[col] for col in FEATURE_COLUMNS})
+    return records
+
+
+class ModelClient:
+    def __init__(self, path=MODEL_SOCKET_PATH, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info = None
+
+    @classmethod
+    def connect(cls, path=MODEL_SOCKET_PATH, timeout=5.0):
+        # None when no server answers, so callers can fall back to loading in-process
+        if not os.path.exists(path):
+            return None
+        client = cls(path, timeout)
+        try:
+            client.info()
+        except (OSError, ValueError):
+            return None
+        return client
+
+    def _socket(self):
+        # One connection per thread: Streamlit runs every session in its own thread
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, op, count=0, payload=b''):
+        vocab_id = self._info['vocabulary_id'] if self._info else 0
+        try:
+            sock = self._socket()
+            sock.sendall(REQUEST_HEADER.pack(MAGIC, op, vocab_id, count) + payload)
+            status, length = RESPONSE_HEADER.unpack(recv_exact(sock, RESPONSE_HEADER.size))
+            body = recv_exact(sock, length)
+        except OSError:
+            self.close()
+            raise
+        if status == STATUS_ERROR:
+            raise ValueError(body.decode('utf-8'))
+        return status, body
+
+    def _call_records(self, op, records, extra=b''):
+        for _ in range(2):
+            payload = encode_records(records, self._info['vocabulary']) + extra
+            status, body = self._call(op, len(records), payload)
+            if status != STATUS_STALE:
+                return body
+            self.info()
+        raise ConnectionError("Model server vocabulary keeps changing")
+
+    def info(self):
+        _, body = self._call(OP_INFO)
+        self._info = json.loads(body)
+        return self._info
+
+    def predict_proba(self, records):
+        if len(records) > MAX_ROWS:
+            raise ValueError(f"At most {MAX_ROWS} records per request")
+        body = self._call_records(OP_PREDICT, records)
+        version_length = body[0]
+        version = body[1:1 + version_length].decode('utf-8')
+        if version != self._info['version']:
+            self.info()
+        offset = 1 + version_length
+        n_classes = len(self._info['classes'])
+        labels = [self._info['classes'][i] for i in body[offset:offset + len(records)]]
+        offset += len(records)
+        flat = struct.unpack_from(f'<{len(records) * n_classes}f', body, offset)
+        probabilities = [list(flat[i * n_classes:(i + 1) * n_classes]) for i in range(len(records))]
+        return labels, probabilities
+
+    def predict(self, record):
+        return self.predict_proba([record])[0][0]
+
+    def top_contributions(self, record, k=6, target=None):
+        # Same return shape as explain.top_contributions, computed by the server
+        classes = self._info['classes']
+        target_code = 255 if target is None else classes.index(target)
+        body = self._call_records(OP_EXPLAIN, [record], struct.pack('<B', target_code))
+        contributions = struct.unpack_from(f'<{len(FEATURE_COLUMNS)}d', body, 1)
+        order = sorted(range(len(FEATURE_COLUMNS)), key=lambda j: -abs(contributions[j]))[:k]
+        return classes[body[0]], [(FEATURE_COLUMNS[j], record[FEATURE_COLUMNS[j]], contributions[j]) for j in order]
+
+    def rollback(self):
+        _, body = self._call(OP_ROLLBACK)
+        return bool(body[0])
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+
+import joblib
+
+from artifacts import ARTIFACT_ROOT, latest_artifact_dir, load_artifact, read_published
+from fast_predictor import FAST_MODEL_PATH, FastPredictor
+from instrumentation import metrics
+from model_utils import MODEL_PATH, file_sha256, resident_memory_mb
+from quantize import QUANTIZED_MODEL_PATH, QuantizedPredictor
+
+# Hot-reloadable model holder shared by every Streamlit session. A watcher thread
+# polls the PUBLISHED marker that train.py, distill.py and quantize.py rewrite after
+# all their files are in place; when it changes, the new version is loaded in that
+# thread while requests keep reading the current one, and then swapped in with a
+# single reference assignment. The replaced version is kept for instant rollback.
+
+
+def load_latest(model_path=MODEL_PATH, artifact_root=ARTIFACT_ROOT, fast_path=FAST_MODEL_PATH,
+                quantized_path=QUANTIZED_MODEL_PATH):
+    # Prefer the compact export from quantize.py (only written when it agrees with the
+    # pipeline), then the memory-mapped artifact written by train.py (shared between
+    # workers), then the .npz fast path, then the pickled pipeline. Exports older than
+    # model_pipeline.pkl are ignored.
+    artifact_dir = latest_artifact_dir(artifact_root)
+
+    def is_fresh(path):
+        return not os.path.exists(model_path) or os.path.getmtime(path) >= os.path.getmtime(model_path)
+
+    # Content hash of the pickle: tables derived from it (lookup_table.py) are matched on it
+    pkl_sha256 = file_sha256(model_path) if os.path.exists(model_path) else None
+    start = time.perf_counter()
+    if os.path.exists(quantized_path) and is_fresh(quantized_path):
+        model, source = QuantizedPredictor.load(quantized_path), "model_quantized.npz"
+        version = time.strftime('q-%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(quantized_path)))
+    elif artifact_dir is not None and is_fresh(os.path.join(artifact_dir, 'metadata.json')):
+        model = load_artifact(artifact_dir, mmap_mode='r')
+        source, version = f"artefato {os.path.basename(artifact_dir)}", model.version
+    elif os.path.exists(fast_path) and is_fresh(fast_path):
+        model, source = FastPredictor.load(fast_path), "model_fast.npz"
+        version = time.strftime('npz-%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(fast_path)))
+    else:
+        model, source = joblib.load(model_path), "model_pipeline.pkl"
+        version = time.strftime('pkl-%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(model_path)))
+    info = {
+        'version': version,
+        'source': source,
+        'seconds': time.perf_counter() - start,
+        'rss_mb': resident_memory_mb(),
+        'loaded_at': time.strftime('%H:%M:%S'),
+        'pkl_sha256': pkl_sha256,
+    }
+    metrics.record('load_model', info['seconds'])
+    return model, info
+
+
+class ModelRegistry:
+    def __init__(self, model_path=MODEL_PATH, artifact_root=ARTIFACT_ROOT, fast_path=FAST_MODEL_PATH,
+                 quantized_path=QUANTIZED_MODEL_PATH, poll_interval=2.0, watch=True):
+        self.paths = (model_path, artifact_root, fast_path, quantized_path)
+        self.poll_interval = poll_interval
+        self.loading = False
+        self.last_error = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        # Cheap to poll every few seconds: one small file read. The model files
+        # themselves are not watched, since a publish writes them one after the other
+        self._signature = read_published(artifact_root)
+        # (model, info) tuples; readers take one reference per request
+        self._active = load_latest(*self.paths)
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+        if watch:
+            self._thread = threading.Thread(target=self._watch, name='model-registry', daemon=True)
+            self._thread.start()
+
+    def current(self):
+        return self._active
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check_for_update()
+
+    def check_for_update(self):
+        signature = read_published(self.paths[1])
+        if signature == self._signature:
+            return False
+        self.loading = True
+        try:
+            loaded = load_latest(*self.paths)
+        except Exception as exc:
+            # A half-written or broken export keeps the current version in service
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            return False
+        finally:
+            self.loading = False
+        with self._lock:
+            self._signature = signature
+            self.last_error = None
+            if loaded[1]['version'] != self._active[1]['version']:
+                self._previous, self._active = self._active, loaded
+                self.reloads += 1
+        return True
+
+    def rollback(self):
+        with self._lock:
+            if self._previous is None:
+                return False
+            self._active, self._previous = self._previous, self._active
+            return True
+
+    def status(self):
+        active, previous = self._active, self._previous
+        return {
+            'version': active[1]['version'],
+            'source': active[1]['source'],
+            'load_seconds': active[1]['seconds'],
+            'loaded_at': active[1]['loaded_at'],
+            'previous_version': previous[1]['version'] if previous else None,
+            'loading': self.loading,
+            'reloads': self.reloads,
+            'last_error': self.last_error,
+        }
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import signal
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from explain import TreeExplainer
+from fast_predictor import FastPredictor, tree_estimators
+from model_client import (MAGIC, MAX_ROWS, MODEL_SOCKET_PATH, OP_EXPLAIN, OP_INFO, OP_PREDICT, OP_ROLLBACK, RECORD,
+                          REQUEST_HEADER, RESPONSE_HEADER, STATUS_ERROR, STATUS_OK, STATUS_STALE, ModelClient,
+                          decode_records, recv_exact, vocabulary_id)
+from model_registry import ModelRegistry
+from model_utils import APP_DIR, CATEGORICAL_FEATURES, FEATURE_COLUMNS, resident_memory_mb
+
+# One process owns the model (through the hot-reloading ModelRegistry) and answers the
+# Streamlit workers on a Unix socket, so N app processes share one loaded forest
+# instead of each unpickling its own. The wire format lives in model_client.py.
+
+
+def category_vocabulary(model):
+    # Categories the encoder knows, per categorical feature, as sent to the clients
+    if isinstance(model, FastPredictor):
+        return [([t['dropped']] if t['dropped'] is not None else []) + t['kept']
+                for t in model.meta['category_tables']]
+    encoder = model.named_steps['preprocessor'].named_transformers_['cat']
+    return [[str(c) for c in categories] for categories in encoder.categories_]
+
+
+class ServedModel:
+    # Everything derived from one model version, built once per version
+    def __init__(self, model, info):
+        self.model = model
+        self.info = info
+        self.classes = [str(c) for c in model.classes_]
+        self.vocabulary = category_vocabulary(model)
+        self.vocabulary_id = vocabulary_id(self.vocabulary)
+        # Path contributions need tree arrays; a promoted gbm student has none
+        self.explainable = (isinstance(model, FastPredictor)
+                            or tree_estimators(model.named_steps['classifier']) is not None)
+        self._explainer = None
+        self._explainer_lock = threading.Lock()
+
+    def predict_proba(self, records):
+        if isinstance(self.model, FastPredictor):
+            return self.model.predict_proba(records)
+        return self.model.predict_proba(pd.DataFrame(records, columns=FEATURE_COLUMNS))
+
+    def explainer(self):
+        with self._explainer_lock:
+            if self._explainer is None:
+                if isinstance(self.model, FastPredictor):
+                    self._explainer = TreeExplainer(self.model)
+                else:
+                    self._explainer = TreeExplainer.from_pipeline(self.model)
+            return self._explainer
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, path, registry):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, ModelRequestHandler)
+        os.chmod(path, 0o660)
+        self.registry = registry
+        self.requests = 0
+        self._served = None
+        self._served_lock = threading.Lock()
+
+    def served(self):
+        # Snapshot of the active version; rebuilt only when the registry swapped models
+        model, info = self.registry.current()
+        with self._served_lock:
+            if self._served is None or self._served.model is not model:
+                self._served = ServedModel(model, info)
+            return self._served
+
+    def info(self):
+        served = self.served()
+        return dict(
+            {key: value for key, value in served.info.items() if key != 'rss_mb'},
+            classes=served.classes,
+            vocabulary=served.vocabulary,
+            vocabulary_id=served.vocabulary_id,
+            explainable=served.explainable,
+            categorical_features=CATEGORICAL_FEATURES,
+            status=self.registry.status(),
+            server_pid=os.getpid(),
+            server_rss_mb=resident_memory_mb(),
+            requests=self.requests,
+        )
+
+
+class ModelRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                magic, op, vocab_id, count = REQUEST_HEADER.unpack(recv_exact(self.request, REQUEST_HEADER.size))
+            except (ConnectionError, OSError):
+                return
+            if magic != MAGIC:
+                self._reply(STATUS_ERROR, b"Bad magic")
+                return
+            try:
+                status, body = self._dispatch(op, vocab_id, count)
+            except (ConnectionError, OSError):
+                return
+            except ValueError as exc:
+                status, body = STATUS_ERROR, str(exc).encode('utf-8')
+            except Exception as exc:
+                # Any other failure is reported to this request; the connection stays usable
+                status, body = STATUS_ERROR, f"{type(exc).__name__}: {exc}".encode('utf-8')
+            self.server.requests += 1
+            self._reply(status, body)
+
+    def _reply(self, status, body):
+        self.request.sendall(RESPONSE_HEADER.pack(status, len(body)) + body)
+
+    def _dispatch(self, op, vocab_id, count):
+        server = self.server
+        extra = 1 if op == OP_EXPLAIN else 0
+        payload = recv_exact(self.request, count * RECORD.size + extra) if op in (OP_PREDICT, OP_EXPLAIN) else b''
+        if op == OP_INFO:
+            return STATUS_OK, json.dumps(server.info()).encode('utf-8')
+        if op == OP_ROLLBACK:
+            return STATUS_OK, bytes([server.registry.rollback()])
+
+        served = server.served()
+        if vocab_id != served.vocabulary_id:
+            return STATUS_STALE, b''
+        records = decode_records(payload, count, served.vocabulary)
+
+        if op == OP_PREDICT:
+            if not 0 < count <= MAX_ROWS:
+                raise ValueError(f"Expected 1 to {MAX_ROWS} records, got {count}")
+            probabilities = np.asarray(served.predict_proba(records))
+            version = served.info['version'].encode('utf-8')
+            return STATUS_OK, (bytes([len(version)]) + version
+                               + probabilities.argmax(axis=1).astype(np.uint8).tobytes()
+                               + probabilities.astype('<f4').tobytes())
+        if op == OP_EXPLAIN:
+            if count != 1:
+                raise ValueError("OP_EXPLAIN takes exactly one record")
+            target = payload[-1]
+            if target != 255 and target >= len(served.classes):
+                raise ValueError(f"Invalid target class code {target}")
+            if not served.explainable:
+                raise ValueError(f"Model cannot be explained: {type(served.model).__name__} has no tree arrays")
+            probabilities, contributions = served.explainer().explain(records[0])
+            target = int(np.argmax(probabilities[0])) if target == 255 else target
+            return STATUS_OK, bytes([target]) + struct.pack(f'<{len(FEATURE_COLUMNS)}d', *contributions[0, :, target])
+        raise ValueError(f"Unknown op {op}")
+
+
+def wait_for_server(path, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        client = ModelClient.connect(path)
+        if client is not None:
+            return client
+        time.sleep(0.1)
+    raise TimeoutError(f"Model server did not answer on '{path}'")
+
+
+def child_rss(code):
+    # Resident memory reported by a fresh interpreter running `code`
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=APP_DIR).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def benchmark(path, n_processes, requests):
+    from benchmark import APP_INPUT
+    from model_registry import load_latest
+
+    server = subprocess.Popen([sys.executable, os.path.join(APP_DIR, 'model_server.py'), '--socket', path])
+    try:
+        client = wait_for_server(path)
+        for _ in range(20):
+            client.predict(APP_INPUT)
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.predict(APP_INPUT)
+            timings.append(time.perf_counter() - start)
+
+        model, info = load_latest()
+        served = ServedModel(model, info)
+        local = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            served.predict_proba([APP_INPUT])
+            local.append(time.perf_counter() - start)
+        remote_label = client.predict(APP_INPUT)
+        local_label = served.classes[int(np.argmax(served.predict_proba([APP_INPUT])[0]))]
+        print(f"Model: {info['source']}")
+        print(f"Round trip over the socket: p50 {np.percentile(timings, 50) * 1e3:.2f} ms, "
+              f"p95 {np.percentile(timings, 95) * 1e3:.2f} ms "
+              f"(in-process predict p50 {np.percentile(local, 50) * 1e3:.2f} ms); "
+              f"same prediction: {remote_label == local_label}")
+
+        in_process = child_rss("from model_registry import load_latest; from model_utils import resident_memory_mb; "
+                               "load_latest(); print(resident_memory_mb())")
+        thin_client = child_rss(f"from model_client import ModelClient; from model_utils import resident_memory_mb; "
+                                f"c = ModelClient({path!r}); c.info(); c.predict({APP_INPUT!r}); "
+                                f"print(resident_memory_mb())")
+        server_rss = client.info()['server_rss_mb']
+        print(f"Resident memory per process: in-process model {in_process:.0f} MB, "
+              f"thin client {thin_client:.0f} MB, server {server_rss:.0f} MB")
+        for n in sorted({1, 2, 4, n_processes}):
+            print(f"  {n:>2} app processes: independent loads {n * in_process:6.0f} MB vs "
+                  f"server + clients {server_rss + n * thin_client:6.0f} MB")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the model to local app processes over a Unix socket.")
+    parser.add_argument('--socket', default=MODEL_SOCKET_PATH, help="Unix socket path (env OBESITY_MODEL_SOCKET)")
+    parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between model file checks")
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help="Start a server on --socket and compare latency/memory against N in-process loads")
+    parser.add_argument('--requests', type=int, default=1000, help="Round trips timed by --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.socket, args.benchmark, args.requests)
+        return
+
+    registry = ModelRegistry(poll_interval=args.poll_interval)
+    server = ModelServer(args.socket, registry)
+    try:
+        # Built up front so the first explanation request does not pay for it
+        server.served().explainer()
+    except ValueError:
+        pass
+    # Service managers stop with SIGTERM; exit through the finally block to remove the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving model {registry.status()['version']} on {args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import hashlib
+import os
+
+# Shared paths and feature schema used by training, the Streamlit app and batch scoring
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(APP_DIR, 'model_pipeline.pkl')
+DATA_PATH = os.path.normpath(os.path.join(APP_DIR, '..', 'data', 'Obesity.csv'))
+
+TARGET_COLUMN = 'Obesity'
+FEATURE_COLUMNS = [
+    'Gender', 'Age', 'Height', 'Weight', 'family_history', 'FAVC', 'FCVC',
+    'NCP', 'CAEC', 'SMOKE', 'CH2O', 'SCC', 'FAF', 'TUE', 'CALC', 'MTRANS'
+]
+NUMERICAL_FEATURES = ['Age', 'Height', 'Weight', 'FCVC', 'NCP', 'CH2O', 'FAF', 'TUE']
+CATEGORICAL_FEATURES = ['Gender', 'family_history', 'FAVC', 'CAEC', 'SMOKE', 'SCC', 'CALC', 'MTRANS']
+
+# Rounding specific columns according to data dictionary
+ROUND_COLS = ['FCVC', 'NCP', 'CH2O', 'FAF', 'TUE', 'Age']
+
+
+def preprocess_raw_data(df):
+    df_copy = df.copy()
+    for col in ROUND_COLS:
+        df_copy[col] = df_copy[col].round().astype(int)
+    return df_copy
+
+
+def file_sha256(path):
+    # Identifies a data or model file by content, so copies and checkouts still match
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_pipeline(model_path=MODEL_PATH):
+    # Imported here so the stdlib-only callers (model_client.py) never load joblib
+    import joblib
+    return joblib.load(model_path)
+
+
+def resident_memory_mb():
+    # Current RSS on Linux; peak RSS on other Unix systems; None where neither is
+    # available (Windows has no resource module)
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
@@ -0,0 +1,44 @@
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier
+
+from data_loading import load_patients
+from model_utils import CATEGORICAL_FEATURES, NUMERICAL_FEATURES, TARGET_COLUMN
+
+# Model definition shared by train.py and the training tools built on top of it
+
+DEFAULT_CLASSIFIER_PARAMS = {'n_estimators': 100, 'random_state': 42}
+
+
+def load_dataset(path='data/Obesity.csv', use_cache=True):
+    # Typed columnar cache, rebuilt only when the CSV changes
+    df_clean = load_patients(path, use_cache=use_cache)
+    X = df_clean.drop(TARGET_COLUMN, axis=1)
+    y = df_clean[TARGET_COLUMN]
+    return X, y
+
+
+def known_categories(X, categorical_features=CATEGORICAL_FEATURES):
+    # Rare levels (CALC='Always' appears once) can be missing from a CV fold, so
+    # cross-validation passes the full category list to the encoder up front
+    return [sorted(X[col].astype(str).unique()) for col in categorical_features]
+
+
+def build_preprocessor(numerical_features=NUMERICAL_FEATURES, categorical_features=CATEGORICAL_FEATURES,
+                       categories='auto'):
+    return ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', OneHotEncoder(categories=categories, drop='first', sparse_output=False), categorical_features)
+        ]
+    )
+
+
+def build_pipeline(categories='auto', **classifier_params):
+    params = dict(DEFAULT_CLASSIFIER_PARAMS)
+    params.update(classifier_params)
+    return Pipeline(steps=[
+        ('preprocessor', build_preprocessor(categories=categories)),
+        ('classifier', RandomForestClassifier(**params))
+    ])
@@ -0,0 +1,169 @@
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from batch_score import score_frame
+from model_utils import MODEL_PATH, NUMERICAL_FEATURES, load_pipeline
+
+# Multi-process scoring for very large patient files. The input is split into
+# byte-range shards aligned on line boundaries (the Obesity.csv schema has no quoted
+# newlines), each worker process loads the pipeline once and scores its shards with
+# the same score_frame used by batch_score.py, and the per-shard outputs are merged
+# back in the original row order.
+
+_worker = {}
+
+# A shard may contain only whole-number values, so numeric columns are pinned to float
+# to keep the echoed inputs formatted the same way regardless of where a shard starts
+SHARD_DTYPES = {col: 'float64' for col in NUMERICAL_FEATURES}
+
+
+def _init_worker(model_path):
+    _worker['model'] = load_pipeline(model_path)
+
+
+def plan_shards(path, n_shards):
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        step = max(1, (size - data_start) // n_shards)
+        boundaries = [data_start]
+        for i in range(1, n_shards):
+            f.seek(max(data_start + i * step, boundaries[-1]))
+            f.readline()  # move to the start of the next full line
+            position = f.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(size)
+    return header, [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+
+
+class ShardReader(io.RawIOBase):
+    # The CSV header followed by bytes [start, end) of the file, read on demand, so a
+    # worker holds one parsed chunk at a time instead of its whole shard
+    def __init__(self, f, header, start, end):
+        self._f = f
+        self._header = header
+        self._remaining = end - start
+        f.seek(start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._header:
+            n = min(len(buffer), len(self._header))
+            buffer[:n] = self._header[:n]
+            self._header = self._header[n:]
+            return n
+        if self._remaining <= 0:
+            return 0
+        n = self._f.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+
+
+def score_shard(task):
+    index, path, header, start, end, out_dir, chunksize, keep_inputs = task
+    began = time.perf_counter()
+    out_path = os.path.join(out_dir, f'part-{index:05d}.csv')
+    rows = 0
+    with open(path, 'rb') as f:
+        shard = io.BufferedReader(ShardReader(f, header, start, end), buffer_size=1 << 20)
+        reader = pd.read_csv(shard, chunksize=chunksize, dtype=SHARD_DTYPES)
+        for i, chunk in enumerate(reader):
+            scored = score_frame(_worker['model'], chunk)
+            if keep_inputs:
+                scored = pd.concat([chunk, scored], axis=1)
+            scored.to_csv(out_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows += len(chunk)
+    return index, out_path, rows, time.perf_counter() - began
+
+
+def merge_parts(parts, output_path):
+    # Parts are concatenated in shard order; only the first header is kept
+    with open(output_path, 'wb') as out:
+        for i, part in enumerate(parts):
+            with open(part, 'rb') as f:
+                if i > 0:
+                    f.readline()
+                shutil.copyfileobj(f, out, length=1 << 20)
+
+
+def score_parallel(input_path, output_path, model_path=MODEL_PATH, workers=None,
+                   shards_per_worker=4, chunksize=50_000, keep_inputs=True, verbose=True):
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    header, shards = plan_shards(input_path, workers * shards_per_worker)
+    out_dir = tempfile.mkdtemp(prefix='shards-', dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        tasks = [(i, input_path, header, s, e, out_dir, chunksize, keep_inputs) for i, (s, e) in enumerate(shards)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as executor:
+            results = sorted(executor.map(score_shard, tasks))
+        # An input without data rows still gets the header, from the first shard
+        merge_parts([r[1] for r in results if r[2] > 0] or [results[0][1]], output_path)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    rows = sum(r[2] for r in results)
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(f"Scored {rows} rows in {len(shards)} shards on {workers} processes in {elapsed:.2f}s "
+              f"({rows / max(elapsed, 1e-9):,.0f} rows/s) -> {output_path}")
+    return rows, elapsed
+
+
+def benchmark(rows, model_path, worker_counts, chunksize):
+    from synthetic import make_synthetic_patients
+
+    work_dir = tempfile.mkdtemp(prefix='parallel-bench-')
+    try:
+        input_path = os.path.join(work_dir, 'patients.csv')
+        make_synthetic_patients(rows).to_csv(input_path, index=False)
+        print(f"Synthetic input: {rows:,} rows ({os.path.getsize(input_path) / 1e6:.0f} MB)")
+        single = None
+        for workers in worker_counts:
+            _, elapsed = score_parallel(input_path, os.path.join(work_dir, 'out.csv'), model_path,
+                                        workers=workers, chunksize=chunksize, verbose=False)
+            single = single or elapsed
+            print(f"  {workers:>3} processes: {elapsed:7.2f}s  {rows / elapsed:>10,.0f} rows/s  "
+                  f"speedup {single / elapsed:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a large patient CSV with a pool of processes.")
+    parser.add_argument('input', nargs='?', help="CSV with the same feature columns as data/Obesity.csv")
+    parser.add_argument('output', nargs='?', help="Destination CSV (rows keep the input order)")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--shards-per-worker', type=int, default=4, help="Byte-range shards per worker")
+    parser.add_argument('--chunksize', type=int, default=50_000, help="Rows scored at a time inside a shard")
+    parser.add_argument('--predictions-only', action='store_true',
+                        help="Write only the prediction columns, without echoing the inputs")
+    parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                        help="Benchmark 1..N processes on ROWS synthetic patients instead of scoring a file")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        counts = sorted({1, 2, 4, 8, 16, args.workers} & set(range(1, args.workers + 1)))
+        benchmark(args.benchmark, args.model, counts, args.chunksize)
+        return
+    if not args.input or not args.output:
+        parser.error("input and output are required unless --benchmark is given")
+    score_parallel(args.input, args.output, args.model, args.workers, args.shards_per_worker,
+                   args.chunksize, keep_inputs=not args.predictions_only)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from model_utils import FEATURE_COLUMNS, MODEL_PATH, ROUND_COLS
+
+# LRU + TTL memoization of single-patient predictions. Every input except Height and
+# Weight comes from a discrete widget, so real traffic repeats the same combinations.
+
+# Height/Weight are quantized to the step of their number_input widgets in app.py
+QUANTIZE_DECIMALS = {'Height': 2, 'Weight': 1}
+
+
+def make_key(input_data):
+    key = []
+    for col in FEATURE_COLUMNS:
+        value = input_data[col]
+        if col in QUANTIZE_DECIMALS:
+            value = round(float(value), QUANTIZE_DECIMALS[col])
+        elif col in ROUND_COLS:
+            value = int(round(float(value)))
+        else:
+            value = str(value)
+        key.append(value)
+    return tuple(key)
+
+
+class PredictionCache:
+    def __init__(self, model_path=MODEL_PATH, maxsize=4096, ttl=3600.0, clock=time.monotonic):
+        self.model_path = model_path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped whenever the entries are dropped, so a value computed across a clear
+        # or a model change is not written back
+        self._generation = 0
+        self._model_signature = self._signature()
+
+    def _signature(self):
+        # A retrained model_pipeline.pkl changes its mtime and usually its size
+        try:
+            stat = os.stat(self.model_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _check_model(self, model_version=None):
+        # An explicit version (e.g. from the model registry) also covers rollbacks,
+        # which swap the model without touching the file
+        signature = self._signature() if model_version is None else model_version
+        if signature != self._model_signature:
+            self._entries.clear()
+            self._generation += 1
+            self._model_signature = signature
+            self.invalidations += 1
+
+    def get(self, input_data, compute, model_version=None):
+        # compute(canonical_input) is called on a miss; it receives the quantized
+        # inputs so every request sharing a key gets the same answer
+        key = make_key(input_data)
+        now = self.clock()
+        with self._lock:
+            self._check_model(model_version)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation
+
+        value = compute(dict(zip(FEATURE_COLUMNS, key)))
+
+        with self._lock:
+            # Cleared or switched to another model while computing: return the value
+            # to this caller only
+            if self._generation != generation:
+                return value
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'invalidations': self.invalidations,
+        }
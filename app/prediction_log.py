@@ -0,0 +1,445 @@
+import argparse
+import atexit
+import calendar
+import functools
+import itertools
+import operator
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from model_utils import APP_DIR, CATEGORICAL_FEATURES, FEATURE_COLUMNS, ROUND_COLS, TARGET_COLUMN
+
+# Audit log of the assessments made in the app: inputs, model prediction, BMI override
+# and final category. The request path only appends a tuple to an in-memory buffer; a
+# background thread flushes the buffer every FLUSH_SECONDS (or FLUSH_ROWS records) as
+# new zstd-compressed Parquet files, partitioned by UTC day:
+#
+#   prediction_log/
+#     date=2026-10-17/
+#       part-<first ms>-<pid>-<random>.parquet
+#
+# Files are only ever added (several app processes can share the directory), and each
+# is renamed into place once complete. A date range skips whole day directories.
+# --compact (run e.g. nightly) merges the many small flush files of every closed day
+# into one file sorted by (prediction, bmi_override) with one row group per pair, so a
+# query on a class or on the override flag skips the other row groups from their
+# min/max statistics without reading them.
+
+PREDICTION_LOG_DIR = os.environ.get('OBESITY_PREDICTION_LOG', os.path.join(APP_DIR, 'prediction_log'))
+FLUSH_ROWS = 500
+FLUSH_SECONDS = 10.0
+MAX_PENDING = 100_000
+COMPRESSION = 'zstd'
+COMPACTED_ROW_GROUP_ROWS = 65_536
+
+FEATURE_TYPES = {
+    **{col: pa.string() for col in CATEGORICAL_FEATURES},
+    **{col: pa.int8() for col in ROUND_COLS},
+    'Age': pa.int16(),
+    'Height': pa.float64(),
+    'Weight': pa.float64(),
+}
+LOG_SCHEMA = pa.schema(
+    [('request_id', pa.string()), ('logged_at', pa.timestamp('ms', tz='UTC'))]
+    + [(col, FEATURE_TYPES[col]) for col in FEATURE_COLUMNS]
+    + [('model_version', pa.string()), ('prediction', pa.string()), ('bmi', pa.float64()),
+       ('bmi_override', pa.bool_()), ('final_prediction', pa.string())]
+)
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+# Sort order of compacted files; one row group per distinct pair
+ROW_GROUP_KEYS = ['prediction', 'bmi_override']
+LABEL_COLUMNS = ['final_prediction', 'prediction']
+
+
+def day_of(logged_at_ms):
+    return time.strftime('%Y-%m-%d', time.gmtime(logged_at_ms / 1000))
+
+
+def rows_to_table(rows):
+    columns = dict(zip(LOG_SCHEMA.names, zip(*rows)))
+    for col in ROUND_COLS:
+        columns[col] = [int(round(value)) for value in columns[col]]
+    return pa.table({field.name: pa.array(columns[field.name], type=field.type) for field in LOG_SCHEMA},
+                    schema=LOG_SCHEMA)
+
+
+def sort_for_row_groups(table):
+    return table.sort_by([(key, 'ascending') for key in ROW_GROUP_KEYS + ['logged_at']])
+
+
+def write_part(path, table, grouped=False):
+    # Written under a dot-name, which dataset discovery ignores, and renamed once
+    # complete. `grouped` expects a table sorted by ROW_GROUP_KEYS and starts a new
+    # row group at every change of key
+    tmp_path = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+    with pq.ParquetWriter(tmp_path, LOG_SCHEMA, compression=COMPRESSION) as writer:
+        if not grouped:
+            writer.write_table(table)
+        else:
+            keys = list(zip(*(table[key].to_pylist() for key in ROW_GROUP_KEYS)))
+            offset = 0
+            for _, group in itertools.groupby(keys):
+                length = sum(1 for _ in group)
+                writer.write_table(table.slice(offset, length), row_group_size=COMPACTED_ROW_GROUP_ROWS)
+                offset += length
+    os.replace(tmp_path, path)
+
+
+def write_batch(directory, rows):
+    # One new file per day present in the batch; returns the number of files written
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(day_of(row[1]), []).append(row)
+    for day, day_rows in by_day.items():
+        partition = os.path.join(directory, f'date={day}')
+        os.makedirs(partition, exist_ok=True)
+        name = f'part-{day_rows[0][1]}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet'
+        write_part(os.path.join(partition, name), rows_to_table(day_rows))
+    return len(by_day)
+
+
+class PredictionLog:
+    def __init__(self, directory=PREDICTION_LOG_DIR, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS,
+                 max_pending=MAX_PENDING):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.written = 0
+        self.files = 0
+        self.dropped = 0
+        self.last_error = None
+        self.last_flush_at = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='prediction-log', daemon=True)
+        self._thread.start()
+        # Records still buffered when the process exits are flushed on the way out
+        atexit.register(self.close)
+
+    def record(self, input_data, prediction, bmi, bmi_override, final_prediction, model_version=None):
+        # Request path: one tuple appended under a lock, no I/O. Returns the record id
+        request_id = uuid.uuid4().hex
+        row = (request_id, time.time_ns() // 1_000_000, *[input_data[col] for col in FEATURE_COLUMNS],
+               model_version, str(prediction), float(bmi), bool(bmi_override), str(final_prediction))
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                # The writer has been failing for a long time; keep memory bounded
+                self.dropped += 1
+                return None
+            self._pending.append(row)
+            if len(self._pending) >= self.flush_rows:
+                self._wake.set()
+        return request_id
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                files = write_batch(self.directory, rows)
+            except Exception as exc:
+                # Kept for the next attempt; the request path never sees the error
+                with self._lock:
+                    self._pending[:0] = rows
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                return 0
+            self.written += len(rows)
+            self.files += files
+            self.last_error = None
+            self.last_flush_at = time.strftime('%H:%M:%S')
+            return len(rows)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=self.flush_seconds)
+        self.flush()
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'pending': len(self._pending),
+            'files': self.files,
+            'dropped': self.dropped,
+            'last_flush_at': self.last_flush_at,
+            'last_error': self.last_error,
+        }
+
+
+def log_filter(start=None, end=None, prediction=None, final_prediction=None, bmi_override=None):
+    # Dates are inclusive 'YYYY-MM-DD' strings (UTC); class filters take one or more labels
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field('date') >= str(start))
+    if end is not None:
+        conditions.append(ds.field('date') <= str(end))
+    for column, labels in (('prediction', prediction), ('final_prediction', final_prediction)):
+        if labels is not None:
+            conditions.append(ds.field(column).isin([labels] if isinstance(labels, str) else list(labels)))
+    if bmi_override is not None:
+        conditions.append(ds.field('bmi_override') == bool(bmi_override))
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+def open_dataset(directory=PREDICTION_LOG_DIR):
+    if not os.path.isdir(directory):
+        return None
+    dataset = ds.dataset(directory, format='parquet', partitioning=PARTITIONING)
+    return dataset if dataset.files else None
+
+
+def query(directory=PREDICTION_LOG_DIR, columns=None, **filters):
+    # Day directories outside the range are never opened; row groups whose statistics
+    # exclude the class/override filter are skipped without being read
+    dataset = open_dataset(directory)
+    if dataset is None:
+        schema = LOG_SCHEMA.append(pa.field('date', pa.string()))
+        return schema.empty_table().select(columns or schema.names).to_pandas()
+    return dataset.to_table(columns=columns, filter=log_filter(**filters)).to_pandas()
+
+
+def scan_report(directory=PREDICTION_LOG_DIR, **filters):
+    # How much of the log a filtered query has to read
+    dataset = open_dataset(directory)
+    if dataset is None:
+        return {'files': 0, 'row_groups': 0, 'files_read': 0, 'row_groups_read': 0}
+    expression = log_filter(**filters)
+    fragments = list(dataset.get_fragments())
+    matching = list(dataset.get_fragments(filter=expression)) if expression is not None else fragments
+    return {
+        'files': len(fragments),
+        'row_groups': sum(f.num_row_groups for f in fragments),
+        'files_read': len(matching),
+        'row_groups_read': sum(len(f.split_by_row_group(expression, schema=dataset.schema)) for f in matching),
+    }
+
+
+def training_frame(directory=PREDICTION_LOG_DIR, label='final_prediction', **filters):
+    # Logged inputs in the data/Obesity.csv layout, `label` as the target column
+    if label not in LABEL_COLUMNS:
+        raise ValueError(f"label must be one of {LABEL_COLUMNS}, got {label!r}")
+    frame = query(directory, columns=FEATURE_COLUMNS + [label], **filters)
+    return frame.rename(columns={label: TARGET_COLUMN})
+
+
+def move_parts(source, partition, skip=()):
+    # Moves the finished .parquet files of `source` into `partition`, except `skip`
+    os.makedirs(partition, exist_ok=True)
+    for part in os.listdir(source):
+        if part.endswith('.parquet') and part not in skip:
+            os.replace(os.path.join(source, part), os.path.join(partition, part))
+
+
+def uncompacted_parts(retired, partition):
+    # Parts of `retired` holding records missing from the compacted file of `partition`:
+    # late flushes that compact() had not moved back yet when it died
+    compacted_ids = set()
+    for part in os.listdir(partition):
+        if part.endswith('-compacted.parquet'):
+            compacted_ids.update(pq.read_table(os.path.join(partition, part), columns=['request_id'])
+                                 ['request_id'].to_pylist())
+    return [part for part in os.listdir(retired) if part.endswith('.parquet') and not compacted_ids.issuperset(
+        pq.read_table(os.path.join(retired, part), columns=['request_id'])['request_id'].to_pylist())]
+
+
+def recover_compaction(directory=PREDICTION_LOG_DIR):
+    # Cleans up after a compaction that died mid-swap. A .retired directory next to a
+    # .compacting one means the swap never finished: the original parts go back into
+    # the day directory and the staged file is dropped. A .retired directory on its own
+    # means the compacted file is already in place; parts it does not cover go back
+    # before the rest is removed. Returns the days that were touched
+    recovered = []
+    for entry in sorted(os.listdir(directory)):
+        if not (entry.startswith('.date=') and entry.endswith('.retired')):
+            continue
+        name = entry[1:-len('.retired')]
+        retired = os.path.join(directory, entry)
+        partition = os.path.join(directory, name)
+        staging = os.path.join(directory, f'.{name}.compacting')
+        if os.path.isdir(staging) or not os.path.isdir(partition):
+            move_parts(retired, partition)
+        else:
+            late = uncompacted_parts(retired, partition)
+            move_parts(retired, partition, skip=set(os.listdir(retired)) - set(late))
+        shutil.rmtree(retired)
+        recovered.append(name)
+    for entry in sorted(os.listdir(directory)):
+        if entry.startswith('.date=') and entry.endswith('.compacting'):
+            shutil.rmtree(os.path.join(directory, entry))
+            name = entry[1:-len('.compacting')]
+            if name not in recovered:
+                recovered.append(name)
+    return recovered
+
+
+def compact(directory=PREDICTION_LOG_DIR, before=None):
+    # Merges the parts of every day before `before` (default: yesterday, UTC, so a day
+    # still receiving late flushes is left alone) into one file. The day directory is
+    # swapped with two renames; readers never see a partial day. Leftovers of a run
+    # that died mid-swap are recovered first
+    if not os.path.isdir(directory):
+        return []
+    recover_compaction(directory)
+    before = before or day_of(time.time() * 1000 - 86_400_000)
+    compacted = []
+    for name in sorted(os.listdir(directory)):
+        if not name.startswith('date=') or name[len('date='):] >= before:
+            continue
+        partition = os.path.join(directory, name)
+        parts = sorted(p for p in os.listdir(partition) if p.endswith('.parquet'))
+        if len(parts) < 2:
+            continue
+        table = pa.concat_tables(pq.ParquetFile(os.path.join(partition, p)).read() for p in parts)
+        staging = os.path.join(directory, f'.{name}.compacting')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        write_part(os.path.join(staging, f'part-{name[len("date="):]}-compacted.parquet'),
+                   sort_for_row_groups(table), grouped=True)
+        retired = os.path.join(directory, f'.{name}.retired')
+        os.replace(partition, retired)
+        os.replace(staging, partition)
+        # A late flush that landed after the parts were read is kept, not deleted
+        move_parts(retired, partition, skip=parts)
+        shutil.rmtree(retired)
+        compacted.append((name, len(parts), table.num_rows))
+    return compacted
+
+
+def benchmark(rows, days, directory):
+    # Synthetic assessments spread over `days` days, written as the app's writer would
+    # (one file per FLUSH_ROWS), then timed queries before and after compaction
+    from model_utils import preprocess_raw_data
+    from rules import evaluate_rules
+    from synthetic import make_synthetic_patients
+
+    patients = preprocess_raw_data(make_synthetic_patients(rows, include_target=True))
+    rules = evaluate_rules(patients, patients[TARGET_COLUMN].to_numpy())
+    outcomes = list(zip(patients[TARGET_COLUMN].tolist(), rules['BMI'].tolist(), rules['bmi_override'].tolist(),
+                        rules['final_prediction'].tolist()))
+    records = patients[FEATURE_COLUMNS].to_dict('records')
+
+    with tempfile.TemporaryDirectory() as live_directory:
+        log = PredictionLog(live_directory, flush_rows=len(records) + 1, flush_seconds=3600)
+        timings = np.empty(min(rows, 10_000))
+        for i in range(len(timings)):
+            start = time.perf_counter()
+            log.record(records[i], *outcomes[i], 'benchmark')
+            timings[i] = time.perf_counter() - start
+        start = time.perf_counter()
+        log.close()
+        flush_seconds = time.perf_counter() - start
+    print(f"record() on the request path: p50 {np.percentile(timings, 50) * 1e6:.1f} us, "
+          f"p99 {np.percentile(timings, 99) * 1e6:.1f} us; background flush of {len(timings):,} records "
+          f"{flush_seconds * 1e3:.0f} ms")
+
+    start_ms = calendar.timegm(time.strptime('2026-01-01', '%Y-%m-%d')) * 1000
+    step_ms = days * 86_400_000 // rows
+    start = time.perf_counter()
+    for offset in range(0, rows, FLUSH_ROWS):
+        write_batch(directory, [
+            (uuid.uuid4().hex, start_ms + i * step_ms, *[records[i][col] for col in FEATURE_COLUMNS],
+             'benchmark', *outcomes[i])
+            for i in range(offset, min(offset + FLUSH_ROWS, rows))
+        ])
+    seconds = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(directory) for f in files)
+    print(f"Wrote {rows:,} records over {days} days in {seconds:.2f}s "
+          f"({rows / seconds:,.0f} records/s, {size / rows:.0f} bytes/record on disk)")
+
+    def timed(label, **filters):
+        start = time.perf_counter()
+        result = query(directory, **filters)
+        elapsed = time.perf_counter() - start
+        report = scan_report(directory, **filters)
+        print(f"  {label:<38} {len(result):>8,} rows {elapsed * 1e3:>8.1f} ms  "
+              f"{report['files_read']:>5}/{report['files']} files "
+              f"{report['row_groups_read']:>6}/{report['row_groups']} row groups")
+
+    last_week = day_of(start_ms + (days - 7) * 86_400_000)
+    print("Before compaction:")
+    timed("full scan")
+    timed("last 7 days", start=last_week)
+    timed("prediction = Obesity_Type_III", prediction='Obesity_Type_III')
+    timed("BMI override only", bmi_override=True)
+    compacted = compact(directory, before='9999-12-31')
+    print(f"After compacting {len(compacted)} days:")
+    timed("full scan")
+    timed("last 7 days", start=last_week)
+    timed("prediction = Obesity_Type_III", prediction='Obesity_Type_III')
+    timed("BMI override only", bmi_override=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query, export or compact the app's prediction audit log.")
+    parser.add_argument('--log-dir', default=PREDICTION_LOG_DIR, help="Log directory (env OBESITY_PREDICTION_LOG)")
+    parser.add_argument('--from', dest='start', help="First day, YYYY-MM-DD (UTC)")
+    parser.add_argument('--to', dest='end', help="Last day, YYYY-MM-DD (UTC), inclusive")
+    parser.add_argument('--prediction', nargs='+', help="Model prediction(s) to keep")
+    parser.add_argument('--final-prediction', nargs='+', help="Final (BMI-reconciled) class(es) to keep")
+    parser.add_argument('--override', choices=['yes', 'no'], help="Keep only overridden / not overridden records")
+    parser.add_argument('--limit', type=int, default=20, help="Records printed by a query")
+    parser.add_argument('--export', metavar='CSV',
+                        help="Write the matching records as a training CSV (data/Obesity.csv layout)")
+    parser.add_argument('--label', choices=LABEL_COLUMNS, default='final_prediction',
+                        help="Column exported as the Obesity target")
+    parser.add_argument('--compact', action='store_true', help="Merge the parts of closed days into one file each")
+    parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                        help="Write ROWS synthetic records to a temporary log and time queries")
+    parser.add_argument('--days', type=int, default=30, help="Days spanned by --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        with tempfile.TemporaryDirectory() as directory:
+            benchmark(args.benchmark, args.days, directory)
+        return
+    if args.compact:
+        for name, parts, rows in compact(args.log_dir):
+            print(f"{name}: {parts} files -> 1 ({rows} records)")
+        return
+
+    filters = {
+        'start': args.start,
+        'end': args.end,
+        'prediction': args.prediction,
+        'final_prediction': args.final_prediction,
+        'bmi_override': None if args.override is None else args.override == 'yes',
+    }
+    if args.export:
+        frame = training_frame(args.log_dir, args.label, **filters)
+        frame.to_csv(args.export, index=False)
+        print(f"{len(frame)} records exported to '{args.export}' with '{args.label}' as {TARGET_COLUMN}")
+        return
+
+    records = query(args.log_dir, **filters)
+    report = scan_report(args.log_dir, **filters)
+    print(f"{len(records)} records ({report['files_read']}/{report['files']} files, "
+          f"{report['row_groups_read']}/{report['row_groups']} row groups read)")
+    if len(records):
+        print(records.sort_values('logged_at').tail(args.limit)[
+            ['logged_at', 'model_version', 'prediction', 'bmi', 'bmi_override', 'final_prediction']
+        ].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import io
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from artifacts import mark_published
+from fast_predictor import FastPredictor, flatten_pipeline, tree_estimators
+from model_utils import (APP_DIR, DATA_PATH, FEATURE_COLUMNS, MODEL_PATH, TARGET_COLUMN, load_pipeline,
+                         preprocess_raw_data)
+
+# Compact export of the fitted forest for running many replicas:
+#   thresholds      float32, rounded *down* to the nearest float32. Inputs reach the
+#                   trees as float32, so `x <= t32` decides exactly like `x <= t64`
+#   children        per-tree local indices in int16 (int32 if a tree is too large)
+#   feature         uint8 encoded column index
+#   value           leaf class distributions quantized to uint8 (or uint16)
+# Only the leaf distributions are lossy; the export is refused when the predictions
+# agree with the original pipeline on less than --min-agreement of data/Obesity.csv.
+
+QUANTIZED_MODEL_PATH = os.path.join(APP_DIR, 'model_quantized.npz')
+VALUE_DTYPES = {8: np.uint8, 16: np.uint16}
+
+
+def float32_floor(threshold):
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def quantize_arrays(meta, arrays, value_bits=8):
+    roots = arrays['roots'].astype(np.int64)
+    sizes = np.diff(np.append(roots, len(arrays['feature'])))
+    tree_of_node = np.repeat(np.arange(len(roots)), sizes)
+    index_dtype = np.int16 if sizes.max() <= np.iinfo(np.int16).max else np.int32
+
+    scale = np.iinfo(VALUE_DTYPES[value_bits]).max
+    quantized = {
+        'scaler_mean': arrays['scaler_mean'],
+        'scaler_scale': arrays['scaler_scale'],
+        'children_left': (arrays['children_left'] - roots[tree_of_node]).astype(index_dtype),
+        'children_right': (arrays['children_right'] - roots[tree_of_node]).astype(index_dtype),
+        'feature': arrays['feature'].astype(np.uint8 if meta_n_encoded(meta) <= 256 else np.int16),
+        'threshold': float32_floor(arrays['threshold']),
+        'value': np.rint(arrays['value'] * scale).astype(VALUE_DTYPES[value_bits]),
+        'roots': roots.astype(np.int32),
+    }
+    return dict(meta, value_scale=int(scale), value_bits=value_bits), quantized
+
+
+def meta_n_encoded(meta):
+    return len(meta['numerical_features']) + sum(len(t['kept']) for t in meta['category_tables'])
+
+
+class QuantizedPredictor(FastPredictor):
+    def __init__(self, meta, arrays):
+        super().__init__(meta, arrays)
+        self.value_scale = meta['value_scale']
+
+    def apply_encoded(self, encoded):
+        # Same fixed-depth walk as FastPredictor, on tree-local int16 indices
+        rows = np.arange(len(encoded))[:, None]
+        roots = self.roots.astype(np.int64)
+        local = np.zeros((len(encoded), len(roots)), dtype=np.int64)
+        for _ in range(self.max_depth):
+            node = local + roots
+            go_left = encoded[rows, self.feature[node]] <= self.threshold[node]
+            local = np.where(go_left, self.children_left[node], self.children_right[node])
+        return local + roots
+
+    def predict_proba_encoded(self, encoded):
+        return self.value[self.apply_encoded(encoded)].mean(axis=1) / self.value_scale
+
+    def node_arrays(self):
+        # Global children and float distributions, as laid out by FastPredictor
+        roots = self.roots.astype(np.int64)
+        offsets = np.repeat(roots, np.diff(np.append(roots, len(self.feature))))
+        return (self.children_left + offsets, self.children_right + offsets,
+                self.value.astype(np.float64) / self.value_scale)
+
+
+def export_quantized_model(meta, arrays, path=QUANTIZED_MODEL_PATH):
+    np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+    return path
+
+
+def memory_report(pipeline, fast_arrays, quantized_arrays):
+    forest = pipeline.named_steps['classifier']
+    # In-memory sklearn trees: node structs plus the float64 value arrays
+    sklearn_bytes = sum(e.tree_.node_count * 64 + e.tree_.value.nbytes for e in tree_estimators(forest))
+    buffer = io.BytesIO()
+    pickle.dump(forest, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    return {
+        'sklearn_trees': sklearn_bytes,
+        'sklearn_pickle': buffer.tell(),
+        'fast_arrays': sum(a.nbytes for a in fast_arrays.values()),
+        'quantized_arrays': sum(a.nbytes for a in quantized_arrays.values()),
+    }
+
+
+def agreement(pipeline, predictor, X):
+    expected = pipeline.predict_proba(X)
+    actual = predictor.predict_proba(X[FEATURE_COLUMNS].to_numpy(dtype=object))
+    same = np.argmax(expected, axis=1) == np.argmax(actual, axis=1)
+    return float(same.mean()), float(np.abs(expected - actual).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a reduced-precision copy of the forest.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--output', default=QUANTIZED_MODEL_PATH, help="Destination .npz file")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV used to measure prediction agreement")
+    parser.add_argument('--value-bits', type=int, choices=sorted(VALUE_DTYPES), default=8,
+                        help="Bits per leaf class probability")
+    parser.add_argument('--min-agreement', type=float, default=0.999,
+                        help="Refuse to export below this share of identical predictions")
+    args = parser.parse_args()
+
+    pipeline = load_pipeline(args.model)
+    meta, fast_arrays = flatten_pipeline(pipeline)
+    quantized_meta, quantized_arrays = quantize_arrays(meta, fast_arrays, args.value_bits)
+    predictor = QuantizedPredictor(quantized_meta, quantized_arrays)
+
+    X = preprocess_raw_data(pd.read_csv(args.data)).drop(TARGET_COLUMN, axis=1)
+    share, max_diff = agreement(pipeline, predictor, X)
+    sizes = memory_report(pipeline, fast_arrays, quantized_arrays)
+    print(f"Forest memory: sklearn trees {sizes['sklearn_trees'] / 1e6:.2f} MB "
+          f"(pickle {sizes['sklearn_pickle'] / 1e6:.2f} MB), "
+          f"float64 fast arrays {sizes['fast_arrays'] / 1e6:.2f} MB, "
+          f"quantized {sizes['quantized_arrays'] / 1e6:.2f} MB "
+          f"({1 - sizes['quantized_arrays'] / sizes['sklearn_trees']:.0%} smaller than the sklearn trees)")
+    print(f"Agreement on {len(X)} rows of {args.data}: {share:.2%} identical predictions, "
+          f"max probability difference {max_diff:.2e}")
+
+    if share < args.min_agreement:
+        raise SystemExit(f"Agreement {share:.2%} is below --min-agreement {args.min_agreement:.2%}; "
+                         f"not exporting (try --value-bits 16)")
+    export_quantized_model(quantized_meta, quantized_arrays, args.output)
+    # Lets running apps pick up the export
+    mark_published(os.path.join(os.path.dirname(os.path.abspath(args.output)), 'model_artifacts'),
+                   model=os.path.basename(args.output))
+    print(f"Quantized model saved as '{args.output}' ({os.path.getsize(args.output) / 1e6:.2f} MB on disk)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Column-wise clinical rules shared by the app, batch scoring and the HTTP service.
+# Every rule works on whole columns, so one call handles a single UI request (a
+# one-row frame) or millions of rows from a batch file with identical results.
+
+# BMI-based sanity check to avoid unrealistic outputs.
+# Upper bounds of each BMI band, in severity order (last band is open-ended).
+BMI_BINS = [18.5, 25, 27.5, 30, 35, 40]
+
+SEVERITY_ORDER = {
+    "Insufficient_Weight": 0,
+    "Normal_Weight": 1,
+    "Overweight_Level_I": 2,
+    "Overweight_Level_II": 3,
+    "Obesity_Type_I": 4,
+    "Obesity_Type_II": 5,
+    "Obesity_Type_III": 6,
+}
+SEVERITY_KEYS = np.array(sorted(SEVERITY_ORDER, key=SEVERITY_ORDER.get), dtype=object)
+
+# (column, label, predicate) for the "Resumo dos Fatores de Risco" section
+POSITIVE_FACTORS = [
+    ('positive_physical_activity', "Atividade física regular", lambda df: df['FAF'] >= 2),
+    ('positive_vegetables', "Bom consumo de vegetais", lambda df: df['FCVC'] >= 2),
+    ('positive_hydration', "Boa hidratação", lambda df: df['CH2O'] >= 2),
+    ('positive_calorie_monitoring', "Monitora calorias", lambda df: df['SCC'] == "yes"),
+    ('positive_non_smoker', "Não fumante", lambda df: df['SMOKE'] == "no"),
+    ('positive_active_transport', "Transporte ativo", lambda df: df['MTRANS'].isin(["Bike", "Walking"])),
+]
+RISK_FACTORS = [
+    ('risk_sedentary', "Sedentarismo", lambda df: df['FAF'] == 0),
+    ('risk_high_calorie', "Alto consumo calórico", lambda df: df['FAVC'] == "yes"),
+    ('risk_low_vegetables', "Baixo consumo de vegetais", lambda df: df['FCVC'] == 1),
+    ('risk_snacking', "Belisca frequentemente", lambda df: df['CAEC'].isin(["Frequently", "Always"])),
+    ('risk_low_hydration', "Baixa hidratação", lambda df: df['CH2O'] == 1),
+    ('risk_screen_time', "Muito tempo em telas", lambda df: df['TUE'] == 2),
+    ('risk_alcohol', "Alto consumo de álcool", lambda df: df['CALC'].isin(["Frequently", "Always"])),
+    ('risk_smoker', "Fumante", lambda df: df['SMOKE'] == "yes"),
+]
+
+
+def compute_bmi(height, weight):
+    height = np.asarray(height, dtype=float)
+    return np.asarray(weight, dtype=float) / (height ** 2)
+
+
+def bmi_severity(bmi):
+    # Same ladder as `bmi < 18.5 -> ..., bmi < 25 -> ...`: the first band whose
+    # upper bound exceeds the BMI wins, and BMI >= 40 falls into the last band
+    bmi = np.asarray(bmi, dtype=float)
+    conditions = [bmi < bound for bound in BMI_BINS]
+    return np.select(conditions, np.arange(len(BMI_BINS)), default=len(BMI_BINS))
+
+
+def bmi_prediction_key(bmi):
+    return SEVERITY_KEYS[bmi_severity(bmi)]
+
+
+def model_severity(model_keys):
+    # Unknown labels count as Normal_Weight, as in the original dict.get(key, 1)
+    return pd.Series(np.asarray(model_keys, dtype=object)).map(SEVERITY_ORDER).fillna(1).to_numpy(dtype=int)
+
+
+def reconcile_with_bmi(model_keys, bmi):
+    # Returns (final_keys, bmi_keys, overridden) where the BMI band wins whenever
+    # it is more severe than the model prediction
+    model_keys = np.asarray(model_keys, dtype=object)
+    severity = bmi_severity(bmi)
+    bmi_keys = SEVERITY_KEYS[severity]
+    overridden = severity > model_severity(model_keys)
+    final_keys = np.where(overridden, bmi_keys, model_keys)
+    return final_keys, bmi_keys, overridden
+
+
+def factor_masks(df):
+    masks = {column: np.asarray(rule(df), dtype=bool) for column, _, rule in POSITIVE_FACTORS + RISK_FACTORS}
+    return pd.DataFrame(masks, index=df.index)
+
+
+def active_factors(masks_row, factors):
+    return [label for column, label, _ in factors if masks_row[column]]
+
+
+def evaluate_rules(df, model_keys):
+    # df holds the (rounded) patient features; model_keys the raw model predictions
+    bmi = compute_bmi(df['Height'], df['Weight'])
+    final_keys, bmi_keys, overridden = reconcile_with_bmi(model_keys, bmi)
+    result = pd.DataFrame({
+        'BMI': bmi,
+        'model_prediction': np.asarray(model_keys, dtype=object),
+        'bmi_prediction': bmi_keys,
+        'bmi_override': overridden,
+        'final_prediction': final_keys,
+    }, index=df.index)
+    return pd.concat([result, factor_masks(df)], axis=1)
@@ -0,0 +1,200 @@
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from batch_score import score_frame
+from instrumentation import metrics
+from model_utils import CATEGORICAL_FEATURES, FEATURE_COLUMNS, MODEL_PATH, NUMERICAL_FEATURES, load_pipeline
+from rules import POSITIVE_FACTORS, RISK_FACTORS, active_factors
+
+# Local JSON prediction service. Concurrent single-patient requests are gathered
+# into micro-batches so the forest runs one vectorized predict_proba per batch.
+
+
+class MicroBatcher:
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def _collect(self):
+        # Block for the first request, then wait at most max_wait for the batch to fill
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            records = [record for record, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                with metrics.stage('serve.batch'):
+                    scored = score_frame(self.model, pd.DataFrame(records, columns=FEATURE_COLUMNS))
+                results = [format_result(row, self.model.classes_) for _, row in scored.iterrows()]
+            except Exception:
+                # One invalid patient must not fail the whole batch: retry row by row
+                self._score_individually(records, futures)
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def _score_individually(self, records, futures):
+        for record, future in zip(records, futures):
+            try:
+                scored = score_frame(self.model, pd.DataFrame([record], columns=FEATURE_COLUMNS))
+                result = format_result(scored.iloc[0], self.model.classes_)
+            except Exception as exc:
+                future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.rows += 1
+            future.set_result(result)
+
+
+def format_result(row, classes):
+    return {
+        'bmi': float(row['BMI']),
+        'model_prediction': row['model_prediction'],
+        'bmi_prediction': row['bmi_prediction'],
+        'bmi_override': bool(row['bmi_override']),
+        'final_prediction': row['final_prediction'],
+        'probabilities': {c: float(row[f'proba_{c}']) for c in classes},
+        'positive_factors': active_factors(row, POSITIVE_FACTORS),
+        'risk_factors': active_factors(row, RISK_FACTORS),
+    }
+
+
+# Accepted range of every numerical field, the same as the app's input widgets
+FIELD_RANGES = {
+    'Age': (1, 120), 'Height': (1.0, 2.5), 'Weight': (10.0, 300.0), 'FCVC': (1, 3),
+    'NCP': (1, 4), 'CH2O': (1, 3), 'FAF': (0, 3), 'TUE': (0, 2),
+}
+
+
+def validate_record(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object with one patient")
+    missing = [col for col in FEATURE_COLUMNS if col not in payload]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    record = {col: payload[col] for col in FEATURE_COLUMNS}
+    # json.loads accepts NaN/Infinity, and a zero height makes the BMI infinite: reject
+    # anything outside the app's ranges here so it returns 400 instead of a 500 or a
+    # non-JSON Infinity in the response
+    for col in NUMERICAL_FEATURES:
+        value = record[col]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Field '{col}' must be a number")
+        low, high = FIELD_RANGES[col]
+        if not math.isfinite(value) or not low <= value <= high:
+            raise ValueError(f"Field '{col}' must be between {low} and {high}")
+    for col in CATEGORICAL_FEATURES:
+        if not isinstance(record[col], str):
+            raise ValueError(f"Field '{col}' must be a string")
+    return record
+
+
+class PredictionServer(ThreadingHTTPServer):
+    # The default backlog of 5 resets connections under concurrent load
+    request_queue_size = 256
+
+
+def make_handler(batcher, timeout=10.0):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok', 'batches': batcher.batches, 'rows': batcher.rows})
+            elif self.path == '/metrics':
+                self._send_json(200, {'enabled': metrics.enabled, 'stages': metrics.summary()})
+            else:
+                self._send_json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'Not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                record = validate_record(json.loads(self.rfile.read(length)))
+            except (ValueError, json.JSONDecodeError) as exc:
+                self._send_json(400, {'error': str(exc)})
+                return
+            try:
+                with metrics.stage('serve.request'):
+                    result = batcher.submit(record).result(timeout=timeout)
+            except ValueError as exc:
+                # Raised by the encoder for unknown categories
+                self._send_json(400, {'error': str(exc)})
+                return
+            except Exception as exc:
+                self._send_json(500, {'error': str(exc)})
+                return
+            self._send_json(200, result)
+
+        def log_message(self, format, *args):
+            # Keep the request path quiet; errors are returned to the client
+            pass
+
+    return PredictionHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP JSON prediction service with micro-batching.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to model_pipeline.pkl")
+    parser.add_argument('--max-batch-size', type=int, default=32, help="Maximum requests per predict_proba call")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="Maximum time the first request of a batch waits for others")
+    args = parser.parse_args()
+
+    batcher = MicroBatcher(load_pipeline(args.model), args.max_batch_size, args.max_wait_ms)
+    server = PredictionServer((args.host, args.port), make_handler(batcher))
+    print(f"Serving predictions on http://{args.host}:{args.port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from model_utils import DATA_PATH, FEATURE_COLUMNS, TARGET_COLUMN
+
+# Synthetic patients shaped like data/Obesity.csv: whole rows are resampled so the
+# joint distribution of habits is preserved, then the continuous measurements are
+# jittered so the rows are not exact copies of the source.
+
+JITTER = {'Age': 1.0, 'Height': 0.02, 'Weight': 1.5}
+LIMITS = {'Age': (14, 61), 'Height': (1.45, 1.98), 'Weight': (39.0, 173.0)}
+
+
+def make_synthetic_patients(n_rows, random_state=0, source=None, include_target=False):
+    if source is None:
+        source = pd.read_csv(DATA_PATH)
+    rng = np.random.default_rng(random_state)
+    columns = FEATURE_COLUMNS + ([TARGET_COLUMN] if include_target else [])
+    sample = source[columns].iloc[rng.integers(0, len(source), size=n_rows)].reset_index(drop=True)
+
+    for col, scale in JITTER.items():
+        low, high = LIMITS[col]
+        values = sample[col].to_numpy(dtype=float) + rng.normal(0.0, scale, size=n_rows)
+        sample[col] = np.clip(values, low, high)
+    sample['Age'] = sample['Age'].round().astype(int)
+    sample['Height'] = sample['Height'].round(2)
+    sample['Weight'] = sample['Weight'].round(1)
+    return sample
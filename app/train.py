@@ -1,61 +1,123 @@
-import pandas as pd
-import joblib
+import argparse
+import os
+
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score
-import os
 
-# 1. Data Loading & Cleaning
-df = pd.read_csv('data/Obesity.csv')
-
-def preprocess_raw_data(df):
-    df_copy = df.copy()
-    # Rounding specific columns according to data dictionary
-    round_cols = ['FCVC', 'NCP', 'CH2O', 'FAF', 'TUE', 'Age']
-    for col in round_cols:
-        df_copy[col] = df_copy[col].round().astype(int)
-    return df_copy
-
-df_clean = preprocess_raw_data(df)
-
-# 2. Splitting Features and Target
-X = df_clean.drop('Obesity', axis=1)
-y = df_clean['Obesity']
-
-# Identifying column types
-categorical_features = X.select_dtypes(include=['object']).columns.tolist()
-numerical_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
-
-# 3. Creating Preprocessing Pipeline
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(drop='first', sparse_output=False), categorical_features)
-    ]
-)
-
-# 4. Creating Full Pipeline
-pipeline = Pipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('classifier', RandomForestClassifier(n_estimators=100, random_state=42))
-])
-
-# 5. Train-Test Split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
-
-# 6. Training
-pipeline.fit(X_train, y_train)
-
-# 7. Evaluation
-y_pred = pipeline.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
-print(f"Model Accuracy: {accuracy*100:.2f}%")
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred))
-
-# 8. Saving the Model
-joblib.dump(pipeline, 'app/model_pipeline.pkl')
-print("Model saved successfully as 'app/model_pipeline.pkl'")
+from modeling import build_pipeline, load_dataset
+from fast_predictor import FastPredictor, check_parity
+from artifacts import publish_model
+from incremental import run_incremental, start_ledger
+from drift import build_reference, save_reference
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the obesity risk pipeline.")
+    parser.add_argument('--data', default='data/Obesity.csv', help="Training CSV")
+    parser.add_argument('--output', default='app/model_pipeline.pkl', help="Where to save the pipeline")
+    parser.add_argument('--artifact-root', default='app/model_artifacts',
+                        help="Versioned, memory-mappable artifact directories are written here")
+    parser.add_argument('--ledger', default='app/training_ledger.json',
+                        help="Record of the data absorbed by the current model")
+    parser.add_argument('--drift-reference', default='app/drift_reference.json',
+                        help="Reference input profile used by the drift monitor")
+    parser.add_argument('--incremental', metavar='NEW_CSV',
+                        help="Add trees fitted on NEW_CSV to the saved model instead of retraining")
+    parser.add_argument('--new-trees', type=int, default=20, help="Trees added per incremental batch")
+    parser.add_argument('--compare', action='store_true',
+                        help="With --incremental, compare against a full retrain on a held-out split")
+    parser.add_argument('--tune', action='store_true',
+                        help="Run the parallel hyperparameter search before the final fit")
+    parser.add_argument('--cv-folds', type=int, default=5, help="Stratified CV folds used by --tune")
+    parser.add_argument('--n-iter', type=int, default=None,
+                        help="Sample this many trials from the grid instead of running all of it")
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count(), help="Worker processes used by --tune")
+    parser.add_argument('--checkpoint', default='app/tuning_trials.jsonl',
+                        help="Finished trials are appended here so an interrupted search resumes")
+    parser.add_argument('--results', default='app/tuning_results.csv', help="Trial results table written by --tune")
+    parser.add_argument('--evaluate', action='store_true',
+                        help="Write a repeated stratified k-fold report on the full data (uses --n-jobs)")
+    parser.add_argument('--eval-folds', type=int, default=5, help="Folds per repeat used by --evaluate")
+    parser.add_argument('--eval-repeats', type=int, default=3, help="Repeats used by --evaluate")
+    parser.add_argument('--report', default='app/evaluation_report.json', help="Report written by --evaluate")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.incremental:
+        run_incremental(args.incremental, model_path=args.output, ledger_path=args.ledger,
+                        artifact_root=args.artifact_root, n_new_trees=args.new_trees, compare=args.compare,
+                        drift_reference_path=args.drift_reference)
+        return
+
+    # 1. Data Loading & Cleaning
+    # 2. Splitting Features and Target
+    X, y = load_dataset(args.data)
+
+    # 3. Train-Test Split (recorded in the training ledger)
+    split = {'test_size': 0.3, 'random_state': 42, 'stratify': True}
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=split['test_size'], random_state=split['random_state'], stratify=y
+    )
+
+    # 4. Hyperparameter Search (optional, cross-validated on the training split only)
+    classifier_params = {}
+    if args.tune:
+        from tuning import run_search, save_results
+
+        results, wall_seconds = run_search(
+            X_train, y_train, checkpoint_path=args.checkpoint, n_jobs=args.n_jobs,
+            cv_folds=args.cv_folds, n_iter=args.n_iter
+        )
+        save_results(results, wall_seconds, args.results)
+        classifier_params = results.iloc[0]['params']
+        print(f"Best parameters: {classifier_params} "
+              f"(CV accuracy {results.iloc[0]['mean_accuracy']*100:.2f}%)")
+
+    # 5. Creating Full Pipeline (preprocessing + classifier)
+    pipeline = build_pipeline(**classifier_params)
+
+    # 6. Training
+    pipeline.fit(X_train, y_train)
+
+    # 7. Evaluation
+    y_pred = pipeline.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Model Accuracy: {accuracy*100:.2f}%")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred))
+
+    # 7b. Cross-validated evaluation (optional): less noisy than the single split above
+    if args.evaluate:
+        from evaluation import print_report, run_evaluation, save_report
+
+        report = run_evaluation(X, y, args.eval_folds, args.eval_repeats, args.n_jobs,
+                                classifier_params=classifier_params)
+        print_report(report)
+        save_report(report, args.report)
+        print(f"Evaluation report saved as '{args.report}'")
+
+    # 8. Saving the Model
+    # (pickled pipeline, NumPy fast path and versioned memory-mappable artifact)
+    fast_path, artifact_dir = publish_model(pipeline, args.output, args.artifact_root)
+    print(f"Model saved successfully as '{args.output}'")
+    print(f"Model artifact saved as '{artifact_dir}'")
+
+    # 9. Checking the NumPy fast path (no pandas/ColumnTransformer at inference time)
+    max_diff, same_labels = check_parity(pipeline, FastPredictor.load(fast_path), X_test)
+    print(f"Fast model saved as '{fast_path}' "
+          f"(max probability difference {max_diff:.2e}, identical predictions: {same_labels})")
+
+    # 10. Recording the absorbed data for incremental retraining
+    start_ledger(args.ledger, args.data, X_train, split)
+    print(f"Training ledger saved as '{args.ledger}'")
+
+    # 11. Saving the drift reference (training inputs, class mix on the held-out split)
+    save_reference(build_reference(X_train, y_pred), args.drift_reference)
+    print(f"Drift reference saved as '{args.drift_reference}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,3 @@
-import pandas as pd
 import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
@@ -7,26 +6,19 @@ from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score
 
-# 1. Data Loading & Cleaning
-df = pd.read_csv('/content/drive/MyDrive/GitHub/obesity-risk-prediction/data/Obesity.csv')
+from data_loading import load_patients
+from model_utils import CATEGORICAL_FEATURES, DATA_PATH, MODEL_PATH, NUMERICAL_FEATURES
 
-def preprocess_raw_data(df):
-    df_copy = df.copy()
-    # Rounding specific columns according to data dictionary
-    round_cols = ['FCVC', 'NCP', 'CH2O', 'FAF', 'TUE', 'Age']
-    for col in round_cols:
-        df_copy[col] = df_copy[col].round().astype(int)
-    return df_copy
-
-df_clean = preprocess_raw_data(df)
+# 1. Data Loading & Cleaning (typed columnar cache shared with train.py)
+df_clean = load_patients(DATA_PATH)
 
 # 2. Splitting Features and Target
 X = df_clean.drop('Obesity', axis=1)
 y = df_clean['Obesity']
 
 # Identifying column types
-categorical_features = X.select_dtypes(include=['object']).columns.tolist()
-numerical_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
+categorical_features = CATEGORICAL_FEATURES
+numerical_features = NUMERICAL_FEATURES
 
 # 3. Building the Pipeline
 # Preprocessing for numerical: Scaling
@@ -57,5 +49,5 @@ print("\nClassification Report:\n", classification_report(y_test, y_pred))
 
 # 5. Exporting for Deployment (Streamlit)
 # This saves the entire pipeline (scaler + encoder + model)
-joblib.dump(model_pipeline, '/content/drive/MyDrive/GitHub/obesity-risk-prediction/app/model_pipeline.pkl')
+joblib.dump(model_pipeline, MODEL_PATH)
 print("Model saved successfully as 'app/model_pipeline.pkl'")
\ No newline at end of file
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, cross_val_score
+
+from modeling import build_pipeline, known_categories
+
+# Parallel, resumable RandomForest hyperparameter search. Each trial (one parameter
+# combination, all CV folds) runs in its own worker process; finished trials are
+# appended to a JSON-lines checkpoint so an interrupted search picks up where it stopped.
+
+PARAM_GRID = {
+    'n_estimators': [100, 200, 400],
+    'max_depth': [None, 10, 20],
+    'max_features': ['sqrt', 'log2', 0.5],
+    'min_samples_leaf': [1, 2, 4],
+}
+
+_worker_data = {}
+
+
+def _init_worker(X, y, cv_folds, random_state):
+    # Ship the training data once per worker instead of once per trial
+    _worker_data.update(X=X, y=y, cv_folds=cv_folds, random_state=random_state,
+                        categories=known_categories(X))
+
+
+def evaluate_trial(params):
+    start = time.perf_counter()
+    cv = StratifiedKFold(n_splits=_worker_data['cv_folds'], shuffle=True,
+                         random_state=_worker_data['random_state'])
+    pipeline = build_pipeline(categories=_worker_data['categories'], **params, n_jobs=1)
+    scores = cross_val_score(pipeline, _worker_data['X'], _worker_data['y'], cv=cv, scoring='accuracy',
+                             error_score='raise')
+    return {
+        'params': params,
+        'mean_accuracy': float(scores.mean()),
+        'std_accuracy': float(scores.std()),
+        'fold_scores': [float(s) for s in scores],
+        'seconds': time.perf_counter() - start,
+        'pid': os.getpid(),
+    }
+
+
+def trial_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def data_fingerprint(X, y, cv_folds, random_state):
+    # Checkpointed trials are only reused for the same data and CV setup
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=False).values.tobytes())
+    digest.update(f"{cv_folds}:{random_state}".encode())
+    return digest.hexdigest()[:16]
+
+
+def load_checkpoint(path, fingerprint):
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interruption is simply re-run
+                continue
+            if record.get('fingerprint') == fingerprint:
+                done[trial_key(record['params'])] = record
+    return done
+
+
+def candidate_trials(n_iter=None, random_state=42):
+    if n_iter is None:
+        return list(ParameterGrid(PARAM_GRID))
+    return list(ParameterSampler(PARAM_GRID, n_iter=n_iter, random_state=random_state))
+
+
+def run_search(X, y, checkpoint_path='app/tuning_trials.jsonl', n_jobs=None,
+               cv_folds=5, n_iter=None, random_state=42):
+    start = time.perf_counter()
+    fingerprint = data_fingerprint(X, y, cv_folds, random_state)
+    done = load_checkpoint(checkpoint_path, fingerprint)
+    trials = candidate_trials(n_iter, random_state)
+    pending = [p for p in trials if trial_key(p) not in done]
+    print(f"Hyperparameter search: {len(trials)} trials, {len(trials) - len(pending)} restored "
+          f"from '{checkpoint_path}', {len(pending)} to run on {n_jobs or os.cpu_count()} processes")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(X, y, cv_folds, random_state)) as executor, \
+                open(checkpoint_path, 'a') as checkpoint:
+            futures = [executor.submit(evaluate_trial, params) for params in pending]
+            try:
+                for i, future in enumerate(as_completed(futures), start=1):
+                    record = dict(future.result(), fingerprint=fingerprint)
+                    checkpoint.write(json.dumps(record) + '\n')
+                    checkpoint.flush()
+                    os.fsync(checkpoint.fileno())
+                    done[trial_key(record['params'])] = record
+                    print(f"  [{i}/{len(pending)}] {record['params']} -> "
+                          f"{record['mean_accuracy']*100:.2f}% ({record['seconds']:.1f}s)")
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    wall_seconds = time.perf_counter() - start
+    trial_seconds = sum(done[trial_key(p)]['seconds'] for p in pending)
+    print(f"Search wall-clock time: {wall_seconds:.1f}s for {len(pending)} trials "
+          f"(sum of trial times {trial_seconds:.1f}s, speedup {trial_seconds / max(wall_seconds, 1e-9):.1f}x)")
+
+    results = pd.DataFrame([done[trial_key(p)] for p in trials])
+    results = results.sort_values('mean_accuracy', ascending=False, kind='stable').reset_index(drop=True)
+    return results, wall_seconds
+
+
+def save_results(results, wall_seconds, path='app/tuning_results.csv'):
+    table = pd.concat([pd.json_normalize(results['params'].tolist()),
+                       results[['mean_accuracy', 'std_accuracy', 'seconds']]], axis=1)
+    table['search_wall_seconds'] = wall_seconds
+    table.to_csv(path, index=False)
+    print(f"Trial results saved as '{path}'")
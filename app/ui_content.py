@@ -0,0 +1,247 @@
+# Static text and display tables for app.py. Streamlit re-executes app.py on every
+# rerun, but an imported module runs once per server process, so everything here
+# (including the seven possible ruler HTML blocks) is built exactly once.
+
+DATA_DICTIONARY = """
+### 👤 Dados Pessoais
+- **Gender**: Sexo do paciente (Feminino/Masculino)
+- **Age**: Idade do paciente em anos
+- **Height**: Altura do paciente em metros
+- **Weight**: Peso do paciente em quilogramas
+- **family_history**: Histórico familiar de sobrepeso (yes/no)
+
+### 🥗 Eating Habits (Hábitos Alimentares)
+- **FAVC** (Frequent consumption of high-calorie food): Consumo frequente de alimentos com alto teor calórico (yes/no)
+- **FCVC** (Frequency of Consumption of Vegetables): Frequência de consumo de vegetais nas refeições (escala 1-3)
+  - 1 = Nunca
+  - 2 = Às vezes
+  - 3 = Sempre
+- **NCP** (Number of main meals): Número de refeições principais por dia (1-4)
+- **CAEC** (Consumption of food between meals): Consumo de alimentos entre as refeições
+  - no = Não
+  - Sometimes = Às vezes
+  - Frequently = Frequentemente
+  - Always = Sempre
+- **CH2O** (Consumption of water daily): Consumo diário de água em litros (escala 1-3)
+  - 1 = Menos de 1L
+  - 2 = 1-2L
+  - 3 = Mais de 2L
+- **SCC** (Calories consumption monitoring): Monitora o consumo de calorias diariamente? (yes/no)
+
+### 🏃 Lifestyle & Transport (Estilo de Vida e Transporte)
+- **FAF** (Physical activity frequency): Frequência de atividade física por semana (escala 0-3)
+  - 0 = Nenhuma
+  - 1 = 1-2 dias
+  - 2 = 2-4 dias
+  - 3 = 4-5 dias
+- **TUE** (Time using technology devices): Tempo de uso de dispositivos eletrônicos por dia (escala 0-2)
+  - 0 = 0-2 horas
+  - 1 = 3-5 horas
+  - 2 = Mais de 5 horas
+- **SMOKE**: Fumante? (yes/no)
+- **CALC** (Consumption of alcohol): Consumo de álcool
+  - no = Não
+  - Sometimes = Às vezes
+  - Frequently = Frequentemente
+  - Always = Sempre
+- **MTRANS** (Transportation used): Meio de transporte principal utilizado
+  - Public_Transportation = Transporte público
+  - Automobile = Automóvel
+  - Motorbike = Motocicleta
+  - Bike = Bicicleta
+  - Walking = Caminhada
+
+### 🎯 Target Variable (Variável Alvo)
+- **Obesity**: Nível de obesidade classificado em 7 categorias:
+  - Insufficient_Weight = Peso insuficiente
+  - Normal_Weight = Peso normal
+  - Overweight_Level_I = Sobrepeso Nível I
+  - Overweight_Level_II = Sobrepeso Nível II
+  - Obesity_Type_I = Obesidade Tipo I
+  - Obesity_Type_II = Obesidade Tipo II
+  - Obesity_Type_III = Obesidade Tipo III
+"""
+
+# Widget option labels (format_func lookups)
+GENDER_LABELS = {"Female": "Feminino", "Male": "Masculino"}
+YES_NO_LABELS = {"yes": "Sim", "no": "Não"}
+FREQUENCY_LABELS = {"no": "Não", "Sometimes": "Às vezes", "Frequently": "Frequentemente", "Always": "Sempre"}
+TRANSPORT_LABELS = {"Public_Transportation": "Transporte Público", "Automobile": "Automóvel",
+                    "Motorbike": "Motocicleta", "Bike": "Bicicleta", "Walking": "Caminhada"}
+
+# Status levels and recommendations, keyed by the displayed class name
+STATUS_CONFIG = {
+    "Insufficient Weight": {
+        "emoji": "⚠️",
+        "color": "#87CEEB",
+        "message": "Peso Insuficiente",
+        "recommendation": "• Consulte um nutricionista para plano alimentar adequado\n• Avalie possíveis deficiências nutricionais\n• Considere suplementação se necessário",
+        "position": 0
+    },
+    "Normal Weight": {
+        "emoji": "✅",
+        "color": "#28a745",
+        "message": "Peso Normal - Parabéns!",
+        "recommendation": "• Mantenha hábitos alimentares saudáveis\n• Continue praticando atividades físicas regulares\n• Realize check-ups preventivos anuais",
+        "position": 1
+    },
+    "Overweight Level I": {
+        "emoji": "⚡",
+        "color": "#ffc107",
+        "message": "Sobrepeso Nível I",
+        "recommendation": "• Inicie ou intensifique atividade física (150 min/semana)\n• Ajuste padrão alimentar reduzindo calorias\n• Acompanhamento nutricional é recomendado",
+        "position": 2
+    },
+    "Overweight Level Ii": {
+        "emoji": "⚡",
+        "color": "#ff9800",
+        "message": "Sobrepeso Nível II",
+        "recommendation": "• Consulte médico e nutricionista urgentemente\n• Estabeleça meta de redução de peso gradual\n• Atividade física supervisionada é importante",
+        "position": 3
+    },
+    "Obesity Type I": {
+        "emoji": "🔴",
+        "color": "#ff5722",
+        "message": "Obesidade Tipo I",
+        "recommendation": "• Acompanhamento médico multiprofissional necessário\n• Avalie riscos cardiovasculares e metabólicos\n• Plano estruturado de perda de peso com metas\n• Considere apoio psicológico",
+        "position": 4
+    },
+    "Obesity Type Ii": {
+        "emoji": "🔴",
+        "color": "#e53935",
+        "message": "Obesidade Tipo II",
+        "recommendation": "• Tratamento médico intensivo é essencial\n• Avaliação de comorbidades (diabetes, hipertensão)\n• Considere tratamento farmacológico\n• Suporte multidisciplinar completo",
+        "position": 5
+    },
+    "Obesity Type Iii": {
+        "emoji": "🚨",
+        "color": "#b71c1c",
+        "message": "Obesidade Tipo III (Mórbida)",
+        "recommendation": "• Procure atendimento médico especializado IMEDIATAMENTE\n• Avaliação para cirurgia bariátrica pode ser necessária\n• Monitoramento rigoroso de comorbidades\n• Suporte psicológico e nutricional intensivo",
+        "position": 6
+    }
+}
+DEFAULT_STATUS = "Normal Weight"
+
+# Ruler segments in order: (class key, label, colour)
+RULER_CATEGORIES = [
+    ("Insufficient Weight", "Peso Insuficiente", "#87CEEB"),
+    ("Normal Weight", "Peso Normal", "#28a745"),
+    ("Overweight Level I", "Sobrepeso Nível I", "#ffc107"),
+    ("Overweight Level Ii", "Sobrepeso Nível II", "#ff9800"),
+    ("Obesity Type I", "Obesidade Tipo I", "#ff5722"),
+    ("Obesity Type Ii", "Obesidade Tipo II", "#e53935"),
+    ("Obesity Type Iii", "Obesidade Tipo III", "#b71c1c")
+]
+
+# The arrow position and status colour are CSS variables set on the container,
+# so the stylesheet itself is a constant
+RULER_STYLE = """
+<style>
+.health-scale-container {
+    position: relative;
+    width: 100%;
+    margin: 30px 0;
+    padding-top: 60px;
+}
+.arrow-indicator {
+    position: absolute;
+    top: 0;
+    left: var(--arrow-position);
+    transform: translateX(-50%);
+    text-align: center;
+    z-index: 100;
+    animation: bounce 1.5s ease-in-out infinite;
+}
+@keyframes bounce {
+    0%, 100% { transform: translateX(-50%) translateY(0); }
+    50% { transform: translateX(-50%) translateY(-8px); }
+}
+.arrow-text {
+    font-size: 13px;
+    font-weight: bold;
+    color: #333;
+    margin-bottom: 8px;
+    background: white;
+    padding: 5px 12px;
+    border-radius: 8px;
+    box-shadow: 0 2px 6px rgba(0,0,0,0.2);
+    white-space: nowrap;
+}
+.arrow {
+    font-size: 35px;
+    line-height: 0.8;
+    color: var(--status-color);
+    filter: drop-shadow(0 3px 5px rgba(0,0,0,0.4));
+}
+.health-ruler {
+    display: flex;
+    width: 100%;
+    height: 70px;
+    border-radius: 10px;
+    overflow: hidden;
+    box-shadow: 0 4px 8px rgba(0,0,0,0.15);
+    position: relative;
+    z-index: 1;
+}
+.ruler-segment {
+    flex: 1;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    font-size: 12px;
+    font-weight: 600;
+    color: white;
+    text-align: center;
+    text-shadow: 1px 1px 3px rgba(0,0,0,0.4);
+    border-right: 2px solid rgba(255,255,255,0.3);
+    padding: 8px 4px;
+    position: relative;
+    transition: all 0.3s ease;
+}
+.ruler-segment:last-child {
+    border-right: none;
+}
+.ruler-segment.active {
+    font-size: 13px;
+    font-weight: 700;
+    box-shadow: inset 0 0 20px rgba(0,0,0,0.3);
+}
+.result-box {
+    text-align: center;
+    font-size: 28px;
+    margin-top: 25px;
+    padding: 15px;
+    font-weight: bold;
+    color: var(--status-color);
+    background: linear-gradient(135deg, rgba(255,255,255,0.9), rgba(240,240,240,0.9));
+    border-radius: 10px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+    border: 3px solid var(--status-color);
+}
+</style>
+"""
+
+
+def ruler_html(result_display):
+    config = STATUS_CONFIG[result_display]
+    # Centre of the active segment, in percent
+    arrow_position = (config['position'] / 6) * 100 + (100 / 14)
+    segments = "".join(
+        f'<div class="ruler-segment {"active" if key == result_display else ""}" '
+        f'style="background-color: {color};">{label}</div>'
+        for key, label, color in RULER_CATEGORIES
+    )
+    return f"""{RULER_STYLE}
+<div class="health-scale-container" style="--arrow-position: {arrow_position}%; --status-color: {config['color']};">
+    <div class="arrow-indicator">
+        <div class="arrow-text">Você está aqui</div>
+        <div class="arrow">▼</div>
+    </div>
+    <div class="health-ruler">{segments}</div>
+    <div class="result-box">{config["emoji"]} {config["message"]}</div>
+</div>
+"""
+
+
+RULER_HTML = {key: ruler_html(key) for key in STATUS_CONFIG}
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pytest
+
+from fast_predictor import FastPredictor, export_fast_model, tree_estimators
+from model_utils import DATA_PATH, FEATURE_COLUMNS, MODEL_PATH, load_pipeline
+from modeling import build_pipeline, load_dataset
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    X, y = load_dataset(DATA_PATH, use_cache=False)
+    return X, y
+
+
+def assert_parity(pipeline, fast_model, X):
+    rows = X[FEATURE_COLUMNS].to_numpy(dtype=object)
+    assert np.array_equal(fast_model.predict(rows), pipeline.predict(X))
+    np.testing.assert_allclose(fast_model.predict_proba(rows), pipeline.predict_proba(X), rtol=0, atol=1e-12)
+    # The app scores one patient at a time
+    for i in range(0, len(X), 97):
+        np.testing.assert_allclose(fast_model.predict_proba(rows[i:i + 1]),
+                                   pipeline.predict_proba(X.iloc[i:i + 1]), rtol=0, atol=1e-12)
+
+
+def test_parity_with_freshly_fitted_pipeline(dataset, tmp_path):
+    X, y = dataset
+    pipeline = build_pipeline(n_estimators=25).fit(X, y)
+    path = os.path.join(tmp_path, 'model_fast.npz')
+    export_fast_model(pipeline, path)
+    assert_parity(pipeline, FastPredictor.load(path), X)
+
+
+def test_parity_with_model_pipeline_pkl(dataset, tmp_path):
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip("model_pipeline.pkl not built; run python app/train.py")
+    pipeline = load_pipeline(MODEL_PATH)
+    if tree_estimators(pipeline.named_steps['classifier']) is None:
+        pytest.skip("model_pipeline.pkl holds a non-tree student without a fast path")
+    path = os.path.join(tmp_path, 'model_fast.npz')
+    export_fast_model(pipeline, path)
+    X, _ = dataset
+    assert_parity(pipeline, FastPredictor.load(path), X)
@@ -0,0 +1,138 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rules import (BMI_BINS, POSITIVE_FACTORS, RISK_FACTORS, SEVERITY_ORDER, active_factors, compute_bmi,
+                   evaluate_rules, factor_masks, reconcile_with_bmi)
+
+# The scalar if-chains app.py used before rules.py, kept as the reference (factor
+# labels without their ✓/⚠ prefixes)
+
+
+def scalar_bmi_key(bmi):
+    if bmi < 18.5:
+        return "Insufficient_Weight"
+    elif bmi < 25:
+        return "Normal_Weight"
+    elif bmi < 27.5:
+        return "Overweight_Level_I"
+    elif bmi < 30:
+        return "Overweight_Level_II"
+    elif bmi < 35:
+        return "Obesity_Type_I"
+    elif bmi < 40:
+        return "Obesity_Type_II"
+    else:
+        return "Obesity_Type_III"
+
+
+def scalar_reconcile(model_prediction_key, bmi):
+    bmi_prediction_key = scalar_bmi_key(bmi)
+    model_severity = SEVERITY_ORDER.get(model_prediction_key, 1)
+    bmi_severity = SEVERITY_ORDER.get(bmi_prediction_key, 1)
+    final_prediction_key = model_prediction_key
+    if bmi_severity > model_severity:
+        final_prediction_key = bmi_prediction_key
+    return final_prediction_key, bmi_prediction_key, bmi_severity > model_severity
+
+
+def scalar_factors(faf, fcvc, ch2o, scc, smoke, mtrans, favc, caec, tue, calc):
+    positive_factors = []
+    if faf >= 2:
+        positive_factors.append("Atividade física regular")
+    if fcvc >= 2:
+        positive_factors.append("Bom consumo de vegetais")
+    if ch2o >= 2:
+        positive_factors.append("Boa hidratação")
+    if scc == "yes":
+        positive_factors.append("Monitora calorias")
+    if smoke == "no":
+        positive_factors.append("Não fumante")
+    if mtrans in ["Bike", "Walking"]:
+        positive_factors.append("Transporte ativo")
+    risk_factors = []
+    if faf == 0:
+        risk_factors.append("Sedentarismo")
+    if favc == "yes":
+        risk_factors.append("Alto consumo calórico")
+    if fcvc == 1:
+        risk_factors.append("Baixo consumo de vegetais")
+    if caec in ["Frequently", "Always"]:
+        risk_factors.append("Belisca frequentemente")
+    if ch2o == 1:
+        risk_factors.append("Baixa hidratação")
+    if tue == 2:
+        risk_factors.append("Muito tempo em telas")
+    if calc in ["Frequently", "Always"]:
+        risk_factors.append("Alto consumo de álcool")
+    if smoke == "yes":
+        risk_factors.append("Fumante")
+    return positive_factors, risk_factors
+
+
+MODEL_KEYS = list(SEVERITY_ORDER) + ['Unknown_Label']
+
+
+def edge_bmis():
+    # Every band edge, the closest floats on either side, and the extremes
+    edges = np.array(BMI_BINS, dtype=float)
+    return np.concatenate([edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf),
+                           [0.0, 1e-9, 1e9, np.inf]])
+
+
+def test_bmi_bands_match_scalar_ladder():
+    rng = np.random.default_rng(0)
+    bmis = np.concatenate([edge_bmis(), rng.uniform(10, 60, 100_000)])
+    model_keys = rng.choice(MODEL_KEYS, len(bmis))
+    final_keys, bmi_keys, overridden = reconcile_with_bmi(model_keys, bmis)
+    expected = [scalar_reconcile(key, bmi) for key, bmi in zip(model_keys, bmis)]
+    assert list(final_keys) == [e[0] for e in expected]
+    assert list(bmi_keys) == [e[1] for e in expected]
+    assert list(overridden) == [e[2] for e in expected]
+
+
+@pytest.mark.parametrize('bound', BMI_BINS)
+def test_band_edge_belongs_to_upper_band(bound):
+    _, bmi_keys, _ = reconcile_with_bmi(['Insufficient_Weight'] * 2, [np.nextafter(bound, 0), bound])
+    assert bmi_keys[0] == scalar_bmi_key(np.nextafter(bound, 0))
+    assert bmi_keys[1] == scalar_bmi_key(bound)
+    assert SEVERITY_ORDER[bmi_keys[1]] == SEVERITY_ORDER[bmi_keys[0]] + 1
+
+
+def test_compute_bmi_matches_scalar_formula():
+    heights = np.array([1.45, 1.5, 1.7, 1.98, 2.5])
+    weights = np.array([39.0, 41.6, 70.0, 173.0, 300.0])
+    assert list(compute_bmi(heights, weights)) == [w / (h ** 2) for h, w in zip(heights, weights)]
+
+
+def test_zero_height_is_the_most_severe_band():
+    # The old scalar code raised ZeroDivisionError; column-wise the BMI is infinite,
+    # which the ladder puts in the open-ended top band (serve.py rejects Height 0)
+    with np.errstate(divide='ignore'):
+        bmi = compute_bmi([0.0], [70.0])
+    assert np.isinf(bmi[0])
+    final_keys, bmi_keys, overridden = reconcile_with_bmi(['Normal_Weight'], bmi)
+    assert (final_keys[0], bmi_keys[0], overridden[0]) == scalar_reconcile('Normal_Weight', bmi[0])
+    assert final_keys[0] == 'Obesity_Type_III'
+
+
+def test_factor_masks_match_scalar_chains():
+    domains = {
+        'FAF': [0, 1, 2, 3], 'FCVC': [1, 2, 3], 'CH2O': [1, 2, 3], 'SCC': ['yes', 'no'], 'SMOKE': ['yes', 'no'],
+        'MTRANS': ['Public_Transportation', 'Automobile', 'Motorbike', 'Bike', 'Walking'],
+        'FAVC': ['yes', 'no'], 'CAEC': ['no', 'Sometimes', 'Frequently', 'Always'], 'TUE': [0, 1, 2],
+        'CALC': ['no', 'Sometimes', 'Frequently', 'Always'],
+    }
+    frame = pd.DataFrame(list(itertools.product(*domains.values())), columns=list(domains))
+    frame['Height'], frame['Weight'] = 1.7, 70.0
+    masks = factor_masks(frame).to_dict('records')
+    result = evaluate_rules(frame, ['Normal_Weight'] * len(frame)).to_dict('records')
+
+    for row, mask, scored in zip(frame.itertuples(index=False), masks, result):
+        positive, risk = scalar_factors(row.FAF, row.FCVC, row.CH2O, row.SCC, row.SMOKE, row.MTRANS, row.FAVC,
+                                        row.CAEC, row.TUE, row.CALC)
+        assert active_factors(mask, POSITIVE_FACTORS) == positive
+        assert active_factors(mask, RISK_FACTORS) == risk
+        assert active_factors(scored, POSITIVE_FACTORS + RISK_FACTORS) == positive + risk